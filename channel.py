@@ -0,0 +1,747 @@
+#!/usr/bin/python3
+# Intel 8089 channel simulator
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# A Channel executes 8089 channel programs, decoding instructions with
+# the I89 instruction tables.
+#
+# There are two address spaces, each a Memory: the 20-bit system space,
+# and the 16-bit I/O space.  The pointer registers GA, GB, GC, and TP
+# hold 20-bit addresses and a tag bit selecting the space (0 for
+# system, 1 for I/O); PP, the parameter block pointer, always refers to
+# system space.  BC, IX, CC, and MC are 16-bit registers.
+#
+# Register loading follows the 8089 rules:
+#   MOV, MOVB, MOVI, MOVBI into a pointer register sign extend the value
+#     to 20 bits and set the tag to 1
+#   LPD, LPDI load a 20-bit system address and set the tag to 0
+#   MOVP loads or stores the whole pointer, including the tag
+#   ADD, INC, DEC on a pointer register do 20-bit arithmetic, leaving
+#     the tag unchanged
+#   AND, OR, NOT on a pointer register operate on the low 16 bits; the
+#     upper 4 bits, which are undefined on the 8089, are cleared
+# Byte operands are sign extended when combined with a register.
+#
+# XFER starts a DMA transfer after the instruction following it, as
+# described below, at "DMA transfers".
+#
+# Decoded instructions are kept in a cache indexed by address, so that
+# loops are decoded only once.  The Channel registers write hooks with
+# both address spaces, so that writes to the bytes of a cached
+# instruction, by the channel or anything else, remove it from the cache.
+
+from i89 import I89, OT
+from memory import Memory
+
+
+class Channel:
+
+    class SimulatorError(Exception):
+        pass
+
+    class BadInstruction(SimulatorError):
+        def __init__(self, channel, tp):
+            super().__init__('channel %d: invalid instruction at %05x' % (channel.number, tp))
+
+    class MemoryFault(SimulatorError):
+        def __init__(self, channel, tp):
+            super().__init__('channel %d: access to uninitialized or nonexistent memory by instruction at %05x' % (channel.number, tp))
+
+    class Halted(SimulatorError):
+        def __init__(self, channel):
+            super().__init__('channel %d is halted' % channel.number)
+
+    class DMAError(SimulatorError):
+        def __init__(self, channel, msg):
+            super().__init__('channel %d: %s' % (channel.number, msg))
+
+    Reg = I89.Reg
+
+    GA, GB, GC, BC, TP, IX, CC, MC = range(8)
+    pointer_regs = (GA, GB, GC, TP)
+
+    SYSTEM = 0
+    IO = 1
+    address_mask = (0xfffff, 0xffff)  # by tag
+
+    # operand width in bits, by mnemonic; others are word operations
+    byte_mnemonics = { 'movb', 'movbi', 'addb', 'addbi', 'incb', 'decb',
+                       'andb', 'andbi', 'orb', 'orbi', 'notb', 'setb', 'clr',
+                       'jzb', 'ljzb', 'jnzb', 'ljnzb', 'jmce', 'ljmce',
+                       'jmcne', 'ljmcne', 'jbt', 'ljbt', 'jnbt', 'ljnbt', 'tsl' }
+
+    # i89 may be passed in to share the instruction tables.  If io is
+    # not provided, a 64K I/O space is allocated.
+    def __init__(self, system, io = None, i89 = None, number = 0):
+        if i89 is None:
+            i89 = I89()
+        self.i89 = i89
+        if io is None:
+            io = Memory(size = 0x10000, write_once = False)
+        self.space = (system, io)  # by tag
+        self.number = number
+        # called with the Channel after each DMA transfer cycle, if
+        # external termination is selected; returns True to terminate
+        self.external_termination = None
+        self.decode_cache = ({ }, { })  # by tag: address -> Decoded
+        # by tag: nonzero for each byte that may be part of a cached
+        # instruction, so that most writes can skip the cache
+        self.decoded_map = tuple(bytearray(len(self.space[space]))
+                                 for space in (Channel.SYSTEM, Channel.IO))
+        self.write_hooks = tuple(self.write_hook(space) for space in (Channel.SYSTEM, Channel.IO))
+        for space in (Channel.SYSTEM, Channel.IO):
+            self.space[space].add_write_hook(self.write_hooks[space])
+        self.handlers = { 'jmp':    self.op_jmp,
+                          'ljmp':   self.op_jmp,
+                          'mov':    self.op_mov,
+                          'movb':   self.op_mov,
+                          'movi':   self.op_mov,
+                          'movbi':  self.op_mov,
+                          'movp':   self.op_movp,
+                          'lpd':    self.op_lpd,
+                          'lpdi':   self.op_lpdi,
+                          'add':    self.op_add,
+                          'addb':   self.op_add,
+                          'addi':   self.op_add,
+                          'addbi':  self.op_add,
+                          'inc':    self.op_inc,
+                          'incb':   self.op_inc,
+                          'dec':    self.op_dec,
+                          'decb':   self.op_dec,
+                          'and':    self.op_and,
+                          'andb':   self.op_and,
+                          'andi':   self.op_and,
+                          'andbi':  self.op_and,
+                          'or':     self.op_or,
+                          'orb':    self.op_or,
+                          'ori':    self.op_or,
+                          'orbi':   self.op_or,
+                          'not':    self.op_not,
+                          'notb':   self.op_not,
+                          'setb':   self.op_setb,
+                          'clr':    self.op_clr,
+                          'call':   self.op_call,
+                          'lcall':  self.op_call,
+                          'jz':     self.op_jz,
+                          'ljz':    self.op_jz,
+                          'jzb':    self.op_jz,
+                          'ljzb':   self.op_jz,
+                          'jnz':    self.op_jnz,
+                          'ljnz':   self.op_jnz,
+                          'jnzb':   self.op_jnz,
+                          'ljnzb':  self.op_jnz,
+                          'jmce':   self.op_jmce,
+                          'ljmce':  self.op_jmce,
+                          'jmcne':  self.op_jmcne,
+                          'ljmcne': self.op_jmcne,
+                          'jbt':    self.op_jbt,
+                          'ljbt':   self.op_jbt,
+                          'jnbt':   self.op_jnbt,
+                          'ljnbt':  self.op_jnbt,
+                          'tsl':    self.op_tsl,
+                          'wid':    self.op_wid,
+                          'xfer':   self.op_xfer,
+                          'sintr':  self.op_sintr,
+                          'hlt':    self.op_hlt,
+                          'nop':    self.op_nop }
+        self.reset()
+
+    def write_hook(self, space):
+        return lambda start, stop: self.invalidate(space, start, stop)
+
+    def reset(self):
+        self.regs = [0] * 8
+        self.tags = [0] * 8   # only meaningful for pointer registers
+        self.pp = 0
+        self.source_width = 8
+        self.dest_width = 8
+        self.xfer_pending = False
+        self.interrupt = False
+        self.halted = True
+        self.instruction_count = 0
+        self.dma_count = 0          # DMA transfers
+        self.bytes_transferred = 0  # by DMA transfers
+
+    # starts execution of a channel program at tp (system space unless
+    # tag is 1), with the parameter block at pp
+    def start(self, tp, pp = 0, tag = SYSTEM):
+        self.regs[Channel.TP] = tp & Channel.address_mask[tag]
+        self.tags[Channel.TP] = tag
+        self.pp = pp & 0xfffff
+        self.halted = False
+
+    # attributes saved by get_state() and restored by set_state();
+    # subclasses with more state extend this
+    state_attributes = ('regs', 'tags', 'pp', 'source_width', 'dest_width',
+                        'xfer_pending', 'interrupt', 'halted',
+                        'instruction_count', 'dma_count', 'bytes_transferred')
+
+    # Returns the state of the channel, not including memory.
+    def get_state(self):
+        state = { }
+        for name in self.state_attributes:
+            value = getattr(self, name)
+            if isinstance(value, list):
+                value = value[:]
+            state[name] = value
+        return state
+
+    def set_state(self, state):
+        for name, value in state.items():
+            if isinstance(value, list):
+                value = value[:]
+            setattr(self, name, value)
+
+    def register_dump(self):
+        s = ''
+        for r in Channel.Reg:
+            if r.value in Channel.pointer_regs:
+                s += '%s=%05x%s ' % (r.name, self.regs[r.value], 'si'[self.tags[r.value]])
+            else:
+                s += '%s=%04x ' % (r.name, self.regs[r.value])
+        return s + 'pp=%05x' % self.pp
+
+
+    # memory access
+
+    @staticmethod
+    def sign_extend_8(v):
+        return v - 0x100 if v & 0x80 else v
+
+    @staticmethod
+    def sign_extend_16(v):
+        return v - 0x10000 if v & 0x8000 else v
+
+    def load(self, space, addr, width):
+        mem = self.space[space]
+        if width == 8:
+            return mem[addr]
+        return mem[addr] | (mem[(addr + 1) & Channel.address_mask[space]] << 8)
+
+    def store(self, space, addr, width, value):
+        mem = self.space[space]
+        mem[addr] = value & 0xff
+        if width == 16:
+            mem[(addr + 1) & Channel.address_mask[space]] = (value >> 8) & 0xff
+
+    # Returns (space, address) of a memory operand; suffix is '' for
+    # the first memory operand of an instruction, '2' for the second.
+    # size is the operand size in bytes, by which [ptr+ix+] increments IX.
+    def effective_address(self, fields, suffix, size):
+        m = fields['m' + suffix]
+        if m == 3:
+            space = Channel.SYSTEM
+            base = self.pp
+        else:
+            space = self.tags[m]
+            base = self.regs[m]
+        mode = fields.get('a' + suffix, 1)
+        if mode == 1:
+            base += fields['o' + suffix]
+        elif mode >= 2:
+            base += self.regs[Channel.IX]
+            if mode == 3:
+                self.regs[Channel.IX] = (self.regs[Channel.IX] + size) & 0xffff
+        return space, base & Channel.address_mask[space]
+
+    def load_pointer(self, space, addr):
+        mask = Channel.address_mask[space]
+        b2 = self.space[space][(addr + 2) & mask]
+        value = self.load(space, addr, 16) | ((b2 & 0xf0) << 12)
+        return value, (b2 >> 3) & 1
+
+    def store_pointer(self, space, addr, value, tag):
+        self.store(space, addr, 16, value)
+        self.space[space][(addr + 2) & Channel.address_mask[space]] = ((value >> 12) & 0xf0) | (tag << 3)
+
+
+    # register access
+
+    # loads a register as by MOV, sign extending a byte
+    def set_reg(self, r, value, width):
+        if width == 8:
+            value = Channel.sign_extend_8(value & 0xff) & 0xffff
+        if r in Channel.pointer_regs:
+            self.regs[r] = Channel.sign_extend_16(value) & 0xfffff
+            self.tags[r] = Channel.IO
+        else:
+            self.regs[r] = value & 0xffff
+
+    def set_pointer(self, r, value, tag):
+        self.regs[r] = value & Channel.address_mask[tag]
+        self.tags[r] = tag
+
+    def reg_arith(self, r, operand, width):
+        if width == 8:
+            operand = Channel.sign_extend_8(operand & 0xff)
+        else:
+            operand = Channel.sign_extend_16(operand & 0xffff)
+        if r in Channel.pointer_regs:
+            self.regs[r] = (self.regs[r] + operand) & Channel.address_mask[self.tags[r]]
+        else:
+            self.regs[r] = (self.regs[r] + operand) & 0xffff
+
+    def reg_logic(self, r, value):
+        self.regs[r] = value & 0xffff
+
+
+    # operand evaluation
+
+    # Returns a location for operand i of the form: ('r', reg) or
+    # ('m', space, addr).
+    def location(self, d, i):
+        ot = d.form.operands[i]
+        if ot == OT.reg:
+            return ('r', d.fields['r'])
+        if ot == OT.preg:
+            return ('r', d.fields['p'])
+        if ot in (OT.mem, OT.memo):
+            return ('m',) + self.effective_address(d.fields, '', d.width // 8)
+        if ot in (OT.mem2, OT.memo2):
+            return ('m',) + self.effective_address(d.fields, '2', d.width // 8)
+        raise NotImplementedError('operand type ' + str(ot))
+
+    def read(self, loc, width):
+        if loc[0] == 'r':
+            return self.regs[loc[1]]
+        return self.load(loc[1], loc[2], width)
+
+    # source operand value: register, memory, or immediate
+    def source(self, d, i):
+        if d.form.operands[i] == OT.imm:
+            return d.fields['i']
+        return self.read(self.location(d, i), d.width)
+
+    def branch(self, d):
+        # The decoder computes a 16-bit target from the address of the
+        # instruction; recover the displacement from it, since TP may
+        # be a 20-bit address.
+        tp = self.regs[Channel.TP]
+        disp = Channel.sign_extend_16((d.fields['j'] - tp) & 0xffff)
+        self.regs[Channel.TP] = (tp + disp) & Channel.address_mask[self.tags[Channel.TP]]
+
+
+    # instruction decoding
+
+    # A predecoded instruction: the handler, and the fields extracted
+    # from the instruction by the decoder.
+    class Decoded:
+        __slots__ = ('length', 'handler', 'op', 'form', 'fields', 'width')
+
+        def __init__(self, length, handler, op, fields, width):
+            self.length  = length
+            self.handler = handler
+            self.op      = op
+            self.form    = op.forms[0]
+            self.fields  = fields
+            self.width   = width
+
+    # longest instruction, in bytes
+    max_inst_length = 6
+
+    # Decodes the instruction at address tp in space, and adds it to the
+    # decode cache, from which it is removed by the write hook if any of
+    # its bytes are written.
+    def predecode(self, space, tp):
+        try:
+            length, op, fields = self.i89.opcode_search(self.space[space], tp)
+        except I89.BadInstruction:
+            raise Channel.BadInstruction(self, tp)
+        width = 8 if op.mnem in Channel.byte_mnemonics else 16
+        d = Channel.Decoded(length, self.handlers[op.mnem], op, fields, width)
+        self.decode_cache[space][tp] = d
+        self.decoded_map[space][tp:tp+length] = b'\x01' * length
+        return d
+
+    # write hook: removes cached instructions overlapping the addresses
+    # from start up to but not including stop
+    def invalidate(self, space, start, stop):
+        cache = self.decode_cache[space]
+        if not cache or self.decoded_map[space].find(1, start, stop) < 0:
+            return
+        if stop - start < 64:
+            for addr in range(start - (Channel.max_inst_length - 1), stop):
+                cache.pop(addr, None)
+        else:
+            for addr in [addr for addr, d in cache.items()
+                         if addr < stop and addr + d.length > start]:
+                del cache[addr]
+
+    # removes the write hooks, for a Channel that is no longer in use
+    def detach(self):
+        for space in (Channel.SYSTEM, Channel.IO):
+            self.space[space].remove_write_hook(self.write_hooks[space])
+
+
+    # instruction execution
+
+    def step(self):
+        if self.halted:
+            raise Channel.Halted(self)
+        tp = self.regs[Channel.TP]
+        space = self.tags[Channel.TP]
+        xfer_pending = self.xfer_pending
+        try:
+            d = self.decode_cache[space].get(tp)
+            if d is None:
+                d = self.predecode(space, tp)
+            self.regs[Channel.TP] = (tp + d.length) & Channel.address_mask[space]
+            d.handler(d)
+        except (Memory.Uninitialized, IndexError):
+            raise Channel.MemoryFault(self, tp)
+        self.instruction_count += 1
+        if xfer_pending:
+            self.xfer_pending = False
+            self.transfer()
+
+    # Runs until the channel halts, or max_steps instructions have been
+    # executed.  Returns the number of instructions executed.
+    def run(self, max_steps = None):
+        count = 0
+        while not self.halted and (max_steps is None or count < max_steps):
+            self.step()
+            count += 1
+        return count
+
+
+    # DMA transfers
+    #
+    # After XFER and the instruction following it, the channel transfers
+    # data as set up by the CC register:
+    #   bits 15-14  F    function: bit 14 set if the source is memory,
+    #                    bit 15 if the destination is; a memory address
+    #                    is incremented after each access, a port
+    #                    address is not
+    #   bit 13      TR   translate each byte through the table at GC
+    #   bits 12-11  SYN  synchronization (not simulated)
+    #   bit 10      S    source is GB and destination GA, rather than
+    #                    the reverse
+    #   bit 7       TS   terminate after a single transfer cycle
+    #   bits 6-5    TX   terminate on external signal
+    #   bits 4-3    TBC  terminate when BC reaches zero
+    #   bits 2-0    TMC  terminate on masked compare with MC; bit 2
+    #                    selects termination on mismatch rather than match
+    # A nonzero TX, TBC, or TMC field (low two bits) of 1, 2, or 3 gives
+    # the offset, 0, 4, or 8, added to TP to resume the channel program
+    # when that condition terminates the transfer.  WID sets the source
+    # and destination widths; BC is decremented by each byte
+    # transferred.
+    #
+    # A transfer terminated only by byte count or single transfer is
+    # done all at once, as a slice copy between memories, reading or
+    # writing a port with a single read_port() or write_port() of its
+    # Memory.  The DMA
+    # engine otherwise runs one transfer cycle, of the larger of the two
+    # widths, at a time, checking the termination conditions after each.
+    # The masked compare applies to each byte transferred, after
+    # translation.  Transfers are done as part of the instruction
+    # that starts them, so take no simulated time.
+
+    CC_SOURCE_MEMORY = 0x4000
+    CC_DEST_MEMORY   = 0x8000
+    CC_TRANSLATE     = 0x2000
+    CC_SOURCE_GB     = 0x0400
+    CC_SINGLE        = 0x0080
+
+    # termination offset codes -> TP offset
+    termination_offset = (None, 0, 4, 8)
+
+    def transfer(self):
+        cc = self.regs[Channel.CC]
+        tx = (cc >> 5) & 3
+        tbc = (cc >> 3) & 3
+        tmc = cc & 7
+        single = cc & Channel.CC_SINGLE
+        if not (single or tx or tbc or tmc & 3):
+            raise Channel.DMAError(self, 'DMA transfer has no termination condition')
+        if tx and self.external_termination is None and not (single or tbc or tmc & 3):
+            raise Channel.DMAError(self, 'DMA transfer terminates only on external signal, which is not connected')
+        table = None
+        if cc & Channel.CC_TRANSLATE:
+            space = self.tags[Channel.GC]
+            table = bytes(self.space[space].view(self.regs[Channel.GC],
+                                                 self.regs[Channel.GC] + 256))
+        self.dma_count += 1
+        offset = None
+        if not (tx or tmc & 3):
+            offset = self.bulk_transfer(cc, table)
+        if offset is None:
+            offset = self.stepped_transfer(cc, table)
+        tp_tag = self.tags[Channel.TP]
+        self.regs[Channel.TP] = (self.regs[Channel.TP] + offset) & Channel.address_mask[tp_tag]
+
+    # Returns (source register, destination register, source increment,
+    # destination increment) for a transfer.
+    @staticmethod
+    def transfer_pointers(cc):
+        if cc & Channel.CC_SOURCE_GB:
+            src, dst = Channel.GB, Channel.GA
+        else:
+            src, dst = Channel.GA, Channel.GB
+        return (src, dst, (cc & Channel.CC_SOURCE_MEMORY) != 0,
+                (cc & Channel.CC_DEST_MEMORY) != 0)
+
+    def advance_pointer(self, r, count):
+        self.regs[r] = (self.regs[r] + count) & Channel.address_mask[self.tags[r]]
+
+    # Transfers BC bytes (or a single cycle) with slice copies, and
+    # returns the TP offset, or returns None if the transfer doesn't
+    # fit within the address spaces without wrapping around, or its
+    # source and destination overlap in a way that depends on the
+    # order of the cycles.
+    def bulk_transfer(self, cc, table):
+        src, dst, src_memory, dst_memory = Channel.transfer_pointers(cc)
+        sw = self.source_width // 8
+        dw = self.dest_width // 8
+        tbc = (cc >> 3) & 3
+        count = self.regs[Channel.BC] or 0x10000
+        offset = Channel.termination_offset[tbc]
+        if cc & Channel.CC_SINGLE and (not tbc or count > max(sw, dw)):
+            count = max(sw, dw)
+            offset = 0
+        smem = self.space[self.tags[src]]
+        dmem = self.space[self.tags[dst]]
+        sa = self.regs[src]
+        da = self.regs[dst]
+        if src_memory:
+            if sa + count > len(smem):
+                return None
+            if smem is dmem and dst_memory and sa < da < sa + count:
+                # each cycle reads a byte written by an earlier cycle,
+                # so the data repeats with a period of da - sa bytes
+                if table is not None:
+                    return None
+                period = bytes(smem.view(sa, da))
+                data = (period * (count // len(period) + 1))[:count]
+            else:
+                data = smem.view(sa, sa + count)
+        else:
+            data = smem.read_port(sa, count, sw)
+        if table is not None:
+            data = bytes(data).translate(table)
+        if dst_memory:
+            if da + count > len(dmem):
+                return None
+            dmem[da:da+count] = data
+        else:
+            dmem.write_port(da, data[:count], dw)
+        if src_memory:
+            self.advance_pointer(src, count)
+        if dst_memory:
+            self.advance_pointer(dst, count)
+        self.regs[Channel.BC] = (self.regs[Channel.BC] - count) & 0xffff
+        self.bytes_transferred += count
+        return offset
+
+    # Transfers one cycle at a time until a termination condition is
+    # met, and returns the TP offset.
+    def stepped_transfer(self, cc, table):
+        src, dst, src_memory, dst_memory = Channel.transfer_pointers(cc)
+        sw = self.source_width // 8
+        dw = self.dest_width // 8
+        cycle = max(sw, dw)
+        tx = (cc >> 5) & 3
+        tbc = (cc >> 3) & 3
+        tmc = cc & 7
+        mc = self.regs[Channel.MC]
+        while True:
+            count = cycle
+            if tbc:
+                count = min(count, self.regs[Channel.BC] or 0x10000)
+            data = bytearray()
+            while len(data) < count:
+                width = min(sw, count - len(data))
+                data += self.load(self.tags[src], self.regs[src], width * 8).to_bytes(width, 'little')
+                if src_memory:
+                    self.advance_pointer(src, width)
+            if table is not None:
+                data = data.translate(table)
+            done = 0
+            while done < count:
+                width = min(dw, count - done)
+                self.store(self.tags[dst], self.regs[dst], width * 8,
+                           int.from_bytes(data[done:done+width], 'little'))
+                if dst_memory:
+                    self.advance_pointer(dst, width)
+                done += width
+            self.regs[Channel.BC] = (self.regs[Channel.BC] - count) & 0xffff
+            self.bytes_transferred += count
+            if tbc and self.regs[Channel.BC] == 0:
+                return Channel.termination_offset[tbc]
+            if tmc & 3:
+                match = any(((b ^ mc) & (mc >> 8)) == 0 for b in data)
+                if match != bool(tmc & 4):
+                    return Channel.termination_offset[tmc & 3]
+            if tx and self.external_termination is not None and self.external_termination(self):
+                return Channel.termination_offset[tx]
+            if cc & Channel.CC_SINGLE:
+                return 0
+
+
+    def op_jmp(self, d):
+        self.branch(d)
+
+    def op_mov(self, d):
+        value = self.source(d, 1)
+        dest = self.location(d, 0)
+        if dest[0] == 'r':
+            self.set_reg(dest[1], value, d.width)
+        else:
+            self.store(dest[1], dest[2], d.width, value)
+
+    def op_movp(self, d):
+        p = d.fields['p']
+        space, addr = self.effective_address(d.fields, '', 3)
+        if d.form.operands[0] == OT.preg:
+            self.set_pointer(p, *self.load_pointer(space, addr))
+        else:
+            self.store_pointer(space, addr, self.regs[p], self.tags[p])
+
+    def op_lpd(self, d):
+        space, addr = self.effective_address(d.fields, '', 4)
+        offset = self.load(space, addr, 16)
+        segment = self.load(space, (addr + 2) & Channel.address_mask[space], 16)
+        self.set_pointer(d.fields['p'], (segment << 4) + offset, Channel.SYSTEM)
+
+    def op_lpdi(self, d):
+        self.set_pointer(d.fields['p'], (d.fields['s'] << 4) + d.fields['i'], Channel.SYSTEM)
+
+    # two-operand arithmetic and logic; fn combines the destination and
+    # source values
+    def alu(self, d, fn, logic):
+        width = d.width
+        value = self.source(d, 1)
+        dest = self.location(d, 0)
+        if dest[0] == 'r':
+            r = dest[1]
+            if logic:
+                if width == 8:
+                    value = Channel.sign_extend_8(value & 0xff)
+                self.reg_logic(r, fn(self.regs[r], value))
+            else:
+                self.reg_arith(r, value, width)
+        else:
+            self.store(dest[1], dest[2], width, fn(self.load(dest[1], dest[2], width), value))
+
+    def op_add(self, d):
+        self.alu(d, lambda a, b: a + b, False)
+
+    def op_and(self, d):
+        self.alu(d, lambda a, b: a & b, True)
+
+    def op_or(self, d):
+        self.alu(d, lambda a, b: a | b, True)
+
+    def incdec(self, d, delta):
+        dest = self.location(d, 0)
+        if dest[0] == 'r':
+            self.reg_arith(dest[1], delta, 16)
+        else:
+            self.store(dest[1], dest[2], d.width, self.load(dest[1], dest[2], d.width) + delta)
+
+    def op_inc(self, d):
+        self.incdec(d, 1)
+
+    def op_dec(self, d):
+        self.incdec(d, -1)
+
+    def op_not(self, d):
+        width = d.width
+        if len(d.form.operands) == 2:
+            value = self.source(d, 1)
+            dest = self.location(d, 0)
+        else:
+            dest = self.location(d, 0)
+            value = self.read(dest, width)
+        if dest[0] == 'r':
+            if width == 8:
+                value = Channel.sign_extend_8(value & 0xff)
+            self.reg_logic(dest[1], ~value)
+        else:
+            self.store(dest[1], dest[2], width, ~value)
+
+    def op_setb(self, d):
+        space, addr = self.effective_address(d.fields, '', 1)
+        self.store(space, addr, 8, self.load(space, addr, 8) | (1 << d.fields['b']))
+
+    def op_clr(self, d):
+        space, addr = self.effective_address(d.fields, '', 1)
+        self.store(space, addr, 8, self.load(space, addr, 8) & ~(1 << d.fields['b']))
+
+    def op_call(self, d):
+        space, addr = self.effective_address(d.fields, '', 3)
+        self.store_pointer(space, addr, self.regs[Channel.TP], self.tags[Channel.TP])
+        self.branch(d)
+
+    # value of the operand tested by a conditional branch
+    def tested(self, d):
+        if d.form.operands[0] == OT.reg:
+            return self.regs[d.fields['r']] & 0xffff
+        return self.read(self.location(d, 0), d.width)
+
+    def op_jz(self, d):
+        if self.tested(d) == 0:
+            self.branch(d)
+
+    def op_jnz(self, d):
+        if self.tested(d) != 0:
+            self.branch(d)
+
+    # MC holds the compare value in its low byte, and the mask in its
+    # high byte
+    def masked_compare(self, d):
+        mc = self.regs[Channel.MC]
+        return ((self.tested(d) ^ mc) & (mc >> 8)) == 0
+
+    def op_jmce(self, d):
+        if self.masked_compare(d):
+            self.branch(d)
+
+    def op_jmcne(self, d):
+        if not self.masked_compare(d):
+            self.branch(d)
+
+    def op_jbt(self, d):
+        if self.tested(d) & (1 << d.fields['b']):
+            self.branch(d)
+
+    def op_jnbt(self, d):
+        if not self.tested(d) & (1 << d.fields['b']):
+            self.branch(d)
+
+    # test and set lock: if the byte is zero, set it to the immediate
+    # value and continue, otherwise branch
+    def op_tsl(self, d):
+        space, addr = self.effective_address(d.fields, '', 1)
+        if self.load(space, addr, 8) == 0:
+            self.store(space, addr, 8, d.fields['i'])
+        else:
+            self.branch(d)
+
+    def op_wid(self, d):
+        self.source_width = (8, 16)[d.fields['s']]
+        self.dest_width = (8, 16)[d.fields['d']]
+
+    def op_xfer(self, d):
+        self.xfer_pending = True
+
+    def op_sintr(self, d):
+        self.interrupt = True
+
+    def op_hlt(self, d):
+        self.halted = True
+
+    def op_nop(self, d):
+        pass
@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+# Code coverage map of simulated 8089 channel programs
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# A CoverageMap has a bitmap for each space, with a bit for each
+# address that is the start of an executed instruction.  Maps of
+# several runs are combined by ORing their bitmaps.
+#
+# A CoveringChannel sets the bit of an instruction when it completes,
+# so an instruction that faults, or that was decoded but not reached, is
+# not counted.  With block translation, a translated block is wrapped
+# by a function that marks the instructions it completed, until all of
+# them have been marked, after which the block runs unwrapped, so that
+# coverage costs almost nothing.
+#
+# A coverage file has a header followed, for each space, by the size of
+# the bitmap in bytes and the bitmap, with the bit for address a in
+# bit a % 8 of byte a // 8.
+
+import re
+import struct
+
+from channel import Channel
+
+
+class CoverageMap:
+
+    class BadFormat(Exception):
+        pass
+
+    header = struct.Struct('<4sH')
+    space_header = struct.Struct('<I')
+    magic = b'I89C'
+    version = 1
+
+    nonzero = re.compile(b'[^\x00]')
+
+    def __init__(self, sizes = (0x100000, 0x10000)):
+        self.bits = tuple(bytearray((size + 7) // 8) for size in sizes)
+
+    def mark(self, space, addr):
+        self.bits[space][addr >> 3] |= 1 << (addr & 7)
+
+    def executed(self, space, addr):
+        return self.bits[space][addr >> 3] & (1 << (addr & 7)) != 0
+
+    # Returns the set of the addresses executed in space.
+    def addresses(self, space):
+        bits = self.bits[space]
+        result = set()
+        for m in CoverageMap.nonzero.finditer(bits):
+            i = m.start()
+            byte = bits[i]
+            for b in range(8):
+                if byte & (1 << b):
+                    result.add((i << 3) + b)
+        return result
+
+    # number of addresses executed in space
+    def count(self, space):
+        return bin(int.from_bytes(self.bits[space], 'little')).count('1')
+
+    # ORs the bitmaps of another map into this one
+    def merge(self, other):
+        for bits, other_bits in zip(self.bits, other.bits):
+            if len(bits) != len(other_bits):
+                raise CoverageMap.BadFormat('coverage maps of different sizes')
+            merged = int.from_bytes(bits, 'little') | int.from_bytes(other_bits, 'little')
+            bits[:] = merged.to_bytes(len(bits), 'little')
+
+    def write(self, f):
+        f.write(CoverageMap.header.pack(CoverageMap.magic, CoverageMap.version))
+        for bits in self.bits:
+            f.write(CoverageMap.space_header.pack(len(bits)))
+            f.write(bits)
+
+    @staticmethod
+    def read(f):
+        def read_bytes(n):
+            data = f.read(n)
+            if len(data) != n:
+                raise CoverageMap.BadFormat('truncated coverage map')
+            return data
+        magic, version = CoverageMap.header.unpack(read_bytes(CoverageMap.header.size))
+        if magic != CoverageMap.magic or version != CoverageMap.version:
+            raise CoverageMap.BadFormat('not a coverage map, or unsupported version')
+        cm = CoverageMap(sizes = (0, 0))
+        for bits in cm.bits:
+            size, = CoverageMap.space_header.unpack(read_bytes(CoverageMap.space_header.size))
+            bits[:] = read_bytes(size)
+        return cm
+
+
+# A Channel that records the instructions it executes in a CoverageMap,
+# which may be shared by several channels.  It can be combined with
+# other Channel subclasses, e.g. class C(CoveringChannel,
+# TranslatingChannel).
+class CoveringChannel(Channel):
+
+    def __init__(self, system, io = None, i89 = None, number = 0, coverage = None, **kwargs):
+        super().__init__(system, io, i89 = i89, number = number, **kwargs)
+        if coverage is None:
+            coverage = CoverageMap(sizes = (len(system), len(self.space[Channel.IO])))
+        self.coverage = coverage
+
+    def step(self):
+        tp = self.regs[Channel.TP]
+        space = self.tags[Channel.TP]
+        count = self.instruction_count
+        try:
+            super().step()
+        finally:
+            if self.instruction_count != count:
+                self.coverage.bits[space][tp >> 3] |= 1 << (tp & 7)
+
+    # for a TranslatingChannel: wraps the function of each new block
+    def translate(self, space, start):
+        blk = super().translate(space, start)
+        addrs = [ ]
+        addr = start
+        while addr < blk.end:
+            addrs.append(addr)
+            addr += self.decode_cache[space][addr].length
+        fn = blk.fn
+        marked = 0  # instructions marked, from the start of the block
+
+        # The block returns the number of instructions it executed, or
+        # on a fault adds them to instruction_count; either way, they
+        # include the first n instructions of the block.
+        def covering_fn(ch, budget):
+            nonlocal marked
+            count = ch.instruction_count
+            n = 0
+            try:
+                n = fn(ch, budget)
+                return n
+            finally:
+                done = min(n + ch.instruction_count - count, len(addrs))
+                if done > marked:
+                    bits = ch.coverage.bits[space]
+                    for addr in addrs[marked:done]:
+                        bits[addr >> 3] |= 1 << (addr & 7)
+                    marked = done
+                    if marked == len(addrs):
+                        blk.fn = fn
+        blk.fn = covering_fn
+        return blk
+
+
+if __name__ == '__main__':
+    import sys
+    cm = None
+    for fn in sys.argv[1:]:
+        with open(fn, 'rb') as f:
+            m = CoverageMap.read(f)
+        if cm is None:
+            cm = m
+        else:
+            cm.merge(m)
+    for space, name in ((Channel.SYSTEM, 'system'), (Channel.IO, 'I/O')):
+        print('%s: %d instructions executed' % (name, cm.count(space)))
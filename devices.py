@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+# I/O port devices for the Intel 8089 channel simulator
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# A DeviceMemory is a Memory in which ranges of addresses are the ports
+# of Devices rather than storage.  A byte read or write of a port
+# address, as done by instructions and by stepped DMA transfers, calls
+# the device's read() or write().  A bulk DMA transfer to or from a port
+# calls read_block() or write_block() once for the whole transfer, so a
+# device can supply or accept a block of data as a single slice.
+#
+# Slices of a DeviceMemory, and view(), give the underlying storage
+# even at port addresses; instructions aren't fetched from ports.
+# Writes to ports don't call the write hooks.
+#
+# A Device saves and restores its state, for a Snapshot, like a
+# Channel: get_state() copies the attributes listed in
+# state_attributes, which a device with state extends.
+
+from memory import Memory
+
+
+class Device:
+
+    # number of consecutive port addresses used by the device
+    ports = 1
+
+    state_attributes = ()
+
+    def get_state(self):
+        state = { }
+        for name in self.state_attributes:
+            value = getattr(self, name)
+            if isinstance(value, (list, bytearray)):
+                value = value[:]
+            state[name] = value
+        return state
+
+    def set_state(self, state):
+        for name, value in state.items():
+            if isinstance(value, (list, bytearray)):
+                value = value[:]
+            setattr(self, name, value)
+
+    def read(self, offset):
+        return 0xff
+
+    def write(self, offset, value):
+        pass
+
+    # Returns count bytes read from the port at offset, in accesses of
+    # width bytes.
+    def read_block(self, offset, count, width):
+        return bytes(self.read(offset + (i % width)) for i in range(count))
+
+    # Writes data to the port at offset, in accesses of width bytes.
+    def write_block(self, offset, data, width):
+        for i, value in enumerate(data):
+            self.write(offset + (i % width), value)
+
+
+class DeviceMemory(Memory):
+
+    class PortConflict(Exception):
+        pass
+
+    def __init__(self, data = None, size = None, write_once = False):
+        super().__init__(data = data, size = size, write_once = write_once)
+        self.devices = [ ]                  # (device, base address)
+        self.port_map = bytearray(self.size) # device index + 1, or 0
+
+    def attach(self, device, base):
+        if base < 0 or base + device.ports > self.size:
+            raise IndexError()
+        if any(self.port_map[base:base+device.ports]):
+            raise DeviceMemory.PortConflict('ports %04x-%04x are already in use' % (base, base + device.ports - 1))
+        self.devices.append((device, base))
+        self.port_map[base:base+device.ports] = bytes([len(self.devices)]) * device.ports
+
+    # Returns (device, base address) if address is a port, else None.
+    def device_at(self, address):
+        n = self.port_map[address]
+        if n:
+            return self.devices[n - 1]
+        return None
+
+    def __getitem__(self, address):
+        if not isinstance(address, slice):
+            n = self.port_map[address]  # can raise IndexError
+            if n:
+                device, base = self.devices[n - 1]
+                return device.read(address - base) & 0xff
+        return super().__getitem__(address)
+
+    def __setitem__(self, address, data):
+        if not isinstance(address, slice):
+            n = self.port_map[address]  # can raise IndexError
+            if n:
+                device, base = self.devices[n - 1]
+                device.write(address - base, data & 0xff)
+                return
+        super().__setitem__(address, data)
+
+    def read_port(self, address, count, width = 1):
+        n = self.port_map[address]
+        if n:
+            device, base = self.devices[n - 1]
+            return device.read_block(address - base, count, width)
+        return super().read_port(address, count, width)
+
+    def write_port(self, address, data, width = 1):
+        n = self.port_map[address]
+        if n:
+            device, base = self.devices[n - 1]
+            device.write_block(address - base, data, width)
+            return
+        super().write_port(address, data, width)
@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+# Execution profile of simulated 8089 channel programs
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# An ExecutionProfile counts, for each address of each space, the number
+# of times the instruction at that address was executed, and optionally
+# the clock cycles it used, in flat arrays indexed by address.  A
+# ProfilingChannel updates it as instructions execute; combined with a
+# TimedChannel it also counts cycles.
+#
+# A profile file has a header followed, for each space, by a count of
+# the addresses executed and a record of (address, count, cycles) for
+# each.  profi89 reports on profile files.
+
+from array import array
+import re
+import struct
+
+from channel import Channel
+
+
+class ExecutionProfile:
+
+    class BadFormat(Exception):
+        pass
+
+    header = struct.Struct('<4sHB')
+    space_header = struct.Struct('<I')
+    record = struct.Struct('<IQQ')
+    magic = b'I89P'
+    version = 1
+
+    nonzero = re.compile(b'[^\x00]')
+
+    def __init__(self, sizes = (0x100000, 0x10000), cycles = False):
+        self.counts = tuple(array('Q', bytes(8 * size)) for size in sizes)
+        if cycles:
+            self.cycles = tuple(array('Q', bytes(8 * size)) for size in sizes)
+        else:
+            self.cycles = None
+
+    # generates (address, count, cycles) for each address executed in
+    # space
+    def entries(self, space):
+        counts = self.counts[space]
+        cycles = self.cycles[space] if self.cycles is not None else None
+        # search the bytes of the array for nonzero counts
+        last = -1
+        for m in ExecutionProfile.nonzero.finditer(counts.tobytes()):
+            addr = m.start() >> 3
+            if addr != last:
+                last = addr
+                yield addr, counts[addr], cycles[addr] if cycles is not None else 0
+
+    def write(self, f):
+        f.write(ExecutionProfile.header.pack(ExecutionProfile.magic, ExecutionProfile.version,
+                                             self.cycles is not None))
+        for space in (Channel.SYSTEM, Channel.IO):
+            entries = list(self.entries(space))
+            f.write(ExecutionProfile.space_header.pack(len(entries)))
+            for entry in entries:
+                f.write(ExecutionProfile.record.pack(*entry))
+
+    @staticmethod
+    def read(f):
+        def read_struct(s):
+            data = f.read(s.size)
+            if len(data) != s.size:
+                raise ExecutionProfile.BadFormat('truncated profile')
+            return s.unpack(data)
+        magic, version, has_cycles = read_struct(ExecutionProfile.header)
+        if magic != ExecutionProfile.magic or version != ExecutionProfile.version:
+            raise ExecutionProfile.BadFormat('not a profile file, or unsupported version')
+        profile = ExecutionProfile(cycles = has_cycles)
+        for space in (Channel.SYSTEM, Channel.IO):
+            count, = read_struct(ExecutionProfile.space_header)
+            for i in range(count):
+                addr, n, cycles = read_struct(ExecutionProfile.record)
+                if addr >= len(profile.counts[space]):
+                    raise ExecutionProfile.BadFormat('address %05x out of range' % addr)
+                profile.counts[space][addr] = n
+                if has_cycles:
+                    profile.cycles[space][addr] = cycles
+        return profile
+
+
+# A Channel that counts the instructions it executes in an
+# ExecutionProfile, which may be shared by several channels.  It can be
+# combined with other Channel subclasses, e.g.
+# class C(ProfilingChannel, TimedChannel), to which it passes on the
+# other keyword arguments.  Pass the profile to share it, rather than
+# replacing the one allocated here, which is as large as the spaces.
+class ProfilingChannel(Channel):
+
+    def __init__(self, system, io = None, i89 = None, number = 0, profile = None, **kwargs):
+        super().__init__(system, io, i89 = i89, number = number, **kwargs)
+        if profile is None:
+            profile = ExecutionProfile(sizes = (len(system), len(self.space[Channel.IO])),
+                                       cycles = 'cycles' in self.state_attributes)
+        self.profile = profile
+
+    def step(self):
+        tp = self.regs[Channel.TP]
+        space = self.tags[Channel.TP]
+        cycles = self.profile.cycles
+        if cycles is None:
+            super().step()
+        else:
+            before = self.cycles
+            super().step()
+            cycles[space][tp] += self.cycles - before
+        self.profile.counts[space][tp] += 1
@@ -42,6 +42,9 @@ class ExpressionParser:
         def eval(self, symtab):
             return self.value
 
+        def symbols(self):
+            return set()
+
         def __str__(self):
             return str(self.value)
 
@@ -54,6 +57,9 @@ class ExpressionParser:
                 raise ExpressionParser.UndefinedSymbol(self.identifier)
             return symtab[self.identifier]
 
+        def symbols(self):
+            return { self.identifier }
+
         def __str__(self):
             return self.identifier
 
@@ -75,6 +81,16 @@ class ExpressionParser:
                 op1 = self.op1
             return self.fn(op1)
 
+        def symbols(self):
+            return self.op1.symbols()
+
+        # the operator function is a lambda, which can't be pickled
+        def __getstate__(self):
+            return (self.name, self.op1)
+
+        def __setstate__(self, state):
+            self.__init__(*state)
+
         def __str__(self):
             return str(self.op1) + ' u' + self.name
 
@@ -107,6 +123,16 @@ class ExpressionParser:
                 op2 = self.op2
             return self.fn(op1, op2)
 
+        def symbols(self):
+            return self.op1.symbols() | self.op2.symbols()
+
+        # the operator function is a lambda, which can't be pickled
+        def __getstate__(self):
+            return (self.name, self.op1, self.op2)
+
+        def __setstate__(self, state):
+            self.__init__(*state)
+
         def __str__(self):
             return str(self.op1) + ' ' + str(self.op2) + ' ' + self.name
 
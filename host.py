@@ -0,0 +1,237 @@
+#!/usr/bin/python3
+# Host processor model for driving the Intel 8089 simulator
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# A Host does what the 8086 host's driver does to use an IOP: it builds
+# the system configuration block, channel control block, and parameter
+# blocks (described in iop.py) in system memory, issues channel
+# attentions, and waits for each command to complete, either by polling
+# the BUSY flag of the channel or for its SINTR interrupt.  For
+# example:
+#
+#     host = Host(iop)
+#     host.initialize()
+#     results = host.run_batch([Command(0x100, params = b'\x01\x00')] * 100)
+#
+# Between channel attentions the Host runs the IOP in slices of
+# poll_steps instructions, and checks for the completion of each
+# outstanding command at the end of each slice, which is when the
+# command's completion is timed.
+#
+# When commands complete on SINTR, the channel program may still be
+# running, e.g. idling until its next command; the channel attention
+# for the next command then restarts it, as it would on the 8089.
+
+from channel import Channel
+from iop import IOP
+
+
+class Command:
+
+    # Starts the channel program at tp, in I/O space if io is set, with
+    # params following the program pointer in the parameter block.  icf
+    # is the interrupt control field of the CCW.
+    def __init__(self, tp, params = b'', channel = 0, io = False,
+                 priority = False, icf = 0):
+        self.tp = tp
+        self.params = bytes(params)
+        self.channel = channel
+        self.io = io
+        self.priority = priority
+        self.icf = icf
+
+    def ccw(self):
+        ccw = IOP.CF_START_IO if self.io else IOP.CF_START_SYSTEM
+        if self.priority:
+            ccw |= IOP.CCW_PRIORITY
+        return ccw | (self.icf << IOP.ICF_SHIFT)
+
+
+class CommandResult:
+
+    def __init__(self, command, instructions, cycles):
+        self.command = command
+        self.submitted = (instructions, cycles)
+        self.completed = None
+
+    # instructions executed by the IOP, on both channels, while the
+    # command was outstanding
+    @property
+    def instructions(self):
+        return self.completed[0] - self.submitted[0]
+
+    # clock cycles likewise, if the channels count them, else None
+    @property
+    def cycles(self):
+        if self.submitted[1] is None:
+            return None
+        return self.completed[1] - self.submitted[1]
+
+
+class Host:
+
+    class Timeout(Exception):
+        pass
+
+    class Busy(Exception):
+        pass
+
+    # scb is the address of the SCB, which is followed by the CB; pb
+    # gives the address of the parameter block of each channel.
+    # sysbus and soc are written to the SYSBUS and SOC bytes.  With
+    # interrupt set, commands complete on SINTR rather than when BUSY
+    # is cleared.
+    def __init__(self, iop, scb = 0x500, pb = (0x540, 0x580),
+                 sysbus = 1, soc = 0, interrupt = False, poll_steps = None):
+        self.iop = iop
+        self.memory = iop.space[Channel.SYSTEM]
+        self.scb = scb
+        self.cb = scb + 0x10
+        self.pb = pb
+        self.sysbus = sysbus
+        self.soc = soc
+        self.interrupt = interrupt
+        self.poll_steps = poll_steps or iop.quantum
+        self.outstanding = [None, None]  # CommandResult, by channel
+        self.interrupt_marks = [0, 0]    # len(iop.interrupts) at submit
+
+    def write_word(self, addr, value):
+        self.memory[addr:addr+2] = value.to_bytes(2, 'little')
+
+    # writes an 8086 pointer to physical address value
+    def write_pointer(self, addr, value):
+        self.write_word(addr, value & 0xf)
+        self.write_word(addr + 2, value >> 4)
+
+    def cycles(self):
+        if not hasattr(self.iop.channels[0], 'cycles'):
+            return None
+        return sum(channel.cycles for channel in self.iop.channels)
+
+    def busy(self, channel):
+        return self.memory[self.cb + IOP.CB_SIZE * channel + 1] != 0
+
+    # Writes the SCB and CB, and initializes the IOP with a channel
+    # attention.
+    def initialize(self, channel = 0):
+        memory = self.memory
+        memory[IOP.SYSBUS_ADDRESS] = self.sysbus
+        self.write_pointer(IOP.SCB_POINTER, self.scb)
+        memory[self.scb:self.scb+2] = bytes([self.soc, 0])
+        self.write_pointer(self.scb + 2, self.cb)
+        memory[self.cb:self.cb+2*IOP.CB_SIZE] = bytes(2 * IOP.CB_SIZE)
+        for number in (0, 1):
+            self.write_pointer(self.cb + IOP.CB_SIZE * number + 2, self.pb[number])
+        memory[self.cb + IOP.CB_SIZE * channel + 1] = IOP.BUSY
+        self.iop.channel_attention(channel)
+        if self.busy(channel):
+            raise Host.Timeout('IOP did not initialize')
+
+    # True if a command can't be submitted to the channel yet: one is
+    # outstanding, or, unless commands complete on SINTR, the channel
+    # is busy.
+    def pending(self, number):
+        if self.outstanding[number] is not None:
+            return True
+        return not self.interrupt and self.busy(number)
+
+    # Writes the parameter block and CCW of a command, and issues a
+    # channel attention.  The channel must not be pending.
+    def submit(self, command):
+        number = command.channel
+        if self.pending(number):
+            raise Host.Busy('channel %d is busy' % number)
+        pb = self.pb[number]
+        if command.io:
+            self.write_word(pb, command.tp)
+            self.write_word(pb + 2, 0)
+        else:
+            self.write_pointer(pb, command.tp)
+        if command.params:
+            self.memory[pb+4:pb+4+len(command.params)] = command.params
+        cb = self.cb + IOP.CB_SIZE * number
+        self.memory[cb] = command.ccw()
+        result = CommandResult(command, self.iop.instruction_count, self.cycles())
+        self.outstanding[number] = result
+        self.interrupt_marks[number] = len(self.iop.interrupts)
+        self.iop.channel_attention(number)
+        return result
+
+    def complete(self, number):
+        if self.interrupt:
+            return any(n == number for count, n in self.iop.interrupts[self.interrupt_marks[number]:])
+        return not self.busy(number)
+
+    # Runs the IOP for a slice, and records the completion of
+    # outstanding commands.  Returns the number of instructions
+    # executed.
+    def step(self):
+        n = self.iop.run(self.poll_steps)
+        for number, result in enumerate(self.outstanding):
+            if result is not None and self.complete(number):
+                result.completed = (self.iop.instruction_count, self.cycles())
+                self.outstanding[number] = None
+        return n
+
+    # Waits until the command outstanding on a channel, if any, has
+    # completed, and, unless commands complete on SINTR, the channel is
+    # no longer busy.  Raises Timeout if the IOP stops without
+    # completing it, or after max_steps instructions.
+    def wait(self, channel = 0, max_steps = None):
+        count = 0
+        while self.pending(channel):
+            if max_steps is not None and count >= max_steps:
+                raise Host.Timeout('channel %d: no completion after %d instructions' % (channel, count))
+            n = self.step()
+            if n == 0:
+                raise Host.Timeout('channel %d: halted without completing its command' % channel)
+            count += n
+        return count
+
+    # Submits commands back to back, each as soon as its channel is
+    # free, and waits for the last to complete.  Returns a list of
+    # CommandResult.
+    def run_batch(self, commands, max_steps = None):
+        results = [ ]
+        for command in commands:
+            self.wait(command.channel, max_steps)
+            results.append(self.submit(command))
+        for number in (0, 1):
+            self.wait(number, max_steps)
+        return results
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    from intelhex import IntelHex
+    from memory import Memory
+    from timing import TimedChannel
+    # host.py image.hex tp [count]: runs the channel program at tp
+    # count times, and reports the command rate
+    system = Memory(data = bytes(0x100000), write_once = False)
+    with open(sys.argv[1], 'rb') as f:
+        IntelHex().read(f, memory = system)
+    count = int(sys.argv[3], 0) if len(sys.argv) > 3 else 100
+    iop = IOP(system, channel_class = TimedChannel)
+    host = Host(iop)
+    host.initialize()
+    start = time.time()
+    results = host.run_batch([Command(int(sys.argv[2], 0))] * count)
+    elapsed = time.time() - start
+    cycles = sum(result.cycles for result in results)
+    seconds = iop.channels[0].timing.seconds(cycles)
+    print('%d commands, %d cycles, %.1f commands per simulated second, %.1f per second' %
+          (count, cycles, count / seconds if seconds else 0, count / elapsed))
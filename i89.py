@@ -129,14 +129,28 @@ class Form:
             print('fields after:', fields)
         return bits, mask, fields
 
-    def __init__(self, operands, encoding):
+    def __init__(self, operands, encoding, cycles = 0):
         self.operands = operands
         self.encoding = encoding
+        self.cycles = cycles
         self.bits, self.mask, self.fields = Form.__encoding_parse(encoding)
 
     def __len__(self):
         return len(self.bits)
 
+    # Returns (byte offset, width in bits) of a field that occupies whole
+    # contiguous bytes of the instruction, least significant byte first,
+    # or None if the field isn't byte aligned.
+    def field_location(self, name):
+        bitfield = self.fields[name]
+        if bitfield.width % 8:
+            return None
+        count = bitfield.width // 8
+        first = next(i for i in range(len(bitfield.mask)) if bitfield.mask[i])
+        if any(m != 0xff for m in bitfield.mask[first:first+count]):
+            return None
+        return first, bitfield.width
+
     def insert_fields(self, fields):
         bits = bytearray(self.bits)
         assert set(self.fields.keys()) == set(fields.keys())
@@ -170,205 +184,210 @@ class I89:
 
     # Follows Intel ASM89 assembler convention for operand ordering.
     # The destination operand precedes the source operand(s).
+    #
+    # The last argument of each form is its execution time in clocks,
+    # excluding bus cycles to fetch the instruction and access memory
+    # operands, and addressing mode and taken branch penalties; these
+    # are added by the timing model (see timing.py).
     __inst_set = [
         # JMP is ADDBI with rrr=100 (TP), put earlier than ADDBI in table
-        Inst('jmp',   Form((OT.jmp,)          , '10001000 00100000 jjjjjjjj')),
+        Inst('jmp',   Form((OT.jmp,)          , '10001000 00100000 jjjjjjjj', 3)),
 
         # LJMP is ADDI with rrr=100 (TP), put earlier than ADDI in table
-        Inst('ljmp',  Form((OT.jmp,)          , '10010001 00100000 jjjjjjjj jjjjjjjj')),
-
-        Inst('mov',   Form((OT.reg,  OT.memo) , 'rrr00011 100000mm oooooooo'),
-                      Form((OT.reg,  OT.mem)  , 'rrr00aa1 100000mm'),
-                      Form((OT.memo, OT.reg)  , 'rrr00011 100001mm oooooooo'),
-                      Form((OT.mem,  OT.reg)  , 'rrr00aa1 100001mm'),
-                      Form((OT.memo2,OT.memo) , '00000011 100100mm oooooooo/00000011 110011mm oooooooo'),
-                      Form((OT.mem2, OT.memo) , '00000011 100100mm oooooooo/00000aa1 110011mm'),
-                      Form((OT.memo2,OT.mem)  , '00000aa1 100100mm/00000011 110011mm oooooooo'),
-                      Form((OT.mem2, OT.mem)  , '00000aa1 100100mm/00000aa1 110011mm')),
-
-        Inst('movb',  Form((OT.reg,  OT.memo) , 'rrr00010 100000mm oooooooo'),
-                      Form((OT.reg,  OT.mem)  , 'rrr00aa0 100000mm'),
-                      Form((OT.memo, OT.reg)  , 'rrr00010 100001mm oooooooo'),
-                      Form((OT.mem,  OT.reg)  , 'rrr00aa0 100001mm'),
-                      Form((OT.memo2,OT.memo) , '00000010 100100mm oooooooo/00000010 110011mm oooooooo'),
-                      Form((OT.mem2, OT.memo) , '00000010 100100mm oooooooo/00000aa0 110011mm'),
-                      Form((OT.memo2,OT.mem)  , '00000aa0 100100mm/00000010 110011mm oooooooo'),
-                      Form((OT.mem2, OT.mem)  , '00000aa0 100100mm/00000aa0 110011mm')),
-
-        Inst('movbi', Form((OT.reg,  OT.imm)  , 'rrr01000 00110000 iiiiiiii'),
-                      Form((OT.memo, OT.imm)  , '00001010 010011mm oooooooo iiiiiiii'),
-                      Form((OT.mem,  OT.imm)  , '00001aa0 010011mm iiiiiiii')),
-
-        Inst('movi',  Form((OT.reg,  OT.imm)  , 'rrr10001 00110000 iiiiiiii iiiiiiii'),
-                      Form((OT.memo, OT.imm)  , '00010011 010011mm oooooooo iiiiiiii iiiiiiii'),
-                      Form((OT.mem,  OT.imm)  , '00010aa1 010011mm iiiiiiii iiiiiiii')),
-
-        Inst('movp',  Form((OT.preg, OT.memo) , 'ppp00011 100011mm oooooooo'),
-                      Form((OT.preg, OT.mem)  , 'ppp00aa1 100011mm'),
-                      Form((OT.memo, OT.preg) , 'ppp00011 100110mm oooooooo'),
-                      Form((OT.mem,  OT.preg) , 'ppp00aa1 100110mm')),
-
-        Inst('lpd' ,  Form((OT.preg, OT.memo,), 'ppp00011 100010mm oooooooo'),
-                      Form((OT.preg, OT.mem,) , 'ppp00aa1 100010mm')),
+        Inst('ljmp',  Form((OT.jmp,)          , '10010001 00100000 jjjjjjjj jjjjjjjj', 3)),
+
+        Inst('mov',   Form((OT.reg,  OT.memo) , 'rrr00011 100000mm oooooooo', 3),
+                      Form((OT.reg,  OT.mem)  , 'rrr00aa1 100000mm', 3),
+                      Form((OT.memo, OT.reg)  , 'rrr00011 100001mm oooooooo', 3),
+                      Form((OT.mem,  OT.reg)  , 'rrr00aa1 100001mm', 3),
+                      Form((OT.memo2,OT.memo) , '00000011 100100mm oooooooo/00000011 110011mm oooooooo', 3),
+                      Form((OT.mem2, OT.memo) , '00000011 100100mm oooooooo/00000aa1 110011mm', 3),
+                      Form((OT.memo2,OT.mem)  , '00000aa1 100100mm/00000011 110011mm oooooooo', 3),
+                      Form((OT.mem2, OT.mem)  , '00000aa1 100100mm/00000aa1 110011mm', 3)),
+
+        Inst('movb',  Form((OT.reg,  OT.memo) , 'rrr00010 100000mm oooooooo', 3),
+                      Form((OT.reg,  OT.mem)  , 'rrr00aa0 100000mm', 3),
+                      Form((OT.memo, OT.reg)  , 'rrr00010 100001mm oooooooo', 3),
+                      Form((OT.mem,  OT.reg)  , 'rrr00aa0 100001mm', 3),
+                      Form((OT.memo2,OT.memo) , '00000010 100100mm oooooooo/00000010 110011mm oooooooo', 3),
+                      Form((OT.mem2, OT.memo) , '00000010 100100mm oooooooo/00000aa0 110011mm', 3),
+                      Form((OT.memo2,OT.mem)  , '00000aa0 100100mm/00000010 110011mm oooooooo', 3),
+                      Form((OT.mem2, OT.mem)  , '00000aa0 100100mm/00000aa0 110011mm', 3)),
+
+        Inst('movbi', Form((OT.reg,  OT.imm)  , 'rrr01000 00110000 iiiiiiii', 2),
+                      Form((OT.memo, OT.imm)  , '00001010 010011mm oooooooo iiiiiiii', 3),
+                      Form((OT.mem,  OT.imm)  , '00001aa0 010011mm iiiiiiii', 3)),
+
+        Inst('movi',  Form((OT.reg,  OT.imm)  , 'rrr10001 00110000 iiiiiiii iiiiiiii', 2),
+                      Form((OT.memo, OT.imm)  , '00010011 010011mm oooooooo iiiiiiii iiiiiiii', 3),
+                      Form((OT.mem,  OT.imm)  , '00010aa1 010011mm iiiiiiii iiiiiiii', 3)),
+
+        Inst('movp',  Form((OT.preg, OT.memo) , 'ppp00011 100011mm oooooooo', 3),
+                      Form((OT.preg, OT.mem)  , 'ppp00aa1 100011mm', 3),
+                      Form((OT.memo, OT.preg) , 'ppp00011 100110mm oooooooo', 3),
+                      Form((OT.mem,  OT.preg) , 'ppp00aa1 100110mm', 3)),
+
+        Inst('lpd' ,  Form((OT.preg, OT.memo,), 'ppp00011 100010mm oooooooo', 3),
+                      Form((OT.preg, OT.mem,) , 'ppp00aa1 100010mm', 3)),
     
-        Inst('lpdi',  Form((OT.preg, OT.i32)  , 'ppp10001 00001000 iiiiiiii iiiiiiii ssssssss ssssssss')),
+        Inst('lpdi',  Form((OT.preg, OT.i32)  , 'ppp10001 00001000 iiiiiiii iiiiiiii ssssssss ssssssss', 4)),
 
-        Inst('add',   Form((OT.reg,  OT.memo) , 'rrr00011 101000mm oooooooo'),
-                      Form((OT.reg,  OT.mem)  , 'rrr00aa1 101000mm'),
-                      Form((OT.memo, OT.reg)  , 'rrr00011 110100mm oooooooo'),
-                      Form((OT.mem,  OT.reg)  , 'rrr00aa1 110100mm')),
+        Inst('add',   Form((OT.reg,  OT.memo) , 'rrr00011 101000mm oooooooo', 3),
+                      Form((OT.reg,  OT.mem)  , 'rrr00aa1 101000mm', 3),
+                      Form((OT.memo, OT.reg)  , 'rrr00011 110100mm oooooooo', 4),
+                      Form((OT.mem,  OT.reg)  , 'rrr00aa1 110100mm', 4)),
 
         # ADDB encodings in 8089 assembler manual p3-12 have W bit wrong
-        Inst('addb',  Form((OT.reg,  OT.memo) , 'rrr00010 101000mm oooooooo'),
-                      Form((OT.reg,  OT.mem)  , 'rrr00aa0 101000mm'),
-                      Form((OT.memo, OT.reg)  , 'rrr00010 110100mm oooooooo'),
-                      Form((OT.mem,  OT.reg)  , 'rrr00aa0 110100mm')),
+        Inst('addb',  Form((OT.reg,  OT.memo) , 'rrr00010 101000mm oooooooo', 3),
+                      Form((OT.reg,  OT.mem)  , 'rrr00aa0 101000mm', 3),
+                      Form((OT.memo, OT.reg)  , 'rrr00010 110100mm oooooooo', 4),
+                      Form((OT.mem,  OT.reg)  , 'rrr00aa0 110100mm', 4)),
 
-        Inst('addi',  Form((OT.reg,  OT.imm)  , 'rrr10001 00100000 iiiiiiii iiiiiiii'),
-                      Form((OT.memo, OT.imm)  , '00010011 110000mm oooooooo iiiiiiii iiiiiiii'),
-                      Form((OT.mem,  OT.imm)  , '00010aa1 110000mm iiiiiiii iiiiiiii')),
+        Inst('addi',  Form((OT.reg,  OT.imm)  , 'rrr10001 00100000 iiiiiiii iiiiiiii', 2),
+                      Form((OT.memo, OT.imm)  , '00010011 110000mm oooooooo iiiiiiii iiiiiiii', 4),
+                      Form((OT.mem,  OT.imm)  , '00010aa1 110000mm iiiiiiii iiiiiiii', 4)),
 
-        Inst('addbi', Form((OT.reg,  OT.imm)  , 'rrr01000 00100000 iiiiiiii'),
-                      Form((OT.memo, OT.imm)  , '00001010 110000mm oooooooo iiiiiiii'),
-                      Form((OT.mem,  OT.imm)  , '00001aa0 110000mm iiiiiiii')),
+        Inst('addbi', Form((OT.reg,  OT.imm)  , 'rrr01000 00100000 iiiiiiii', 2),
+                      Form((OT.memo, OT.imm)  , '00001010 110000mm oooooooo iiiiiiii', 4),
+                      Form((OT.mem,  OT.imm)  , '00001aa0 110000mm iiiiiiii', 4)),
 
-        Inst('inc',   Form((OT.reg,)          , 'rrr00000 00111000'),
-                      Form((OT.memo,)         , '00000011 111010mm oooooooo'),
-                      Form((OT.mem,)          , '00000aa1 111010mm')),
+        Inst('inc',   Form((OT.reg,)          , 'rrr00000 00111000', 2),
+                      Form((OT.memo,)         , '00000011 111010mm oooooooo', 4),
+                      Form((OT.mem,)          , '00000aa1 111010mm', 4)),
 
-        Inst('incb',  Form((OT.memo,)         , '00000010 111010mm oooooooo'),
-                      Form((OT.mem,)          , '00000aa0 111010mm')),
+        Inst('incb',  Form((OT.memo,)         , '00000010 111010mm oooooooo', 4),
+                      Form((OT.mem,)          , '00000aa0 111010mm', 4)),
 
-        Inst('dec',   Form((OT.reg,)          , 'rrr00000 00111100'),
-                      Form((OT.memo,)         , '00000011 111011mm oooooooo'),
-                      Form((OT.mem,)          , '00000aa1 111011mm')),
+        Inst('dec',   Form((OT.reg,)          , 'rrr00000 00111100', 2),
+                      Form((OT.memo,)         , '00000011 111011mm oooooooo', 4),
+                      Form((OT.mem,)          , '00000aa1 111011mm', 4)),
 
-        Inst('decb',  Form((OT.memo,)         , '00000010 111011mm oooooooo'),
-                      Form((OT.mem,)          , '00000aa0 111011mm')),
+        Inst('decb',  Form((OT.memo,)         , '00000010 111011mm oooooooo', 4),
+                      Form((OT.mem,)          , '00000aa0 111011mm', 4)),
 
-        Inst('and',   Form((OT.reg,  OT.memo) , 'rrr00011 101010mm oooooooo'),
-                      Form((OT.reg,  OT.mem)  , 'rrr00aa1 101010mm'),
-                      Form((OT.memo, OT.reg)  , 'rrr00011 110110mm oooooooo'),
-                      Form((OT.mem,  OT.reg)  , 'rrr00aa1 110110mm')),
+        Inst('and',   Form((OT.reg,  OT.memo) , 'rrr00011 101010mm oooooooo', 3),
+                      Form((OT.reg,  OT.mem)  , 'rrr00aa1 101010mm', 3),
+                      Form((OT.memo, OT.reg)  , 'rrr00011 110110mm oooooooo', 4),
+                      Form((OT.mem,  OT.reg)  , 'rrr00aa1 110110mm', 4)),
 
-        Inst('andb',  Form((OT.reg,  OT.memo) , 'rrr00010 101010mm oooooooo'),
-                      Form((OT.reg,  OT.mem)  , 'rrr00aa0 101010mm'),
-                      Form((OT.memo, OT.reg)  , 'rrr00010 110110mm oooooooo'),
-                      Form((OT.mem,  OT.reg)  , 'rrr00aa0 110110mm')),
+        Inst('andb',  Form((OT.reg,  OT.memo) , 'rrr00010 101010mm oooooooo', 3),
+                      Form((OT.reg,  OT.mem)  , 'rrr00aa0 101010mm', 3),
+                      Form((OT.memo, OT.reg)  , 'rrr00010 110110mm oooooooo', 4),
+                      Form((OT.mem,  OT.reg)  , 'rrr00aa0 110110mm', 4)),
 
-        Inst('andi',  Form((OT.reg,  OT.imm)  , 'rrr10001 00101000 iiiiiiii iiiiiiii'),
-                      Form((OT.memo, OT.imm)  , '00010011 110010mm oooooooo iiiiiiii iiiiiiii'),
-                      Form((OT.mem,  OT.imm)  , '00010aa1 110010mm iiiiiiii iiiiiiii')),
+        Inst('andi',  Form((OT.reg,  OT.imm)  , 'rrr10001 00101000 iiiiiiii iiiiiiii', 2),
+                      Form((OT.memo, OT.imm)  , '00010011 110010mm oooooooo iiiiiiii iiiiiiii', 4),
+                      Form((OT.mem,  OT.imm)  , '00010aa1 110010mm iiiiiiii iiiiiiii', 4)),
 
-        Inst('andbi', Form((OT.reg,  OT.imm)  , 'rrr01000 00101000 iiiiiiii'),
-                      Form((OT.memo, OT.imm)  , '00001010 110010mm oooooooo iiiiiiii'),
-                      Form((OT.mem,  OT.imm)  , '00001aa0 110010mm iiiiiiii')),
+        Inst('andbi', Form((OT.reg,  OT.imm)  , 'rrr01000 00101000 iiiiiiii', 2),
+                      Form((OT.memo, OT.imm)  , '00001010 110010mm oooooooo iiiiiiii', 4),
+                      Form((OT.mem,  OT.imm)  , '00001aa0 110010mm iiiiiiii', 4)),
 
-        Inst('or',    Form((OT.reg,  OT.memo) , 'rrr00011 101001mm oooooooo'),
-                      Form((OT.reg,  OT.mem)  , 'rrr00aa1 101001mm'),
-                      Form((OT.memo, OT.reg)  , 'rrr00011 110101mm oooooooo'),
-                      Form((OT.mem,  OT.reg)  , 'rrr00aa1 110101mm')),
+        Inst('or',    Form((OT.reg,  OT.memo) , 'rrr00011 101001mm oooooooo', 3),
+                      Form((OT.reg,  OT.mem)  , 'rrr00aa1 101001mm', 3),
+                      Form((OT.memo, OT.reg)  , 'rrr00011 110101mm oooooooo', 4),
+                      Form((OT.mem,  OT.reg)  , 'rrr00aa1 110101mm', 4)),
 
-        Inst('orb',   Form((OT.reg,  OT.memo) , 'rrr00010 101001mm oooooooo'),
-                      Form((OT.reg,  OT.mem)  , 'rrr00aa0 101001mm'),
-                      Form((OT.memo, OT.reg)  , 'rrr00010 110101mm oooooooo'),
-                      Form((OT.mem,  OT.reg)  , 'rrr00aa0 110101mm')),
+        Inst('orb',   Form((OT.reg,  OT.memo) , 'rrr00010 101001mm oooooooo', 3),
+                      Form((OT.reg,  OT.mem)  , 'rrr00aa0 101001mm', 3),
+                      Form((OT.memo, OT.reg)  , 'rrr00010 110101mm oooooooo', 4),
+                      Form((OT.mem,  OT.reg)  , 'rrr00aa0 110101mm', 4)),
 
-        Inst('ori',   Form((OT.reg,  OT.imm)  , 'rrr10001 00100100 iiiiiiii iiiiiiii'),
-                      Form((OT.memo, OT.imm)  , '00010011 110001mm oooooooo iiiiiiii iiiiiiii'),
-                      Form((OT.mem,  OT.imm)  , '00010aa1 110001mm iiiiiiii iiiiiiii')),
+        Inst('ori',   Form((OT.reg,  OT.imm)  , 'rrr10001 00100100 iiiiiiii iiiiiiii', 2),
+                      Form((OT.memo, OT.imm)  , '00010011 110001mm oooooooo iiiiiiii iiiiiiii', 4),
+                      Form((OT.mem,  OT.imm)  , '00010aa1 110001mm iiiiiiii iiiiiiii', 4)),
 
-        Inst('orbi',  Form((OT.reg,  OT.imm)  , 'rrr01000 00100100 iiiiiiii'),
-                      Form((OT.memo, OT.imm)  , '00001010 110001mm oooooooo iiiiiiii'),
-                      Form((OT.mem,  OT.imm)  , '00001aa0 110001mm iiiiiiii')),
+        Inst('orbi',  Form((OT.reg,  OT.imm)  , 'rrr01000 00100100 iiiiiiii', 2),
+                      Form((OT.memo, OT.imm)  , '00001010 110001mm oooooooo iiiiiiii', 4),
+                      Form((OT.mem,  OT.imm)  , '00001aa0 110001mm iiiiiiii', 4)),
 
-        Inst('not',   Form((OT.reg,)          , 'rrr00000 00101100'),
-                      Form((OT.memo,)         , '00000011 110111mm oooooooo'),
-                      Form((OT.mem,)          , '00000aa1 110111mm'),
-                      Form((OT.reg,  OT.memo) , 'rrr00011 101011mm oooooooo'),
-                      Form((OT.reg,  OT.mem)  , 'rrr00aa1 101011mm')),
+        Inst('not',   Form((OT.reg,)          , 'rrr00000 00101100', 2),
+                      Form((OT.memo,)         , '00000011 110111mm oooooooo', 4),
+                      Form((OT.mem,)          , '00000aa1 110111mm', 4),
+                      Form((OT.reg,  OT.memo) , 'rrr00011 101011mm oooooooo', 3),
+                      Form((OT.reg,  OT.mem)  , 'rrr00aa1 101011mm', 3)),
 
-        Inst('notb',  Form((OT.memo,)         , '00000010 110111mm oooooooo'),
-                      Form((OT.mem,)          , '00000aa0 110111mm'),
-                      Form((OT.reg,  OT.memo) , 'rrr00010 101011mm oooooooo'),
-                      Form((OT.reg,  OT.mem)  , 'rrr00aa0 101011mm')),
+        Inst('notb',  Form((OT.memo,)         , '00000010 110111mm oooooooo', 4),
+                      Form((OT.mem,)          , '00000aa0 110111mm', 4),
+                      Form((OT.reg,  OT.memo) , 'rrr00010 101011mm oooooooo', 3),
+                      Form((OT.reg,  OT.mem)  , 'rrr00aa0 101011mm', 3)),
 
-        Inst('setb',  Form((OT.memo, OT.bit)  , 'bbb00010 111101mm oooooooo'),
-                      Form((OT.mem,  OT.bit)  , 'bbb00aa0 111101mm')),
+        Inst('setb',  Form((OT.memo, OT.bit)  , 'bbb00010 111101mm oooooooo', 4),
+                      Form((OT.mem,  OT.bit)  , 'bbb00aa0 111101mm', 4)),
 
-        Inst('clr',   Form((OT.memo, OT.bit)  , 'bbb00010 111110mm oooooooo'),
-                      Form((OT.mem,  OT.bit)  , 'bbb00aa0 111110mm')),
+        Inst('clr',   Form((OT.memo, OT.bit)  , 'bbb00010 111110mm oooooooo', 4),
+                      Form((OT.mem,  OT.bit)  , 'bbb00aa0 111110mm', 4)),
 
-        Inst('call',  Form((OT.memo, OT.jmp)  , '10001011 100111mm oooooooo jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '10001aa1 100111mm jjjjjjjj')),
+        Inst('call',  Form((OT.memo, OT.jmp)  , '10001011 100111mm oooooooo jjjjjjjj', 5),
+                      Form((OT.mem,  OT.jmp)  , '10001aa1 100111mm jjjjjjjj', 5)),
 
-        Inst('lcall', Form((OT.memo, OT.jmp)  , '10010011 100111mm oooooooo jjjjjjjj jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '10010aa1 100111mm jjjjjjjj jjjjjjjj')),
+        Inst('lcall', Form((OT.memo, OT.jmp)  , '10010011 100111mm oooooooo jjjjjjjj jjjjjjjj', 5),
+                      Form((OT.mem,  OT.jmp)  , '10010aa1 100111mm jjjjjjjj jjjjjjjj', 5)),
 
-        Inst('jz',    Form((OT.reg,  OT.jmp)  , 'rrr01000 01000100 jjjjjjjj'),
-                      Form((OT.memo, OT.jmp)  , '00001011 111001mm oooooooo jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00001aa1 111001mm jjjjjjjj')),
+        Inst('jz',    Form((OT.reg,  OT.jmp)  , 'rrr01000 01000100 jjjjjjjj', 2),
+                      Form((OT.memo, OT.jmp)  , '00001011 111001mm oooooooo jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00001aa1 111001mm jjjjjjjj', 3)),
 
-        Inst('ljz',   Form((OT.reg,  OT.jmp)  , 'rrr10000 01000100 jjjjjjjj jjjjjjjj'),
-                      Form((OT.memo, OT.jmp)  , '00010011 111001mm oooooooo jjjjjjjj jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00010aa1 111001mm jjjjjjjj jjjjjjjj')),
+        Inst('ljz',   Form((OT.reg,  OT.jmp)  , 'rrr10000 01000100 jjjjjjjj jjjjjjjj', 2),
+                      Form((OT.memo, OT.jmp)  , '00010011 111001mm oooooooo jjjjjjjj jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00010aa1 111001mm jjjjjjjj jjjjjjjj', 3)),
 
-        Inst('jzb',   Form((OT.memo, OT.jmp)  , '00001010 111001mm oooooooo jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00001aa0 111001mm jjjjjjjj')),
+        Inst('jzb',   Form((OT.memo, OT.jmp)  , '00001010 111001mm oooooooo jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00001aa0 111001mm jjjjjjjj', 3)),
 
-        Inst('ljzb',  Form((OT.memo, OT.jmp)  , '00010010 111001mm oooooooo jjjjjjjj jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00010aa0 111001mm jjjjjjjj jjjjjjjj')),
+        Inst('ljzb',  Form((OT.memo, OT.jmp)  , '00010010 111001mm oooooooo jjjjjjjj jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00010aa0 111001mm jjjjjjjj jjjjjjjj', 3)),
 
-        Inst('jnz',   Form((OT.reg,  OT.jmp)  , 'rrr01000 01000000 jjjjjjjj'),
-                      Form((OT.memo, OT.jmp)  , '00001011 111000mm oooooooo jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00001aa1 111000mm jjjjjjjj')),
+        Inst('jnz',   Form((OT.reg,  OT.jmp)  , 'rrr01000 01000000 jjjjjjjj', 2),
+                      Form((OT.memo, OT.jmp)  , '00001011 111000mm oooooooo jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00001aa1 111000mm jjjjjjjj', 3)),
 
-        Inst('ljnz',  Form((OT.reg,  OT.jmp)  , 'rrr10000 01000000 jjjjjjjj jjjjjjjj'),
-                      Form((OT.memo, OT.jmp)  , '00010011 111000mm oooooooo jjjjjjjj jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00010aa1 111000mm jjjjjjjj jjjjjjjj')),
+        Inst('ljnz',  Form((OT.reg,  OT.jmp)  , 'rrr10000 01000000 jjjjjjjj jjjjjjjj', 2),
+                      Form((OT.memo, OT.jmp)  , '00010011 111000mm oooooooo jjjjjjjj jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00010aa1 111000mm jjjjjjjj jjjjjjjj', 3)),
 
-        Inst('jnzb',  Form((OT.memo, OT.jmp)  , '00001010 111000mm oooooooo jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00001aa0 111000mm jjjjjjjj')),
+        Inst('jnzb',  Form((OT.memo, OT.jmp)  , '00001010 111000mm oooooooo jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00001aa0 111000mm jjjjjjjj', 3)),
 
-        Inst('ljnzb', Form((OT.memo, OT.jmp)  , '00010010 111000mm oooooooo jjjjjjjj jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00010aa0 111000mm jjjjjjjj jjjjjjjj')),
+        Inst('ljnzb', Form((OT.memo, OT.jmp)  , '00010010 111000mm oooooooo jjjjjjjj jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00010aa0 111000mm jjjjjjjj jjjjjjjj', 3)),
 
-        Inst('jmce',  Form((OT.memo, OT.jmp)  , '00001010 101100mm oooooooo jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00001aa0 101100mm jjjjjjjj')),
+        Inst('jmce',  Form((OT.memo, OT.jmp)  , '00001010 101100mm oooooooo jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00001aa0 101100mm jjjjjjjj', 3)),
 
-        Inst('ljmce', Form((OT.memo, OT.jmp)  , '00010010 101100mm oooooooo jjjjjjjj jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00010aa0 101100mm jjjjjjjj jjjjjjjj')),
+        Inst('ljmce', Form((OT.memo, OT.jmp)  , '00010010 101100mm oooooooo jjjjjjjj jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00010aa0 101100mm jjjjjjjj jjjjjjjj', 3)),
 
-        Inst('jmcne', Form((OT.memo, OT.jmp)  , '00001010 101101mm oooooooo jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00001aa0 101101mm jjjjjjjj')),
+        Inst('jmcne', Form((OT.memo, OT.jmp)  , '00001010 101101mm oooooooo jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00001aa0 101101mm jjjjjjjj', 3)),
 
-        Inst('ljmcne',Form((OT.memo, OT.jmp)  , '00010010 101101mm oooooooo jjjjjjjj jjjjjjjj'),
-                      Form((OT.mem,  OT.jmp)  , '00010aa0 101101mm jjjjjjjj jjjjjjjj')),
+        Inst('ljmcne',Form((OT.memo, OT.jmp)  , '00010010 101101mm oooooooo jjjjjjjj jjjjjjjj', 3),
+                      Form((OT.mem,  OT.jmp)  , '00010aa0 101101mm jjjjjjjj jjjjjjjj', 3)),
 
-        Inst('jbt',   Form((OT.memo, OT.bit, OT.jmp), 'bbb01010 101111mm oooooooo jjjjjjjj'),
-                      Form((OT.mem,  OT.bit, OT.jmp), 'bbb01aa0 101111mm jjjjjjjj')),
+        Inst('jbt',   Form((OT.memo, OT.bit, OT.jmp), 'bbb01010 101111mm oooooooo jjjjjjjj', 3),
+                      Form((OT.mem,  OT.bit, OT.jmp), 'bbb01aa0 101111mm jjjjjjjj', 3)),
 
-        Inst('ljbt',  Form((OT.memo, OT.bit, OT.jmp), 'bbb10010 101111mm oooooooo jjjjjjjj jjjjjjjj'),
-                      Form((OT.mem,  OT.bit, OT.jmp), 'bbb10aa0 101111mm jjjjjjjj jjjjjjjj')),
+        Inst('ljbt',  Form((OT.memo, OT.bit, OT.jmp), 'bbb10010 101111mm oooooooo jjjjjjjj jjjjjjjj', 3),
+                      Form((OT.mem,  OT.bit, OT.jmp), 'bbb10aa0 101111mm jjjjjjjj jjjjjjjj', 3)),
 
-        Inst('jnbt',  Form((OT.memo, OT.bit, OT.jmp), 'bbb01010 101110mm oooooooo jjjjjjjj'),
-                      Form((OT.mem,  OT.bit, OT.jmp), 'bbb01aa0 101110mm jjjjjjjj')),
+        Inst('jnbt',  Form((OT.memo, OT.bit, OT.jmp), 'bbb01010 101110mm oooooooo jjjjjjjj', 3),
+                      Form((OT.mem,  OT.bit, OT.jmp), 'bbb01aa0 101110mm jjjjjjjj', 3)),
 
-        Inst('ljnbt', Form((OT.memo, OT.bit, OT.jmp), 'bbb10010 101110mm oooooooo jjjjjjjj jjjjjjjj'),
-                      Form((OT.mem,  OT.bit, OT.jmp), 'bbb10aa0 101110mm jjjjjjjj jjjjjjjj')),
+        Inst('ljnbt', Form((OT.memo, OT.bit, OT.jmp), 'bbb10010 101110mm oooooooo jjjjjjjj jjjjjjjj', 3),
+                      Form((OT.mem,  OT.bit, OT.jmp), 'bbb10aa0 101110mm jjjjjjjj jjjjjjjj', 3)),
 
-        Inst('tsl',   Form((OT.memo, OT.imm, OT.jmp), '00011010 100101mm oooooooo iiiiiiii jjjjjjjj'),
-                      Form((OT.mem,  OT.imm, OT.jmp), '00011aa0 100101mm iiiiiiii jjjjjjjj')),
+        Inst('tsl',   Form((OT.memo, OT.imm, OT.jmp), '00011010 100101mm oooooooo iiiiiiii jjjjjjjj', 5),
+                      Form((OT.mem,  OT.imm, OT.jmp), '00011aa0 100101mm iiiiiiii jjjjjjjj', 5)),
 
-        Inst('wid',   Form((OT.wids, OT.widd) , '1sd00000 00000000')),
+        Inst('wid',   Form((OT.wids, OT.widd) , '1sd00000 00000000', 2)),
 
-        Inst('xfer',  Form(()                 , '01100000 00000000')),
+        Inst('xfer',  Form(()                 , '01100000 00000000', 2)),
 
-        Inst('sintr', Form(()                 , '01000000 00000000')),
+        Inst('sintr', Form(()                 , '01000000 00000000', 2)),
 
-        Inst('hlt',   Form(()                 , '00100000 01001000')),
+        Inst('hlt',   Form(()                 , '00100000 01001000', 4)),
 
-        Inst('nop',   Form(()                 , '00000000 00000000'))
+        Inst('nop',   Form(()                 , '00000000 00000000', 2))
     ]
 
     # GA, GB, GC, TP are 20-bit pointer registers w/ tag bit,
@@ -425,6 +444,7 @@ class I89:
     def __opcode_init(self):
         self.__inst_by_opcode = { }
         self.__inst_by_mnemonic = { }
+        self.__long_branch_by_mnemonic = { }
         for inst in self.__inst_set:
             if inst.mnem not in self.__inst_by_mnemonic:
                 self.__inst_by_mnemonic[inst.mnem] = inst
@@ -435,6 +455,16 @@ class I89:
                     self.__inst_by_opcode[opcode] = []
                 self.__inst_by_opcode[opcode].append(Inst(inst.mnem, form))
 
+        # short branches (8-bit displacement) that have a long (16-bit
+        # displacement) counterpart, e.g. jmp/ljmp, jz/ljz, call/lcall
+        for inst in self.__inst_set:
+            long_inst = self.__inst_by_mnemonic.get('l' + inst.mnem)
+            if long_inst is None:
+                continue
+            if all('j' in form.fields and form.fields['j'].width == 8
+                   for form in inst.forms):
+                self.__long_branch_by_mnemonic[inst.mnem] = long_inst
+
 
     def _opcode_table_print(self):
         for opcode in sorted(self.__inst_by_opcode.keys()):
@@ -481,12 +511,27 @@ class I89:
         pass
 
 
+    # Returns the list of Inst of the instruction set, each with all its
+    # forms.
+    def instructions(self):
+        return list(self.__inst_set)
+
     def mnemonic_search(self, mnemonic):
         if mnemonic not in self.__inst_by_mnemonic:
             return None
         return self.__inst_by_mnemonic[mnemonic]
 
 
+    # returns the long form of a short branch instruction, or None
+    # if the instruction is not a short branch with a long counterpart
+    def long_branch(self, inst):
+        if not isinstance(inst, Inst):
+            inst = self.mnemonic_search(inst)
+            if inst is None:
+                return None
+        return self.__long_branch_by_mnemonic.get(inst.mnem)
+
+
     def opcode_search(self, fw, pc):
         opcode = fw[pc+1] & 0xfc
         if opcode not in self.__inst_by_opcode:
@@ -674,6 +719,20 @@ class I89:
             raise Unimplemented("can't assemble operand")
 
 
+    # returns the Form of inst that matches the operands
+    def find_form(self, inst, operands):
+        if not isinstance(inst, Inst):
+            mnem = inst
+            inst = self.mnemonic_search(mnem)
+            if inst is None:
+                raise I89.UnknownMnemonic(mnem)
+        operand_classes = [self.__get_operand_class(operand) for operand in operands]
+        for form in inst.forms:
+            if self.__operand_types_match(operand_classes, form.operands):
+                return form
+        raise I89.NoMatchingForm()
+
+
     # pc is used to compute relative branch targets                       
     # inst can be:
     #   Inst (return value from mnemonic_search)
@@ -682,22 +741,19 @@ class I89:
     #   I89.reg or register name (str)   reg, preg
     #   integer                          jmp, imm, i32, bit, wids, widd
     #   I89.MemoryReference              mem, memo, mem2, memo2
-    def assemble_instruction(self, pc, inst, operands):
-        if not isinstance(inst, Inst):
-            inst = self.mnemonic_search(inst)
-            if inst is None:
-                raise I89.UnknownMnemonic(inst)
-        operand_classes = [self.__get_operand_class(operand) for operand in operands]
-        for form in inst.forms:
-            if self.__operand_types_match(operand_classes, form.operands):
-                break
-        else:
-            raise I89.NoMatchingForm()
+    # If check_branch_range is true, a branch target that can't be reached
+    # by the displacement field of the form raises OperandOutOfRange.
+    def assemble_instruction(self, pc, inst, operands, check_branch_range = True):
+        form = self.find_form(inst, operands)
         fields = { }
         for i in range(len(operands)):
             fields.update(self.__assemble_operand(operands[i], form.operands[i]))
         if 'j' in fields:
-            fields['j'] = (fields['j'] - (pc + len(form))) & 0xffff  # PC relative branch targets
+            disp = fields['j'] - (pc + len(form))  # PC relative branch targets
+            if (check_branch_range and form.fields['j'].width == 8 and
+                ((disp + 0x80) & 0xffff) >= 0x100):
+                raise I89.OperandOutOfRange()
+            fields['j'] = disp & 0xffff
         return form.insert_fields(fields)
 
     def __init__(self):
@@ -0,0 +1,218 @@
+#!/usr/bin/python3
+# Persistent assembler/disassembler server and client
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The server keeps the tools loaded, along with the instruction tables
+# and expression grammar, so that each request avoids the Python startup,
+# pyparsing import, and table construction costs.  Requests are handled
+# one at a time, since the tools use the process working directory and
+# sys.stdout.
+#
+# Protocol: the client sends a single JSON line
+#     { "tool": name, "argv": [ arg, ... ], "cwd": directory }
+# and the server answers with a stream of JSON lines
+#     { "stdout": text }   or   { "stderr": text }
+# with binary output, such as a raw binary image written to stdout, sent
+# as its bytes decoded as Latin-1,
+#     { "stdout_bytes": text }
+# terminated by
+#     { "exit": status }
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import traceback
+
+from toolloader import load_tool
+
+
+def default_socket_path():
+    d = os.environ.get('XDG_RUNTIME_DIR', tempfile.gettempdir())
+    return os.path.join(d, 'i89-%d.sock' % os.getuid())
+
+
+class I89Server(socketserver.UnixStreamServer):
+
+    tools = ('asi89', 'disi89')
+
+    class UnknownTool(Exception):
+        def __init__(self, name):
+            super().__init__('unknown tool "%s"' % name)
+
+    class AlreadyRunning(Exception):
+        pass
+
+    # raised by forward() if no server accepts the connection
+    class NoServer(Exception):
+        pass
+
+    # raised by forward() if the connection fails after the request has
+    # been sent, when the tool may have run and produced output
+    class Disconnected(Exception):
+        pass
+
+    # file-like object that forwards output to the client; like a text
+    # file, binary output is written to its buffer attribute
+    class StreamWriter:
+        def __init__(self, wfile, name):
+            self.wfile = wfile
+            self.name = name
+            self.buffer = I89Server.BinaryStreamWriter(wfile, name + '_bytes')
+
+        def write(self, s):
+            if s:
+                self.wfile.write((json.dumps({ self.name: s }) + '\n').encode())
+            return len(s)
+
+        def flush(self):
+            self.wfile.flush()
+
+    class BinaryStreamWriter(StreamWriter):
+        def __init__(self, wfile, name):
+            self.wfile = wfile
+            self.name = name
+
+        def write(self, b):
+            return super().write(bytes(b).decode('latin-1'))
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            if not line:
+                return  # connected without a request, e.g. listening()
+            request = json.loads(line.decode())
+            try:
+                status = self.server.serve_request(request, self.wfile)
+                self.wfile.write((json.dumps({ 'exit': status }) + '\n').encode())
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client went away
+
+    def __init__(self, path):
+        # imported here so that the client doesn't pay for them
+        from i89 import I89
+        from expressionparser import ExpressionParser
+        self.i89 = I89()
+        self.ep = ExpressionParser()
+        self.modules = { name: load_tool(name) for name in self.tools }
+        self.path = path
+        if os.path.exists(path):
+            if I89Server.listening(path):
+                raise I89Server.AlreadyRunning('a server is already listening on %s' % path)
+            os.unlink(path)  # stale socket from an earlier server
+        super().__init__(path, I89Server.Handler)
+
+    # True if a server accepts connections on path
+    @staticmethod
+    def listening(path):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        with sock:
+            try:
+                sock.connect(path)
+            except OSError:
+                return False
+        return True
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def run_tool(self, name, argv):
+        if name not in self.modules:
+            raise I89Server.UnknownTool(name)
+        if name == 'asi89':
+            self.modules[name].main(argv, i89 = self.i89, ep = self.ep)
+        else:
+            self.modules[name].main(argv, i89 = self.i89)
+
+    def serve_request(self, request, wfile):
+        save_cwd = os.getcwd()
+        save_argv = sys.argv
+        save_stdout, save_stderr = sys.stdout, sys.stderr
+        sys.argv = [request['tool']] + request['argv']  # for usage messages
+        sys.stdout = I89Server.StreamWriter(wfile, 'stdout')
+        sys.stderr = I89Server.StreamWriter(wfile, 'stderr')
+        try:
+            os.chdir(request['cwd'])
+            self.run_tool(request['tool'], request['argv'])
+            status = 0
+        except SystemExit as e:
+            if e.code is None:
+                status = 0
+            elif isinstance(e.code, int):
+                status = e.code
+            else:
+                print(e.code, file = sys.stderr)
+                status = 1
+        except Exception:
+            traceback.print_exc()
+            status = 1
+        finally:
+            sys.stdout, sys.stderr = save_stdout, save_stderr
+            sys.argv = save_argv
+            os.chdir(save_cwd)
+        return status
+
+
+# Forwards a tool invocation to the server, copying its output to
+# stdout and stderr, and returns the tool's exit status.  Raises
+# I89Server.NoServer if there is no server listening on path, in which
+# case the tool can be run directly, or I89Server.Disconnected if the
+# connection fails once the request has been sent.
+def forward(tool, argv, path = None):
+    if path is None:
+        path = default_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError as e:
+        sock.close()
+        raise I89Server.NoServer(str(e))
+    try:
+        with sock, sock.makefile('rwb') as f:
+            f.write((json.dumps({ 'tool': tool,
+                                  'argv': argv,
+                                  'cwd':  os.getcwd() }) + '\n').encode())
+            f.flush()
+            for line in f:
+                msg = json.loads(line.decode())
+                if 'stdout' in msg:
+                    sys.stdout.write(msg['stdout'])
+                elif 'stdout_bytes' in msg:
+                    sys.stdout.flush()
+                    sys.stdout.buffer.write(msg['stdout_bytes'].encode('latin-1'))
+                    sys.stdout.buffer.flush()
+                elif 'stderr' in msg:
+                    sys.stderr.write(msg['stderr'])
+                elif 'exit' in msg:
+                    return msg['exit']
+    except (OSError, ValueError) as e:
+        raise I89Server.Disconnected('connection to server failed: %s' % e)
+    raise I89Server.Disconnected('server closed connection')
+
+
+if __name__ == '__main__':
+    try:
+        server = I89Server(default_socket_path())
+    except I89Server.AlreadyRunning as e:
+        print(e, file = sys.stderr)
+        sys.exit(1)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
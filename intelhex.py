@@ -67,16 +67,26 @@ class IntelHex:
         if checksum != expected_checksum:
             raise IntelHex.BadChecksum('Bad checksum for record #%d' % self.rn)
         if rec_type == 0x00:  # data
+            addr += self.base
             if self.load_addr is None:
                 self.load_addr = addr
             if self.expected_addr is not None and self.expected_addr != addr:
-                raise IntelHex.Discontiguous('Unexpected address for data record #%d' % self.rn)
+                # gaps are only an error when relocating to load_addr
+                if self.relocate:
+                    raise IntelHex.Discontiguous('Unexpected address for data record #%d' % self.rn)
+                self.load_addr = addr
             self.memory[self.load_addr:self.load_addr+data_length] = data
             self.expected_addr = addr + data_length
             self.load_addr += data_length
 
         elif rec_type == 0x01:  # end of file
             raise EOFError()  # end of file
+        elif rec_type == 0x02 and data_length == 2:  # extended segment address
+            self.base = ((data[0] << 8) + data[1]) << 4
+        elif rec_type == 0x04 and data_length == 2:  # extended linear address
+            self.base = ((data[0] << 8) + data[1]) << 16
+        elif rec_type in (0x03, 0x05):  # start address, ignored
+            pass
         else:
             raise IntelHex.UnknownRecordType('Unknown record type %02x for record #%d', (rec_type, self.rn))
         return True
@@ -93,7 +103,9 @@ class IntelHex:
             self.memory = memory
 
         self.rn = 0
+        self.base = 0   # from extended address records
         self.load_addr = load_addr
+        self.relocate = load_addr is not None
         self.expected_addr = None
 
         try:
@@ -114,26 +126,29 @@ class IntelHex:
         s = ':' + ''.join(['%02x' % b for b in raw_data])
         print(s, file = f)
 
+    # Addresses above 64K are written with extended linear address
+    # records, and no record crosses a 64K boundary.
     def __write_range(self, f, memory, sl, data_bytes_per_line):
         addr = sl.start
         while addr < sl.stop:
             l = data_bytes_per_line
             if addr + l > sl.stop:
                 l = sl.stop - addr
-            self.__write_record(f, addr, 0x00, memory[addr:addr+l])
+            l = min(l, 0x10000 - (addr & 0xffff))
+            if addr >> 16 != self.upper:
+                self.upper = addr >> 16
+                self.__write_record(f, 0x0000, 0x04, bytearray([self.upper >> 8, self.upper & 0xff]))
+            self.__write_record(f, addr & 0xffff, 0x00, memory[addr:addr+l])
             addr += l
 
-    def write(self, f, memory, data_bytes_per_line = 16):
+    # If start and/or stop are provided, only the valid data in that
+    # range of addresses is written.
+    def write(self, f, memory, data_bytes_per_line = 16, start = 0, stop = None):
         self.f = f
         self.memory = memory
-        addr = 0
-        while True:
-            try:
-                sl = self.memory.next_valid_range(addr)
-            except Memory.Uninitialized:
-                break
+        self.upper = 0  # upper 16 bits of the address
+        for sl in self.memory.valid_ranges(start, stop):
             self.__write_range(f, memory, sl, data_bytes_per_line)
-            addr = sl.stop
         self.__write_record(f, 0x0000, 0x01, bytearray([]))
             
         
@@ -0,0 +1,285 @@
+#!/usr/bin/python3
+# Intel 8089 I/O processor: two channels and their scheduling
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# An IOP has two Channels sharing the system and I/O spaces.  Only one
+# channel executes at a time.  The 8089 decides which channel gets the
+# next cycle by:
+#   1. a channel program running chained (the C bit of its CC register
+#      set) has priority over one that isn't
+#   2. otherwise, a channel whose P bit (from the channel command word
+#      that started it) is set has priority
+#   3. otherwise, the channels alternate
+# The lower priority channel doesn't run until the other halts or its
+# priority drops.
+#
+# Rather than switching channels after every instruction, the scheduler
+# runs the selected channel for a time slice of up to quantum
+# instructions, and then chooses again.  The schedule only depends on
+# the instructions executed, so runs are repeatable.  Priority changes,
+# and SINTR interrupt requests, take effect at the end of a slice.
+#
+# Since instructions are never interleaved, TSL is atomic with respect
+# to the other channel, so semaphores in shared memory work as on the
+# 8089 (assuming no other bus master).
+#
+# Channels can be started directly, or, as by the host, with a channel
+# attention.  The first channel attention after reset initializes the
+# IOP, which reads:
+#   at 0FFFF6h  the SYSBUS byte
+#   at 0FFFF8h  a pointer to the system configuration block (SCB)
+#   SCB + 0     the SOC byte
+#   SCB + 2     a pointer to the channel control block (CB)
+# and clears the BUSY flag of the channel selected.  Pointers are 8086
+# offset and segment words.  The CB has eight bytes for each channel,
+# channel 0 first:
+#   + 0  the channel command word (CCW)
+#   + 1  the BUSY flag, 0FFh while the channel program runs
+#   + 2  a pointer to the parameter block (PB)
+# Later channel attentions perform the command of the CCW of the
+# selected channel:
+#   bits 2-0  CF   1: start the program in I/O space at the offset in
+#                     the first word of the PB
+#                  3: start the program in system space at the pointer
+#                     in the first two words of the PB
+#                  5: resume a suspended program
+#                  6: suspend, saving TP in the PB as by MOVP
+#                  7: halt
+#                  0: update PSW, which isn't modeled, so does nothing
+#   bit 3     P    priority bit
+#   bits 6-5  ICF  1: remove the interrupt request
+#                  2: enable interrupts
+#                  3: disable interrupts
+# A channel program started this way clears its BUSY flag when it
+# halts.  SINTR of a channel with interrupts disabled is ignored.
+
+from channel import Channel
+
+
+class IOP:
+
+    class BadCommand(Channel.SimulatorError):
+        def __init__(self, number, ccw):
+            super().__init__('channel %d: invalid channel command word %02x' % (number, ccw))
+
+    # bit of the CC register that selects chained execution
+    CC_CHAIN = 0x0100
+
+    SYSBUS_ADDRESS = 0xffff6
+    SCB_POINTER    = 0xffff8
+    CB_SIZE        = 8       # bytes per channel
+    BUSY           = 0xff    # BUSY flag value while a program runs
+
+    # channel command word
+    CF_MASK          = 0x07
+    CF_UPDATE_PSW    = 0
+    CF_START_IO      = 1
+    CF_START_SYSTEM  = 3
+    CF_RESUME        = 5
+    CF_SUSPEND       = 6
+    CF_HALT          = 7
+    CCW_PRIORITY     = 0x08
+    ICF_SHIFT        = 5
+    ICF_REMOVE       = 1
+    ICF_ENABLE       = 2
+    ICF_DISABLE      = 3
+
+    # i89 may be passed in to share the instruction tables.
+    # channel_class may be Channel or a subclass, such as
+    # TranslatingChannel; channel_args gives further keyword arguments
+    # for it, such as the ExecutionProfile shared by ProfilingChannels.
+    def __init__(self, system, io = None, i89 = None,
+                 channel_class = Channel, quantum = 100, channel_args = None):
+        if channel_args is None:
+            channel_args = { }
+        self.channels = [channel_class(system, io, i89 = i89, number = 0, **channel_args)]
+        io = self.channels[0].space[Channel.IO]
+        self.channels.append(channel_class(system, io, i89 = i89, number = 1, **channel_args))
+        self.space = self.channels[0].space
+        self.quantum = quantum
+        self.priority = [0, 0]        # P bits, by channel number
+        self.interrupt_handler = None # called with the channel on SINTR
+        self.reset()
+
+    def reset(self):
+        for channel in self.channels:
+            channel.reset()
+        self.last = 1                # channel that ran last
+        self.interrupts = [ ]        # (instruction count, channel number)
+        self.initialized = False     # by the first channel attention
+        self.sysbus = None           # SYSBUS and SOC bytes, and address
+        self.soc = None              # of the CB, read by initialization
+        self.cb = None
+        self.interrupt_enabled = [True, True]
+        self.attended = [False, False] # started by channel attention
+
+    def start(self, number, tp, pp = 0, tag = Channel.SYSTEM, priority = 0):
+        self.priority[number] = priority
+        self.channels[number].start(tp, pp, tag = tag)
+
+    # Returns the state of the channels and scheduler, not including
+    # memory.
+    def get_state(self):
+        return { 'channels':          [channel.get_state() for channel in self.channels],
+                 'priority':          self.priority[:],
+                 'last':              self.last,
+                 'interrupts':        self.interrupts[:],
+                 'initialized':       self.initialized,
+                 'sysbus':            self.sysbus,
+                 'soc':               self.soc,
+                 'cb':                self.cb,
+                 'interrupt_enabled': self.interrupt_enabled[:],
+                 'attended':          self.attended[:] }
+
+    def set_state(self, state):
+        for channel, channel_state in zip(self.channels, state['channels']):
+            channel.set_state(channel_state)
+        self.priority = state['priority'][:]
+        self.last = state['last']
+        self.interrupts = state['interrupts'][:]
+        self.initialized = state['initialized']
+        self.sysbus = state['sysbus']
+        self.soc = state['soc']
+        self.cb = state['cb']
+        self.interrupt_enabled = state['interrupt_enabled'][:]
+        self.attended = state['attended'][:]
+
+    # Returns the physical address given by an 8086 pointer (offset
+    # word, segment word) in system memory.
+    def read_pointer(self, addr):
+        mem = self.space[Channel.SYSTEM]
+        offset = mem[addr] | (mem[addr + 1] << 8)
+        segment = mem[addr + 2] | (mem[addr + 3] << 8)
+        return ((segment << 4) + offset) & 0xfffff
+
+    # Performs a channel attention for channel number, as described
+    # above.
+    def channel_attention(self, number):
+        mem = self.space[Channel.SYSTEM]
+        if not self.initialized:
+            self.sysbus = mem[IOP.SYSBUS_ADDRESS]
+            scb = self.read_pointer(IOP.SCB_POINTER)
+            self.soc = mem[scb]
+            self.cb = self.read_pointer(scb + 2)
+            self.initialized = True
+            mem[self.cb + IOP.CB_SIZE * number + 1] = 0
+            return
+        cb = self.cb + IOP.CB_SIZE * number
+        channel = self.channels[number]
+        ccw = mem[cb]
+        cf = ccw & IOP.CF_MASK
+        icf = (ccw >> IOP.ICF_SHIFT) & 3
+        if icf == IOP.ICF_REMOVE:
+            channel.interrupt = False
+        elif icf == IOP.ICF_ENABLE:
+            self.interrupt_enabled[number] = True
+        elif icf == IOP.ICF_DISABLE:
+            self.interrupt_enabled[number] = False
+        priority = int(ccw & IOP.CCW_PRIORITY != 0)
+        if cf in (IOP.CF_START_IO, IOP.CF_START_SYSTEM):
+            pb = self.read_pointer(cb + 2)
+            if cf == IOP.CF_START_IO:
+                tp = mem[pb] | (mem[pb + 1] << 8)
+                tag = Channel.IO
+            else:
+                tp = self.read_pointer(pb)
+                tag = Channel.SYSTEM
+            mem[cb + 1] = IOP.BUSY
+            self.start(number, tp, pb, tag = tag, priority = priority)
+            self.attended[number] = True
+        elif cf == IOP.CF_RESUME:
+            tp, tag = channel.load_pointer(Channel.SYSTEM, channel.pp)
+            channel.start(tp, channel.pp, tag = tag)
+            self.priority[number] = priority
+            self.attended[number] = True
+        elif cf == IOP.CF_SUSPEND:
+            if not channel.halted:
+                channel.store_pointer(Channel.SYSTEM, channel.pp,
+                                      channel.regs[Channel.TP], channel.tags[Channel.TP])
+                channel.halted = True
+                self.attended[number] = False
+        elif cf == IOP.CF_HALT:
+            channel.halted = True
+            self.clear_busy(number)
+        elif cf != IOP.CF_UPDATE_PSW:
+            raise IOP.BadCommand(number, ccw)
+
+    def clear_busy(self, number):
+        if self.attended[number]:
+            self.attended[number] = False
+            self.space[Channel.SYSTEM][self.cb + IOP.CB_SIZE * number + 1] = 0
+
+    @property
+    def instruction_count(self):
+        return sum(channel.instruction_count for channel in self.channels)
+
+    @property
+    def halted(self):
+        return all(channel.halted for channel in self.channels)
+
+    # Returns the sort key of a channel's priority.
+    def channel_priority(self, channel):
+        return (channel.regs[Channel.CC] & IOP.CC_CHAIN != 0,
+                self.priority[channel.number])
+
+    # Returns the channel to run next, or None if both are halted.
+    def select(self):
+        running = [channel for channel in self.channels if not channel.halted]
+        if len(running) < 2:
+            return running[0] if running else None
+        p0 = self.channel_priority(running[0])
+        p1 = self.channel_priority(running[1])
+        if p0 > p1:
+            return running[0]
+        if p1 > p0:
+            return running[1]
+        return self.channels[1 - self.last]
+
+    def detach(self):
+        for channel in self.channels:
+            channel.detach()
+
+    # Runs until both channels halt, or max_steps instructions have been
+    # executed by the two together.  If trace is given, it is called
+    # with the channel before each instruction.  Returns the number of
+    # instructions executed.
+    def run(self, max_steps = None, trace = None):
+        count = 0
+        while max_steps is None or count < max_steps:
+            channel = self.select()
+            if channel is None:
+                break
+            budget = self.quantum
+            if max_steps is not None:
+                budget = min(budget, max_steps - count)
+            self.last = channel.number
+            if trace is None:
+                n = channel.run(budget)
+            else:
+                n = 0
+                while n < budget and not channel.halted:
+                    trace(channel)
+                    channel.step()
+                    n += 1
+            count += n
+            if channel.halted and self.attended[channel.number]:
+                self.clear_busy(channel.number)
+            if channel.interrupt:
+                channel.interrupt = False
+                if self.interrupt_enabled[channel.number]:
+                    self.interrupts.append((self.instruction_count, channel.number))
+                    if self.interrupt_handler is not None:
+                        self.interrupt_handler(channel)
+        return count
@@ -0,0 +1,313 @@
+#!/usr/bin/python3
+# Disk controller model for simulating iSBC 215 firmware
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# An ISBC215 is a Device giving the channel programs of the controller
+# firmware access to up to four drives, Winchester or floppy, whose
+# contents are DiskImage files mapped into memory.
+#
+# The model is of the controller's function, not of its circuits: a
+# command is given by writing the drive address to the registers below
+# and the command code to the command register, and completes at once.
+# A read or write command opens a window onto the sectors addressed,
+# which the channel transfers through the data port, normally by DMA
+# from or to the port.  A DMA transfer by byte count is done as a
+# single slice copy between the mapped image and memory.  With
+# termination on the external signal, the transfer ends when the
+# window is exhausted.
+#
+# The register offsets from the base port are:
+#   0     command (write), status (read)
+#   1     unit
+#   2, 3  cylinder, low and high bytes
+#   4     head
+#   5     sector
+#   6     sector count (0 for 256)
+#   7     fill byte, for format
+#   8, 9  data; the two addresses are equivalent, so that word
+#         accesses transfer two bytes
+# These offsets, and the base port given to simi89, are those of this
+# model; firmware written for the board's own ports must be adapted to
+# them, or the model to the board.
+
+import itertools
+import mmap
+import os
+
+from devices import Device
+
+
+class DiskImage:
+
+    class BadImage(Exception):
+        pass
+
+    # Each write to an image gives it a new generation, so that
+    # set_state() can skip restoring contents that are unchanged.
+    generations = itertools.count()
+
+    # mode is 'r' for read only, 'w' to write changes to the file, or
+    # 'c' to keep changes in memory only, discarding them when the
+    # image is closed.  With 'w' the file is created or extended as
+    # needed.
+    def __init__(self, fn, cylinders, heads, sectors, sector_size = 512,
+                 mode = 'c', first_sector = 0):
+        self.cylinders = cylinders
+        self.heads = heads
+        self.sectors = sectors
+        self.sector_size = sector_size
+        self.first_sector = first_sector
+        self.size = cylinders * heads * sectors * sector_size
+        if self.size == 0:
+            raise DiskImage.BadImage('%s: geometry gives an empty disk' % fn)
+        self.read_only = mode == 'r'
+        if mode == 'w':
+            f = open(fn, 'r+b' if os.path.exists(fn) else 'w+b')
+            if os.fstat(f.fileno()).st_size < self.size:
+                f.truncate(self.size)
+            access = mmap.ACCESS_WRITE
+        else:
+            f = open(fn, 'rb')
+            if os.fstat(f.fileno()).st_size < self.size:
+                f.close()
+                raise DiskImage.BadImage('%s: smaller than its geometry' % fn)
+            access = mmap.ACCESS_READ if mode == 'r' else mmap.ACCESS_COPY
+        with f:
+            self.map = mmap.mmap(f.fileno(), self.size, access = access)
+        self.generation = next(DiskImage.generations)
+
+    # Returns the offset in the image of a sector, or None if it is not
+    # on the disk.
+    def offset(self, cylinder, head, sector):
+        sector -= self.first_sector
+        if not (0 <= cylinder < self.cylinders and 0 <= head < self.heads and
+                0 <= sector < self.sectors):
+            return None
+        return ((cylinder * self.heads + head) * self.sectors + sector) * self.sector_size
+
+    def write(self, position, data):
+        self.map[position:position+len(data)] = data
+        self.generation = next(DiskImage.generations)
+
+    # Returns the contents of a writable image, for set_state(), or None
+    # for a read only image.
+    def get_state(self):
+        if self.read_only:
+            return None
+        return (self.generation, bytes(self.map))
+
+    def set_state(self, state):
+        if state is not None and state[0] != self.generation:
+            self.generation, data = state
+            self.map[:] = data
+
+    def flush(self):
+        if not self.read_only:
+            self.map.flush()
+
+    def close(self):
+        self.map.close()
+
+
+class ISBC215(Device):
+
+    ports = 10
+
+    COMMAND  = 0
+    STATUS   = 0
+    UNIT     = 1
+    CYLINDER = 2
+    HEAD     = 4
+    SECTOR   = 5
+    COUNT    = 6
+    FILL     = 7
+    DATA     = 8
+
+    # commands
+    CMD_RESET  = 0
+    CMD_SEEK   = 1
+    CMD_READ   = 2
+    CMD_WRITE  = 3
+    CMD_FORMAT = 4  # fills every sector of the track with the fill byte
+    CMD_VERIFY = 5
+
+    # status bits
+    STATUS_READY     = 0x01  # the unit has a disk
+    STATUS_DRQ       = 0x02  # the window has bytes left to transfer
+    STATUS_ERROR     = 0x04  # the last command failed
+    STATUS_PROTECTED = 0x08  # the unit is write protected
+    STATUS_SEEKED    = 0x10  # the heads are on the addressed cylinder
+
+    # the window holds its disk and position, so is saved with them
+    state_attributes = ('regs', 'error', 'cylinder', 'window', 'commands',
+                        'bytes_read', 'bytes_written')
+
+    # disks is a list of DiskImage or None, by unit number
+    def __init__(self, disks = ()):
+        self.disks = (list(disks) + [None] * 4)[:4]
+        self.regs = bytearray(ISBC215.ports)
+        self.reset()
+
+    def reset(self):
+        self.error = False
+        self.cylinder = [0] * 4  # position of the heads, by unit
+        self.close_window()
+        self.commands = 0        # commands executed
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    # The state includes the contents of the writable disks.
+    def get_state(self):
+        state = super().get_state()
+        state['disks'] = [disk and disk.get_state() for disk in self.disks]
+        return state
+
+    def set_state(self, state):
+        state = dict(state)
+        for disk, disk_state in zip(self.disks, state.pop('disks')):
+            if disk is not None:
+                disk.set_state(disk_state)
+        super().set_state(state)
+
+    def close_window(self):
+        self.window = None       # [disk, position, end, writing]
+
+    @property
+    def disk(self):
+        return self.disks[self.regs[ISBC215.UNIT] & 3]
+
+    def read(self, offset):
+        if offset == ISBC215.STATUS:
+            return self.status()
+        if offset >= ISBC215.DATA:
+            return self.read_block(offset, 1, 1)[0]
+        return self.regs[offset]
+
+    def write(self, offset, value):
+        if offset == ISBC215.COMMAND:
+            self.command(value)
+        elif offset >= ISBC215.DATA:
+            self.write_block(offset, bytes([value]), 1)
+        else:
+            self.regs[offset] = value
+
+    def status(self):
+        status = 0
+        disk = self.disk
+        if disk is not None:
+            status |= ISBC215.STATUS_READY
+            if disk.read_only:
+                status |= ISBC215.STATUS_PROTECTED
+            if self.cylinder[self.regs[ISBC215.UNIT] & 3] == self.address()[0]:
+                status |= ISBC215.STATUS_SEEKED
+        if self.window is not None and self.window[1] < self.window[2]:
+            status |= ISBC215.STATUS_DRQ
+        if self.error:
+            status |= ISBC215.STATUS_ERROR
+        return status
+
+    # (cylinder, head, sector, count) from the registers
+    def address(self):
+        regs = self.regs
+        return (regs[ISBC215.CYLINDER] | (regs[ISBC215.CYLINDER + 1] << 8),
+                regs[ISBC215.HEAD], regs[ISBC215.SECTOR],
+                regs[ISBC215.COUNT] or 256)
+
+    # Returns (disk, offset, length) of the sectors addressed, or None
+    # if there is no disk or they are not all on it.
+    def extent(self):
+        disk = self.disk
+        if disk is None:
+            return None
+        cylinder, head, sector, count = self.address()
+        start = disk.offset(cylinder, head, sector)
+        if start is None:
+            return None
+        length = count * disk.sector_size
+        if start + length > disk.size:
+            return None
+        return disk, start, length
+
+    def command(self, cmd):
+        self.commands += 1
+        self.close_window()
+        self.error = False
+        unit = self.regs[ISBC215.UNIT] & 3
+        if cmd == ISBC215.CMD_RESET:
+            return
+        if cmd == ISBC215.CMD_SEEK:
+            disk = self.disk
+            cylinder = self.address()[0]
+            if disk is None or cylinder >= disk.cylinders:
+                self.error = True
+            else:
+                self.cylinder[unit] = cylinder
+        elif cmd in (ISBC215.CMD_READ, ISBC215.CMD_WRITE, ISBC215.CMD_VERIFY):
+            extent = self.extent()
+            writing = cmd == ISBC215.CMD_WRITE
+            if extent is None or (writing and extent[0].read_only):
+                self.error = True
+                return
+            if cmd != ISBC215.CMD_VERIFY:
+                # image sectors are always readable, so a verify only
+                # checks the address
+                disk, start, length = extent
+                self.window = [disk, start, start + length, writing]
+            self.cylinder[unit] = self.address()[0]
+        elif cmd == ISBC215.CMD_FORMAT:
+            disk = self.disk
+            cylinder, head = self.address()[:2]
+            start = None
+            if disk is not None:
+                start = disk.offset(cylinder, head, disk.first_sector)
+            if start is None or disk.read_only:
+                self.error = True
+            else:
+                length = disk.sectors * disk.sector_size
+                disk.write(start, bytes([self.regs[ISBC215.FILL]]) * length)
+                self.bytes_written += length
+                self.cylinder[unit] = cylinder
+        else:
+            self.error = True
+
+    # Reads from the window; bytes beyond its end read as 0xff.
+    def read_block(self, offset, count, width):
+        window = self.window
+        if window is None or window[3]:
+            return b'\xff' * count
+        disk, position, end = window[:3]
+        n = min(count, end - position)
+        data = disk.map[position:position+n]
+        window[1] += n
+        self.bytes_read += n
+        if n < count:
+            data += b'\xff' * (count - n)
+        return data
+
+    # Writes to the window; bytes beyond its end are discarded.
+    def write_block(self, offset, data, width):
+        window = self.window
+        if window is None or not window[3]:
+            return
+        disk, position, end = window[:3]
+        n = min(len(data), end - position)
+        disk.write(position, data[:n])
+        window[1] += n
+        self.bytes_written += n
+
+    # for Channel.external_termination: the transfer ends when the
+    # window is exhausted
+    def terminate(self, channel):
+        return self.window is None or self.window[1] >= self.window[2]
@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+# Linker and locator for relocatable object modules
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from memory import Memory
+from objectmodule import ObjectModule
+
+
+class Linker:
+
+    class LinkError(Exception):
+        pass
+
+    class UndefinedSymbol(LinkError):
+        def __init__(self, module, symbol):
+            super().__init__('module %s: undefined external symbol %s' % (module.name, symbol))
+
+    class DuplicateSymbol(LinkError):
+        def __init__(self, module, symbol, other):
+            super().__init__('module %s: public symbol %s already defined by module %s' % (module.name, symbol, other.name))
+
+    class FixupOutOfRange(LinkError):
+        def __init__(self, module, fixup):
+            super().__init__('module %s: fixup at offset %04x out of range' % (module.name, fixup.offset))
+
+    class Overlap(LinkError):
+        def __init__(self, module):
+            super().__init__('module %s overlaps another module' % module.name)
+
+    class OutOfMemory(LinkError):
+        def __init__(self, module):
+            super().__init__('module %s extends beyond end of memory' % module.name)
+
+    def __init__(self):
+        self.modules = [ ]
+        self.base = { }        # module index -> segment address
+        self.symtab = { }      # public symbol -> address
+        self.symbol_module = { }  # public symbol -> defining module
+
+    def add_module(self, module):
+        self.modules.append(module)
+
+    # Modules with an address given in addresses (by module name) are
+    # located there; the others are located in order following base,
+    # each aligned to a multiple of align, skipping over the regions
+    # occupied by the fixed modules.
+    def locate(self, base = 0, addresses = None, align = 2):
+        if addresses is None:
+            addresses = { }
+        self.base = { }
+        fixed = [ ]  # (start, end) of the fixed modules
+        for i, module in enumerate(self.modules):
+            if module.name in addresses:
+                self.base[i] = addresses[module.name]
+                fixed.append((self.base[i], self.base[i] + module.size()))
+        addr = base
+        for i, module in enumerate(self.modules):
+            if i in self.base:
+                continue
+            addr = (addr + align - 1) & ~(align - 1)
+            size = module.size()
+            moved = True
+            while moved:
+                moved = False
+                for start, end in fixed:
+                    if size and addr < end and start < addr + size:
+                        addr = (end + align - 1) & ~(align - 1)
+                        moved = True
+            self.base[i] = addr
+            addr += size
+
+    def resolve(self):
+        self.symtab = { }
+        self.symbol_module = { }
+        for i, module in enumerate(self.modules):
+            base = self.base[i]
+            for symbol, (value, relocatable) in module.publics.items():
+                if symbol in self.symtab:
+                    raise Linker.DuplicateSymbol(module, symbol, self.symbol_module[symbol])
+                if relocatable:
+                    value += base
+                self.symtab[symbol] = value & 0xffff
+                self.symbol_module[symbol] = module
+        for module in self.modules:
+            for symbol in module.externals:
+                if symbol not in self.symtab:
+                    raise Linker.UndefinedSymbol(module, symbol)
+
+    # Applies the fixups of module, located at base, to a copy of its
+    # segment image, which is returned along with the valid map.
+    def relocate(self, module, base):
+        size = module.size()
+        image = module.memory.data[:size]
+        valid = module.memory.valid[:size]
+        value_by_kind = { 'seg': base, 'abs': 0 }
+        for fx in module.fixups:
+            if fx.kind == 'ext':
+                value = self.symtab[fx.symbol]
+            else:
+                value = value_by_kind[fx.kind]
+            if fx.pcrel:
+                value -= base
+            if fx.width == 16:
+                v = image[fx.offset] + (image[fx.offset + 1] << 8) + value
+                image[fx.offset]     = v & 0xff
+                image[fx.offset + 1] = (v >> 8) & 0xff
+            else:
+                v = image[fx.offset]
+                if v & 0x80:
+                    v -= 0x100  # displacement is signed
+                v += value
+                if fx.pcrel and ((v + 0x80) & 0xffff) >= 0x100:
+                    raise Linker.FixupOutOfRange(module, fx)
+                image[fx.offset] = v & 0xff
+        return image, valid
+
+    # returns a Memory containing all of the located, relocated modules
+    def link(self, memory = None):
+        self.resolve()
+        if memory is None:
+            memory = Memory()
+        for i, module in enumerate(self.modules):
+            base = self.base[i]
+            image, valid = self.relocate(module, base)
+            if base + len(image) > len(memory):
+                raise Linker.OutOfMemory(module)
+            first = valid.find(1)
+            while first >= 0:
+                last = valid.find(0, first)
+                if last < 0:
+                    last = len(valid)
+                try:
+                    memory[base+first:base+last] = image[first:last]
+                except Memory.UpdateAttempted:
+                    raise Linker.Overlap(module)
+                first = valid.find(1, last)
+        return memory
+
+    def write_map(self, f):
+        print('module    base  size', file = f)
+        for i, module in enumerate(self.modules):
+            print('%-8s  %04x  %04x' % (module.name, self.base[i], module.size()), file = f)
+        print(file = f)
+        for symbol in sorted(self.symtab, key = lambda s: (self.symtab[s], s)):
+            print('%04x %-8s %s' % (self.symtab[symbol], symbol, self.symbol_module[symbol].name), file = f)
+
+
+if __name__ == '__main__':
+    import sys
+    linker = Linker()
+    for fn in sys.argv[1:]:
+        with open(fn) as f:
+            linker.add_module(ObjectModule.read(f))
+    linker.locate()
+    linker.link()
+    linker.write_map(sys.stdout)
@@ -42,6 +42,29 @@ class Memory:
             self.data = bytearray(data)
             self.valid = bytearray([1] * self.size)
         self.write_once = write_once
+        self.write_hooks = [ ]
+
+    # fn(start, stop) will be called after each write or deinit, with
+    # the range of addresses affected, from start up to but not
+    # including stop
+    def add_write_hook(self, fn):
+        self.write_hooks.append(fn)
+
+    def remove_write_hook(self, fn):
+        self.write_hooks.remove(fn)
+
+    def _call_write_hooks(self, address):
+        if isinstance(address, slice):
+            r = range(*address.indices(self.size))
+            if not r:
+                return
+            start, stop = r[0], r[-1] + 1
+            if start > stop:
+                start, stop = r[-1], r[0] + 1
+        else:
+            start, stop = address, address + 1
+        for fn in self.write_hooks:
+            fn(start, stop)
 
     def __len__(self):
         return self.size
@@ -64,7 +87,7 @@ class Memory:
         if sl.step is None:
             return stop - 1
         else:
-            return sl.start + sl.step * (Memory._slice_len(sl) - 1)
+            return sl.start + sl.step * (self._slice_len(sl) - 1)
 
     def __getitem__(self, address):
         if isinstance(address, slice):
@@ -78,22 +101,46 @@ class Memory:
                 raise Memory.Uninitialized()
             return self.data[address]
 
+    # Returns a memoryview of the contents from start up to but not
+    # including stop, without copying them.  The view reflects later
+    # writes, so it should not be kept.
+    def view(self, start, stop):
+        if start < 0 or stop > self.size:
+            raise IndexError()
+        if self.valid.find(0, start, stop) > -1:
+            raise Memory.Uninitialized()
+        return memoryview(self.data)[start:stop]
+
+    # Returns count bytes read from the port at address, in accesses of
+    # width bytes.  Memory gives the same value for each read.
+    def read_port(self, address, count, width = 1):
+        return (bytes(self.view(address, address + width)) * (count // width + 1))[:count]
+
+    # Writes data to the port at address, in accesses of width bytes.
+    # In memory only the last write remains.
+    def write_port(self, address, data, width = 1):
+        last = (len(data) - 1) // width * width
+        self[address:address+len(data)-last] = data[last:]
+
     def __setitem__(self, address, data):
         if isinstance(address, slice):
             if self.write_once and self.valid[address].find(1) > -1:
                 raise Memory.UpdateAttempted()
             self.data[address] = data # can raise IndexError or ValueError
-            # possibly itertools.repeat might be faster than list multiplications?
-            self.valid[address] = [1] * self._slice_len(address)
+            self.valid[address] = b'\x01' * self._slice_len(address)
         else:
             if self.write_once and self.valid[address]:
                 raise Memory.UpdateAttempted()
             self.data[address] = data # can raise IndexError or ValueError
             self.valid[address] = 1
+        if self.write_hooks:
+            self._call_write_hooks(address)
 
     # can pass a slice object for address
     def deinit(self, address):
         self.valid[address] = 0
+        if self.write_hooks:
+            self._call_write_hooks(address)
 
     # returns a slice object giving the range from
     # the first valid address to the last valid address,
@@ -111,9 +158,22 @@ class Memory:
             raise Memory.Uninitialized()
         last = self.valid.find(0, first + 1)
         if last < 0:
-            last = self.size - 1
+            last = self.size
         return slice(first, last)
 
+    # generates slice objects for the ranges of consecutive valid
+    # addresses from start up to but not including stop
+    def valid_ranges(self, start = 0, stop = None):
+        if stop is None or stop > self.size:
+            stop = self.size
+        first = self.valid.find(1, start, stop)
+        while first >= 0:
+            last = self.valid.find(0, first + 1, stop)
+            if last < 0:
+                last = stop
+            yield slice(first, last)
+            first = self.valid.find(1, last, stop)
+
     def truncate(self, last = None):
         if last is None:
             last = self.valid.rfind(1)
@@ -136,6 +196,25 @@ class Memory:
             mem[i::count] = meml[i]
         return mem
 
+    # The reverse of interleave: returns a list of count Memory, the
+    # first holding locations start, start + count, start + 2 * count,
+    # etc., the second start + 1, start + 1 + count, etc.  Each is copied
+    # with a single strided slice of data and of valid.  Locations at or
+    # beyond the end of this memory are uninitialized in the results.
+    def deinterleave(self, count, start = 0, stop = None):
+        if stop is None:
+            stop = self.size
+        # the range must divide evenly into the lanes
+        assert (stop - start) % count == 0
+        meml = []
+        for i in range(count):
+            mem = Memory(size = (stop - start) // count, write_once = self.write_once)
+            data = self.data[start+i:stop:count]
+            mem.data[:len(data)] = data
+            mem.valid[:len(data)] = self.valid[start+i:stop:count]
+            meml.append(mem)
+        return meml
+
 
 if __name__ == '__main__':
     memory = Memory()
@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+# Parallel multi-module assembly
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Each source file is assembled by its own ASI89 instance in a worker
+# process.  Workers return absolute images as lists of (address, data)
+# ranges, or relocatable ObjectModules, which are merged by the parent.
+
+import contextlib
+import io
+import multiprocessing
+import os
+
+from memory import Memory
+from toolloader import load_tool
+
+
+class ModuleResult:
+    def __init__(self, srcname):
+        self.srcname = srcname
+        self.output = ''     # assembler messages
+        self.error = None    # error message, if assembly failed
+        self.ranges = None   # absolute: [ (address, data), ... ]
+        self.module = None   # relocatable: ObjectModule
+
+
+# per worker process state, set up by worker_init()
+_asi89 = None
+_i89 = None
+_ep = None
+
+def worker_init():
+    global _asi89, _i89, _ep
+    _asi89 = load_tool('asi89')
+    _i89 = _asi89.I89()
+    _ep = _asi89.ExpressionParser()
+
+
+def assemble_module(srcname, relocatable = False, relax = False,
+                    include_dirs = None, listing = False, incremental = False):
+    if _asi89 is None:
+        worker_init()
+    result = ModuleResult(srcname)
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out), open(srcname) as srcfile:
+            listfile = None
+            if listing:
+                listfile = open(os.path.splitext(srcname)[0] + '.lst', 'w')
+            cachefile = None
+            if incremental:
+                cachefile = srcname + '.cache'
+            try:
+                asi89 = _asi89.ASI89(srcfile, listfile, None,
+                                     relax = relax, cachefile = cachefile,
+                                     i89 = _i89, ep = _ep,
+                                     include_dirs = include_dirs,
+                                     relocatable = relocatable)
+                asi89.assemble()
+            finally:
+                if listfile is not None:
+                    listfile.close()
+        if relocatable:
+            result.module = asi89.object_module()
+        else:
+            result.ranges = []
+            valid = asi89.memory.valid
+            first = valid.find(1)
+            while first >= 0:
+                last = valid.find(0, first)
+                if last < 0:
+                    last = len(valid)
+                result.ranges.append((first, bytes(asi89.memory.data[first:last])))
+                first = valid.find(1, last)
+    except (_asi89.AssemblerError, OSError) as e:
+        # AssemblerError can't be pickled, so return the message
+        result.error = '%s: %s' % (srcname, e)
+    result.output = out.getvalue()
+    return result
+
+
+def _assemble_module_args(args):
+    i, srcname, kwargs = args
+    return i, assemble_module(srcname, **kwargs)
+
+def _source_size(srcname):
+    try:
+        return os.path.getsize(srcname)
+    except OSError:
+        return 0
+
+
+# Returns a list of ModuleResult in the same order as srcnames.  jobs
+# defaults to the number of CPUs; with jobs == 1 no pool is used.
+def assemble_modules(srcnames, jobs = None, **kwargs):
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(srcnames))
+    work = [(i, srcnames[i], kwargs) for i in range(len(srcnames))]
+    if jobs <= 1:
+        return [_assemble_module_args(w)[1] for w in work]
+    # start the largest sources first, so that the total time approaches
+    # that of the largest module
+    work.sort(key = lambda w: _source_size(w[1]), reverse = True)
+    results = [None] * len(work)
+    with multiprocessing.Pool(jobs, initializer = worker_init) as pool:
+        for i, result in pool.imap_unordered(_assemble_module_args, work):
+            results[i] = result
+    return results
+
+
+class Overlap(Exception):
+    def __init__(self, srcname, addr):
+        super().__init__('%s: data at %04x overlaps another module' % (srcname, addr))
+
+# merges absolute images into one Memory, detecting overlaps
+def merge_absolute(results, memory = None):
+    if memory is None:
+        memory = Memory()
+    for result in results:
+        for addr, data in result.ranges:
+            try:
+                memory[addr:addr+len(data)] = data
+            except Memory.UpdateAttempted:
+                raise Overlap(result.srcname, addr)
+    return memory
+
+
+if __name__ == '__main__':
+    import sys
+    for result in assemble_modules(sys.argv[1:]):
+        print(result.srcname, result.error or [(hex(a), len(d)) for a, d in result.ranges])
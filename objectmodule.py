@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+# Relocatable object module
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# An object module holds a single relocatable segment.  Its contents
+# are assembled as if the segment were located at address zero; the
+# fixups describe the fields that must be adjusted when the segment is
+# located, or when external symbols are resolved.
+#
+# The file format is JSON:
+#   { "format":    "i89-object",
+#     "version":   1,
+#     "name":      module name,
+#     "data":      [ [ offset, hex string ], ... ],
+#     "publics":   { name: [ value, relocatable ], ... },
+#     "externals": [ name, ... ],
+#     "fixups":    [ [ offset, width, pcrel, kind, symbol ], ... ] }
+
+import json
+
+from memory import Memory
+
+
+class ObjectModule:
+
+    class BadFormat(Exception):
+        pass
+
+    format_name = 'i89-object'
+    format_version = 1
+
+    # A fixup adds a value to the 8 or 16 bit little-endian field at
+    # offset.  The value depends on kind:
+    #   'seg'  the address at which the segment is located
+    #   'ext'  the value of the external symbol
+    #   'abs'  zero
+    # If pcrel is true, the segment address is then subtracted, since the
+    # field holds a displacement relative to a location in the segment.
+    class Fixup:
+        __slots__ = ('offset', 'width', 'pcrel', 'kind', 'symbol')
+
+        def __init__(self, offset, width, pcrel, kind, symbol = None):
+            self.offset = offset
+            self.width  = width
+            self.pcrel  = pcrel
+            self.kind   = kind
+            self.symbol = symbol
+
+        def __repr__(self):
+            return 'Fixup(%04x, %d, %s, %s, %s)' % (self.offset, self.width, self.pcrel,
+                                                   self.kind, self.symbol)
+
+    def __init__(self, name = None, memory = None):
+        self.name = name
+        if memory is None:
+            memory = Memory()
+        self.memory = memory
+        self.publics = { }    # name -> (value, relocatable)
+        self.externals = [ ]
+        self.fixups = [ ]
+
+    # valid ranges of the segment, as (offset, data) pairs
+    def ranges(self):
+        ranges = []
+        addr = 0
+        while addr < len(self.memory):
+            first = self.memory.valid.find(1, addr)
+            if first < 0:
+                break
+            last = self.memory.valid.find(0, first)
+            if last < 0:
+                last = len(self.memory)
+            ranges.append((first, self.memory.data[first:last]))
+            addr = last
+        return ranges
+
+    # size of the segment, including any uninitialized space before
+    # the last initialized byte
+    def size(self):
+        return self.memory.valid.rfind(1) + 1
+
+    def write(self, f):
+        obj = { 'format':    self.format_name,
+                'version':   self.format_version,
+                'name':      self.name,
+                'data':      [[offset, bytes(data).hex()] for offset, data in self.ranges()],
+                'publics':   { k: list(v) for k, v in self.publics.items() },
+                'externals': self.externals,
+                'fixups':    [[fx.offset, fx.width, fx.pcrel, fx.kind, fx.symbol]
+                              for fx in self.fixups] }
+        json.dump(obj, f, indent = 1, sort_keys = True)
+        f.write('\n')
+
+    @staticmethod
+    def read(f, size = 0x10000):
+        try:
+            obj = json.load(f)
+        except ValueError as e:
+            raise ObjectModule.BadFormat(str(e))
+        if obj.get('format') != ObjectModule.format_name:
+            raise ObjectModule.BadFormat('not an i89 object module')
+        if obj.get('version') != ObjectModule.format_version:
+            raise ObjectModule.BadFormat('unsupported object module version %s' % obj.get('version'))
+        module = ObjectModule(obj['name'], Memory(size = size))
+        for offset, data in obj['data']:
+            data = bytes.fromhex(data)
+            module.memory[offset:offset+len(data)] = data
+        module.publics = { k: tuple(v) for k, v in obj['publics'].items() }
+        module.externals = obj['externals']
+        module.fixups = [ObjectModule.Fixup(*fx) for fx in obj['fixups']]
+        return module
+
+
+if __name__ == '__main__':
+    import sys
+    for fn in sys.argv[1:]:
+        with open(fn) as f:
+            module = ObjectModule.read(f)
+        print('module %s, size %04x' % (module.name, module.size()))
+        for name in sorted(module.publics):
+            value, relocatable = module.publics[name]
+            print('  public %-8s %04x%s' % (name, value, ' R' if relocatable else ''))
+        for name in module.externals:
+            print('  extrn  %s' % name)
+        for fx in module.fixups:
+            print(' ', fx)
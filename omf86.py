@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+# Intel OMF-86 object file reader
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Reads the data and public symbols of OMF-86 object and absolute files,
+# as produced by ASM89, LINK86, and LOC86, one record at a time.
+#
+# Absolute data (PEDATA, PIDATA) and data in absolute segments is loaded
+# at its physical address.  Relocatable segments are located in order of
+# their SEGDEF records starting at address zero, observing their
+# alignment.  Fixups are not applied, so fields referring to relocatable
+# segments or external symbols hold their unrelocated values.
+
+import struct
+
+from memory import Memory
+
+
+class OMF86:
+
+    class BadFormat(Exception):
+        pass
+
+    class BadChecksum(BadFormat):
+        pass
+
+    class AddressOutOfRange(BadFormat):
+        pass
+
+    THEADR = 0x80
+    LHEADR = 0x82
+    PEDATA = 0x84
+    PIDATA = 0x86
+    MODEND = 0x8a
+    PUBDEF = 0x90
+    SEGDEF = 0x98
+    LEDATA = 0xa0
+    LIDATA = 0xa2
+    LPUBDEF = 0xb6
+
+    # SEGDEF alignment field (A) -> alignment in bytes
+    segment_alignment = { 1: 1, 2: 2, 3: 16, 4: 256, 5: 4, 6: 16 }
+
+    # Cursor over the contents of a single record.
+    class Record:
+        def __init__(self, rec_type, data):
+            self.rec_type = rec_type
+            self.data = data
+            self.pos = 0
+
+        def at_end(self):
+            return self.pos >= len(self.data)
+
+        def bytes(self, count):
+            if self.pos + count > len(self.data):
+                raise OMF86.BadFormat('record %02x truncated' % self.rec_type)
+            b = self.data[self.pos:self.pos+count]
+            self.pos += count
+            return b
+
+        def ui8(self):
+            return self.bytes(1)[0]
+
+        def ui16(self):
+            return struct.unpack('<H', self.bytes(2))[0]
+
+        def index(self):
+            b = self.ui8()
+            if b & 0x80:
+                b = ((b & 0x7f) << 8) + self.ui8()
+            return b
+
+        def name(self):
+            return self.bytes(self.ui8()).decode('ascii', 'replace')
+
+        # An iterated data block is a repeat count and a block count,
+        # followed either by that many nested blocks or, if the block
+        # count is zero, by a counted string of data bytes.  The expansion
+        # is built by sequence repetition rather than byte by byte.
+        def iterated_block(self):
+            repeat = self.ui16()
+            blocks = self.ui16()
+            if blocks == 0:
+                content = self.bytes(self.ui8())
+            else:
+                content = b''.join([self.iterated_block() for i in range(blocks)])
+            return content * repeat
+
+
+    def __init__(self):
+        self.module_name = None
+        self.publics = { }      # name -> address
+        self.segment_base = [ None ]   # SEGDEF index -> address; indices start at 1
+
+    def get_record(self):
+        header = self.f.read(3)
+        if len(header) == 0:
+            raise EOFError()
+        if len(header) != 3:
+            raise OMF86.BadFormat('truncated record header')
+        rec_type, length = struct.unpack('<BH', header)
+        body = self.f.read(length)
+        if length == 0 or len(body) != length:
+            raise OMF86.BadFormat('truncated record %02x' % rec_type)
+        self.rn += 1
+        # a checksum byte of zero means that no checksum was computed
+        if body[-1] != 0 and (rec_type + (length & 0xff) + (length >> 8) + sum(body)) & 0xff:
+            raise OMF86.BadChecksum('bad checksum for record #%d' % self.rn)
+        return OMF86.Record(rec_type, body[:-1])
+
+    def store(self, addr, data):
+        if addr + len(data) > len(self.memory):
+            raise OMF86.AddressOutOfRange('data at %05x for record #%d is beyond end of memory' % (addr, self.rn))
+        self.memory[addr:addr+len(data)] = data
+
+    def segment_address(self, seg):
+        if seg == 0 or seg >= len(self.segment_base):
+            raise OMF86.BadFormat('undefined segment index %d in record #%d' % (seg, self.rn))
+        return self.segment_base[seg]
+
+    def physical_address(self, rec):
+        frame = rec.ui16()
+        return (frame << 4) + rec.ui8()
+
+    def segdef(self, rec):
+        acbp = rec.ui8()
+        align = acbp >> 5
+        if align == 0:
+            base = self.physical_address(rec)
+        elif align == 6:
+            rec.bytes(5)  # LTL data, maximum segment length, group offset
+        length = rec.ui16()
+        if acbp & 0x02 and length == 0:
+            length = 0x10000
+        if align != 0:
+            a = self.segment_alignment.get(align)
+            if a is None:
+                raise OMF86.BadFormat('unsupported segment alignment %d in record #%d' % (align, self.rn))
+            base = (self.next_base + a - 1) & ~(a - 1)
+            self.next_base = base + length
+        self.segment_base.append(base)
+
+    def pubdef(self, rec):
+        rec.index()  # group index
+        seg = rec.index()
+        if seg == 0:
+            base = rec.ui16() << 4
+        else:
+            base = self.segment_address(seg)
+        while not rec.at_end():
+            name = rec.name()
+            offset = rec.ui16()
+            rec.index()  # type index
+            self.publics[name] = base + offset
+
+    def lidata(self, rec, addr):
+        blocks = []
+        while not rec.at_end():
+            blocks.append(rec.iterated_block())
+        self.store(addr, b''.join(blocks))
+
+    # If memory is not provided, a new Memory will be allocated, and
+    # truncated after the last byte loaded.
+    def read(self, f, memory = None):
+        self.f = f
+        if memory is None:
+            self.memory = Memory(size = 0x10000)
+        else:
+            self.memory = memory
+        self.rn = 0
+        self.next_base = 0
+
+        try:
+            while True:
+                rec = self.get_record()
+                if self.rn == 1 and rec.rec_type not in (OMF86.THEADR, OMF86.LHEADR):
+                    raise OMF86.BadFormat('not an OMF-86 file')
+                if rec.rec_type in (OMF86.THEADR, OMF86.LHEADR):
+                    self.module_name = rec.name()
+                elif rec.rec_type == OMF86.SEGDEF:
+                    self.segdef(rec)
+                elif rec.rec_type in (OMF86.PUBDEF, OMF86.LPUBDEF):
+                    self.pubdef(rec)
+                elif rec.rec_type == OMF86.LEDATA:
+                    addr = self.segment_address(rec.index()) + rec.ui16()
+                    self.store(addr, rec.data[rec.pos:])
+                elif rec.rec_type == OMF86.LIDATA:
+                    addr = self.segment_address(rec.index()) + rec.ui16()
+                    self.lidata(rec, addr)
+                elif rec.rec_type == OMF86.PEDATA:
+                    addr = self.physical_address(rec)
+                    self.store(addr, rec.data[rec.pos:])
+                elif rec.rec_type == OMF86.PIDATA:
+                    addr = self.physical_address(rec)
+                    self.lidata(rec, addr)
+                elif rec.rec_type == OMF86.MODEND:
+                    break
+                # other records don't affect the image or public symbols
+        except EOFError:
+            pass
+
+        if memory is None:
+            self.memory.truncate()
+        return self.memory
+
+
+if __name__ == '__main__':
+    import sys
+    for fn in sys.argv[1:]:
+        with open(fn, 'rb') as f:
+            omf = OMF86()
+            memory = omf.read(f)
+        print('module %s, %d bytes' % (omf.module_name, len(memory)))
+        for name in sorted(omf.publics, key = lambda n: omf.publics[n]):
+            print('  %05x %s' % (omf.publics[name], name))
@@ -0,0 +1,37 @@
+#!/usr/bin/python3
+# Raw binary file writer
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from memory import Memory
+
+class RawBinary:
+
+    # Writes the contents of memory from start up to but not including
+    # stop, by default from the first through the last valid byte.
+    # Uninitialized locations are written as the fill byte.
+    def write(self, f, memory, fill = 0xff, start = None, stop = None):
+        if start is None or stop is None:
+            try:
+                bounds = memory.valid_bounds()
+            except Memory.Uninitialized:
+                return
+            if start is None:
+                start = bounds.start
+            if stop is None:
+                stop = bounds.stop
+        image = bytearray([fill]) * (stop - start)
+        for sl in memory.valid_ranges(start, stop):
+            image[sl.start-start:sl.stop-start] = memory.data[sl]
+        f.write(image)
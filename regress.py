@@ -0,0 +1,447 @@
+#!/usr/bin/python3
+# Parallel regression runner for simulated 8089 channel programs
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# A Suite, read from a JSON file, gives the firmware image and a list of
+# test cases:
+#
+#   { "image":     [ "fw.hex" ],      Intel hex files, relative to the
+#                                     suite file
+#     "io":        false,             image and channel programs in I/O
+#                                     space
+#     "init":      { "tp": "0x100", "pp": "0x400" },
+#                                     optional program run once, before
+#                                     the cases
+#     "max_steps": 1000000,           default instruction limit
+#     "isbc215":   "0x80",            port of an iSBC 215 disk controller
+#                                     in I/O space
+#     "disks":     [ { "file": "blank.img", "geometry": [ 200, 2, 8 ],
+#                      "sector_size": 512 } ],
+#                                     disk images by unit, or null for
+#                                     none; sector_size is optional
+#     "cases": [
+#       { "name":      "read",
+#         "tp":        "0x100",       channel 0 program and parameter
+#         "pp":        "0x400",       block; "tp1" and "pp1" start
+#                                     channel 1
+#         "memory":    { "0x400": "01 00 00 20" },
+#         "io_memory": { "0x8000": { "file": "sector.bin" } },
+#                                     written before starting
+#         "max_steps": 100000,
+#         "disks":     [ ... ],       disk images for this case, as above,
+#                                     instead of the suite's
+#         "expect": {
+#           "memory":     { "0x2000": "55 aa" },
+#           "io_memory":  { },
+#           "disks":      { "0": { "0x200": "e5 e5" } },
+#                                     contents of each unit at offsets
+#                                     in its image
+#           "regs":       { "bc": 0 },  channel 0 registers
+#           "halted":     true,         the default
+#           "interrupts": 1 } } ] }
+#
+# Numbers may be JSON numbers or strings such as "0x400"; memory and
+# disk contents are hexadecimal strings, or the name of a binary file.
+# Disk image files are never changed: each case opens its images
+# afresh, or restores the suite's along with the snapshot.
+#
+# The image is loaded once, into a file that each worker process maps,
+# so it isn't pickled for each worker.  Each worker runs the init
+# program, takes a Snapshot, and restores it before each case.  Cases
+# are handed to the workers in chunks; for each chunk a worker returns
+# the results of its cases and a CoverageMap of the instructions they
+# executed, which the parent merges.
+
+import json
+import mmap
+import multiprocessing
+import os
+import tempfile
+
+from channel import Channel
+from covmap import CoverageMap, CoveringChannel
+from devices import DeviceMemory
+from intelhex import IntelHex
+from iop import IOP
+from isbc215 import DiskImage, ISBC215
+from memory import Memory
+from snapshot import Snapshot
+from timing import TimedChannel
+from translate import TranslatingChannel
+
+
+class Suite:
+
+    class BadFormat(Exception):
+        pass
+
+    class Case:
+        def __init__(self, name):
+            self.name = name
+            self.programs = [ ]  # (channel number, tp, pp)
+            self.writes = [ ]    # (space, address, data)
+            self.max_steps = None
+            self.disks = None    # disk specs, if not the suite's
+            self.expect_memory = [ ]  # (space, address, data)
+            self.expect_disks = [ ]   # (unit, offset, data)
+            self.expect_regs = { }    # register number -> value
+            self.expect_halted = True
+            self.expect_interrupts = None
+
+    default_max_steps = 1000000
+
+    @staticmethod
+    def number(x):
+        if isinstance(x, str):
+            return int(x, 0)
+        if isinstance(x, int):
+            return x
+        raise Suite.BadFormat('expected a number: %r' % (x,))
+
+    # Returns the bytes given by a hexadecimal string or a file,
+    # relative to directory.
+    @staticmethod
+    def data(value, directory, where):
+        if isinstance(value, dict):
+            with open(os.path.join(directory, value['file']), 'rb') as f:
+                return f.read()
+        try:
+            return bytes.fromhex(value)
+        except (TypeError, ValueError):
+            raise Suite.BadFormat('bad contents at %s' % where)
+
+    # Converts a memory dictionary of the suite file to a list of
+    # (space, address, data), reading files relative to directory.
+    @staticmethod
+    def contents(obj, directory):
+        result = [ ]
+        for key, space in (('memory', Channel.SYSTEM), ('io_memory', Channel.IO)):
+            for addr, value in obj.get(key, { }).items():
+                result.append((space, Suite.number(addr), Suite.data(value, directory, addr)))
+        return result
+
+    # Converts a list of disks of the suite file to a list, by unit, of
+    # the DiskImage arguments (file name, cylinders, heads, sectors,
+    # sector size), or None for no disk.
+    @staticmethod
+    def disk_specs(obj, directory):
+        if len(obj) > 4:
+            raise Suite.BadFormat('more than four disks')
+        specs = [ ]
+        for disk in obj:
+            if disk is None:
+                specs.append(None)
+                continue
+            geometry = [Suite.number(x) for x in disk['geometry']]
+            if len(geometry) != 3:
+                raise Suite.BadFormat('disk geometry is not [cylinders, heads, sectors]')
+            specs.append([os.path.join(directory, disk['file'])] + geometry +
+                         [Suite.number(disk.get('sector_size', 512))])
+        return specs
+
+    def __init__(self, f, directory = '.'):
+        try:
+            obj = json.load(f)
+        except ValueError as e:
+            raise Suite.BadFormat(str(e))
+        try:
+            self.io = obj.get('io', False)
+            self.tag = Channel.IO if self.io else Channel.SYSTEM
+            self.image = [ ]     # (address, data) ranges
+            for fn in obj.get('image', [ ]):
+                with open(os.path.join(directory, fn), 'rb') as hf:
+                    memory = IntelHex().read(hf, memory = Memory(size = 0x100000))
+                for r in memory.valid_ranges():
+                    self.image.append((r.start, bytes(memory.data[r])))
+            self.max_steps = Suite.number(obj.get('max_steps', Suite.default_max_steps))
+            self.isbc215 = None
+            if 'isbc215' in obj:
+                self.isbc215 = Suite.number(obj['isbc215'])
+            self.disks = Suite.disk_specs(obj.get('disks', [ ]), directory)
+            if self.disks and self.isbc215 is None:
+                raise Suite.BadFormat('disks without an isbc215 controller')
+            self.init = None
+            if 'init' in obj:
+                self.init = self.case('init', obj['init'], directory)
+            self.cases = [self.case(c.get('name', str(i)), c, directory)
+                          for i, c in enumerate(obj['cases'])]
+        except (KeyError, AttributeError) as e:
+            raise Suite.BadFormat('missing or malformed item %s' % e)
+
+    def case(self, name, obj, directory):
+        case = Suite.Case(name)
+        case.programs.append((0, Suite.number(obj['tp']), Suite.number(obj.get('pp', 0))))
+        if 'tp1' in obj:
+            case.programs.append((1, Suite.number(obj['tp1']), Suite.number(obj.get('pp1', 0))))
+        case.writes = Suite.contents(obj, directory)
+        case.max_steps = Suite.number(obj.get('max_steps', self.max_steps))
+        if 'disks' in obj:
+            case.disks = Suite.disk_specs(obj['disks'], directory)
+        expect = obj.get('expect', { })
+        case.expect_memory = Suite.contents(expect, directory)
+        for unit, disk_contents in expect.get('disks', { }).items():
+            if not 0 <= Suite.number(unit) < 4:
+                raise Suite.BadFormat('case %s: no disk unit %s' % (name, unit))
+            for offset, value in disk_contents.items():
+                case.expect_disks.append((Suite.number(unit), Suite.number(offset),
+                                          Suite.data(value, directory, offset)))
+        if (case.disks is not None or case.expect_disks) and self.isbc215 is None:
+            raise Suite.BadFormat('case %s: disks without an isbc215 controller' % name)
+        for name, value in expect.get('regs', { }).items():
+            try:
+                case.expect_regs[Channel.Reg[name.lower()].value] = Suite.number(value)
+            except KeyError:
+                raise Suite.BadFormat('unknown register %s' % name)
+        case.expect_halted = expect.get('halted', True)
+        if 'interrupts' in expect:
+            case.expect_interrupts = Suite.number(expect['interrupts'])
+        return case
+
+    @staticmethod
+    def read(fn):
+        with open(fn) as f:
+            return Suite(f, os.path.dirname(fn))
+
+
+class CaseResult:
+    def __init__(self, name):
+        self.name = name
+        self.failures = [ ]  # messages; the case passed if empty
+        self.instructions = 0
+        self.cycles = 0
+
+    @property
+    def passed(self):
+        return not self.failures
+
+
+class TimedSimChannel(CoveringChannel, TimedChannel):
+    pass
+
+class TranslatingSimChannel(CoveringChannel, TranslatingChannel):
+    pass
+
+
+# Simulates the cases of a suite, from a memory image file written by
+# write_image().  If cycles is false, clock cycles aren't counted, and
+# block translation is used.
+class Simulation:
+
+    class InitFailed(Exception):
+        pass
+
+    def __init__(self, image_fn, suite, i89 = None, cycles = True):
+        self.suite = suite
+        self.cycles = cycles
+        with open(image_fn, 'rb') as f:
+            image = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        view = memoryview(image)
+        system = Memory(data = view[:0x100000], write_once = False)
+        if suite.isbc215 is None:
+            io = Memory(data = view[0x100000:], write_once = False)
+        else:
+            io = DeviceMemory(data = view[0x100000:])
+        view.release()
+        image.close()
+        self.controller = None
+        if suite.isbc215 is not None:
+            try:
+                self.controller = ISBC215(Simulation.open_disks(suite.disks))
+                io.attach(self.controller, suite.isbc215)
+            except (DiskImage.BadImage, OSError, DeviceMemory.PortConflict, IndexError) as e:
+                raise Simulation.InitFailed('isbc215: %s' % (str(e) or e.__class__.__name__))
+        self.coverage = CoverageMap()
+        self.iop = IOP(system, io, i89 = i89, channel_class = TimedSimChannel if cycles else TranslatingSimChannel,
+                       channel_args = { 'coverage': self.coverage })
+        if self.controller is not None:
+            for channel in self.iop.channels:
+                channel.external_termination = self.controller.terminate
+        if suite.init is not None:
+            result = self.run_case(suite.init)
+            if not result.passed:
+                raise Simulation.InitFailed('init: ' + '; '.join(result.failures))
+        self.snapshot = Snapshot(self.iop)
+
+    # Opens the disk images of a list of specs, for four units, keeping
+    # changes in memory.
+    @staticmethod
+    def open_disks(specs):
+        disks = [None if spec is None else DiskImage(*spec) for spec in specs]
+        return (disks + [None] * 4)[:4]
+
+    # Starts a new CoverageMap.  The translated blocks are discarded, so
+    # that their instructions are marked again when next executed.
+    def new_coverage(self):
+        self.coverage = CoverageMap()
+        for channel in self.iop.channels:
+            channel.coverage = self.coverage
+            for space in (Channel.SYSTEM, Channel.IO):
+                channel.invalidate(space, 0, len(channel.space[space]))
+
+    def elapsed_cycles(self):
+        if not self.cycles:
+            return 0
+        return sum(channel.cycles for channel in self.iop.channels)
+
+    # A case with its own disks runs with them in place of the suite's,
+    # which are put back for the snapshot to restore.
+    def run_case(self, case):
+        controller = self.controller
+        if case.disks is None:
+            return self.check_case(case)
+        suite_disks = controller.disks
+        try:
+            controller.disks = Simulation.open_disks(case.disks)
+        except (DiskImage.BadImage, OSError) as e:
+            controller.disks = suite_disks
+            result = CaseResult(case.name)
+            result.failures.append(str(e))
+            return result
+        try:
+            return self.check_case(case)
+        finally:
+            for disk in controller.disks:
+                if disk is not None:
+                    disk.close()
+            controller.disks = suite_disks
+
+    def check_case(self, case):
+        iop = self.iop
+        space = iop.space
+        result = CaseResult(case.name)
+        cycles = self.elapsed_cycles()
+        interrupts = len(iop.interrupts)
+        try:
+            for s, addr, data in case.writes:
+                space[s][addr:addr+len(data)] = data
+            for number, tp, pp in case.programs:
+                iop.start(number, tp, pp, tag = self.suite.tag)
+            result.instructions = iop.run(case.max_steps)
+        except (Channel.SimulatorError, IndexError, ValueError) as e:
+            result.failures.append(str(e) or e.__class__.__name__)
+        result.cycles = self.elapsed_cycles() - cycles
+        if case.expect_halted and not iop.halted:
+            result.failures.append('not halted after %d instructions' % result.instructions)
+        channel = iop.channels[0]
+        for r, value in sorted(case.expect_regs.items()):
+            if channel.regs[r] != value:
+                result.failures.append('%s is %x, expected %x' % (Channel.Reg(r).name, channel.regs[r], value))
+        for s, addr, data in case.expect_memory:
+            actual = bytes(space[s].data[addr:addr+len(data)])
+            if actual != data:
+                i = next(i for i in range(len(data)) if i >= len(actual) or actual[i] != data[i])
+                result.failures.append('%s memory at %05x differs' % (('system', 'I/O')[s], addr + i))
+        for unit, offset, data in case.expect_disks:
+            disk = self.controller.disks[unit]
+            if disk is None:
+                result.failures.append('no disk in unit %d' % unit)
+                continue
+            actual = bytes(disk.map[offset:offset+len(data)])
+            if actual != data:
+                i = next(i for i in range(len(data)) if i >= len(actual) or actual[i] != data[i])
+                result.failures.append('disk %d at offset %x differs' % (unit, offset + i))
+        if case.expect_interrupts is not None:
+            count = len(iop.interrupts) - interrupts
+            if count != case.expect_interrupts:
+                result.failures.append('%d interrupts, expected %d' % (count, case.expect_interrupts))
+        return result
+
+    # Runs cases, each from the snapshot.  Returns a list of CaseResult
+    # and a CoverageMap.
+    def run_cases(self, cases):
+        self.new_coverage()
+        results = [ ]
+        for case in cases:
+            self.snapshot.restore()
+            results.append(self.run_case(case))
+        self.snapshot.restore()
+        return results, self.coverage
+
+
+# Writes the image of a suite, as loaded in the system (or I/O) space,
+# to a file: 1M bytes of system space followed by 64K bytes of I/O
+# space, with locations not in the image zero.
+def write_image(suite, f):
+    system = bytearray(0x100000)
+    io = bytearray(0x10000)
+    space = io if suite.io else system
+    for addr, data in suite.image:
+        space[addr:addr+len(data)] = data
+    f.write(system)
+    f.write(io)
+    f.flush()
+
+
+# per worker process state, set up by worker_init()
+_simulation = None
+_suite = None
+_init_error = None
+
+# An exception in a pool initializer would make the pool start workers
+# forever, so a failure is reported by _run_chunk instead.
+def worker_init(image_fn, suite, cycles):
+    global _simulation, _suite, _init_error
+    _suite = suite
+    _simulation = None
+    _init_error = None
+    try:
+        _simulation = Simulation(image_fn, suite, cycles = cycles)
+    except Simulation.InitFailed as e:
+        _init_error = str(e)
+
+def _run_chunk(args):
+    if _init_error is not None:
+        raise Simulation.InitFailed(_init_error)
+    first, last = args
+    results, coverage = _simulation.run_cases(_suite.cases[first:last])
+    return first, results, coverage
+
+
+# Runs the cases of a suite.  Returns a list of CaseResult in the same
+# order as suite.cases, and the merged CoverageMap.  jobs defaults to
+# the number of CPUs; with jobs == 1 no pool is used.
+def run_suite(suite, jobs = None, chunk_size = None, cycles = True):
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(suite.cases)))
+    if chunk_size is None:
+        # several chunks per worker, to balance the load
+        chunk_size = max(1, min(64, len(suite.cases) // (jobs * 8)))
+    chunks = [(i, min(i + chunk_size, len(suite.cases)))
+              for i in range(0, len(suite.cases), chunk_size)]
+    results = [None] * len(suite.cases)
+    coverage = CoverageMap()
+    def collect(outputs):
+        for first, chunk_results, chunk_coverage in outputs:
+            results[first:first+len(chunk_results)] = chunk_results
+            coverage.merge(chunk_coverage)
+    with tempfile.NamedTemporaryFile(prefix = 'i89image') as f:
+        write_image(suite, f)
+        if jobs <= 1:
+            worker_init(f.name, suite, cycles)
+            collect(map(_run_chunk, chunks))
+        else:
+            with multiprocessing.Pool(jobs, initializer = worker_init,
+                                      initargs = (f.name, suite, cycles)) as pool:
+                collect(pool.imap_unordered(_run_chunk, chunks))
+    return results, coverage
+
+
+if __name__ == '__main__':
+    import sys
+    results, coverage = run_suite(Suite.read(sys.argv[1]))
+    for result in results:
+        print(result.name, 'pass' if result.passed else 'FAIL', result.instructions, result.cycles,
+              '; '.join(result.failures))
@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+# Snapshot and restore of simulator state
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# A Snapshot saves the state of a Channel or IOP, of the memories of
+# its address spaces, and of the devices attached to them, so that runs
+# can be repeatedly started from the same state, e.g. after
+# initialization:
+#
+#     snapshot = Snapshot(iop)
+#     for command in commands:
+#         ... run the command ...
+#         snapshot.restore()
+#
+# The contents and valid map of each Memory are copied once, into
+# immutable bytes shared by all later restores.  A write hook marks the
+# pages written after the snapshot, and restore() copies back only those
+# pages, so the cost of a restore is proportional to how far the run
+# diverged, not to the size of memory.  Restored pages are passed to the
+# other write hooks of the Memory, so that the channels discard cached
+# instructions decoded from them.  The contents of writable disk images
+# are saved whole, but restored only if they have been written.
+
+from devices import DeviceMemory
+
+
+class MemorySnapshot:
+
+    page_shift = 8  # 256 byte pages
+
+    def __init__(self, memory):
+        self.memory = memory
+        self.size = memory.size
+        self.data = bytes(memory.data)
+        self.valid = bytes(memory.valid)
+        self.dirty = bytearray(((self.size - 1) >> MemorySnapshot.page_shift) + 1)
+        memory.add_write_hook(self.write_hook)
+
+    def write_hook(self, start, stop):
+        first = start >> MemorySnapshot.page_shift
+        last = (stop - 1) >> MemorySnapshot.page_shift
+        if first == last:
+            self.dirty[first] = 1
+        else:
+            self.dirty[first:last+1] = b'\x01' * (last + 1 - first)
+
+    # number of pages written since the snapshot or last restore
+    def dirty_pages(self):
+        return self.dirty.count(1)
+
+    def restore(self):
+        memory = self.memory
+        dirty = self.dirty
+        data = memoryview(self.data)
+        valid = memoryview(self.valid)
+        shift = MemorySnapshot.page_shift
+        ranges = [ ]
+        page = dirty.find(1)
+        while page >= 0:
+            end = dirty.find(0, page)
+            if end < 0:
+                end = len(dirty)
+            dirty[page:end] = bytes(end - page)
+            start = page << shift
+            stop = min(end << shift, self.size)
+            memory.data[start:stop] = data[start:stop]
+            memory.valid[start:stop] = valid[start:stop]
+            ranges.append((start, stop))
+            page = dirty.find(1, end)
+        hooks = [fn for fn in memory.write_hooks if fn != self.write_hook]
+        for start, stop in ranges:
+            for fn in hooks:
+                fn(start, stop)
+
+    def release(self):
+        self.memory.remove_write_hook(self.write_hook)
+
+
+class Snapshot:
+
+    # sim is a Channel or IOP; memories defaults to its address spaces
+    def __init__(self, sim, memories = None):
+        if memories is None:
+            memories = sim.space
+        self.sim = sim
+        self.memory_snapshots = [ ]
+        self.devices = [ ]
+        for memory in memories:
+            if not any(ms.memory is memory for ms in self.memory_snapshots):
+                self.memory_snapshots.append(MemorySnapshot(memory))
+            if isinstance(memory, DeviceMemory):
+                for device, base in memory.devices:
+                    if not any(d is device for d in self.devices):
+                        self.devices.append(device)
+        self.state = sim.get_state()
+        self.device_states = [device.get_state() for device in self.devices]
+
+    def dirty_pages(self):
+        return sum(ms.dirty_pages() for ms in self.memory_snapshots)
+
+    def restore(self):
+        for ms in self.memory_snapshots:
+            ms.restore()
+        for device, state in zip(self.devices, self.device_states):
+            device.set_state(state)
+        self.sim.set_state(self.state)
+
+    # stops tracking writes, for a Snapshot that is no longer needed
+    def release(self):
+        for ms in self.memory_snapshots:
+            ms.release()
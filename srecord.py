@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+# Motorola S-record file writer
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Writes S-records with 16-bit addresses: an S0 header record, S1 data
+# records, an S5 record count, and an S9 termination record.
+
+class SRecord:
+
+    def __write_record(self, f, rec_type, addr, data = b''):
+        raw_data = bytes([len(data) + 3, addr >> 8, addr & 0xff]) + data
+        checksum = (sum(raw_data) & 0xff) ^ 0xff
+        f.write('S%d%s%02X\n' % (rec_type, raw_data.hex().upper(), checksum))
+
+    # If start and/or stop are provided, only the valid data in that
+    # range of addresses is written.
+    def write(self, f, memory, data_bytes_per_line = 16, header = b'',
+              start = 0, stop = None):
+        self.__write_record(f, 0, 0x0000, header)
+        count = 0
+        for sl in memory.valid_ranges(start, stop):
+            data = memory.data[sl]
+            for offset in range(0, len(data), data_bytes_per_line):
+                self.__write_record(f, 1, sl.start + offset,
+                                    bytes(data[offset:offset+data_bytes_per_line]))
+                count += 1
+        self.__write_record(f, 5, count & 0xffff)
+        self.__write_record(f, 9, 0x0000)
@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+# Tests of the asi89 assembler
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from toolloader import load_tool, tool_path
+
+
+source = '''
+        org     0
+start:  movi    bc,10h
+loop:   dec     bc
+        jnz     bc,loop
+        lpdi    ga,1234h:5678h
+        hlt
+'''
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.asi89 = load_tool('asi89')
+        self.dir = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.dir.name, 'prog.asm')
+        with open(self.src, 'w') as f:
+            f.write(source)
+        self.hex = os.path.join(self.dir.name, 'prog.hex')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def assemble(self, cachefile):
+        with open(self.src) as f:
+            asm = self.asi89.ASI89(f, None, None, cachefile = cachefile)
+            with contextlib.redirect_stdout(io.StringIO()):
+                asm.assemble()
+        return asm
+
+    # a cache written by the asi89 script is used by the loaded module,
+    # as in i89d and masi89
+    def test_script_cache_loads_in_tool(self):
+        subprocess.run([sys.executable, tool_path('asi89'), '-i', self.src, '-o', self.hex],
+                       check = True, stdout = subprocess.DEVNULL)
+        asm = self.assemble(self.hex + '.cache')
+        self.assertEqual(asm.reused_count, 5)
+
+    # the object code of macro expansions is reused like that of
+    # source lines
+    def test_macro_reused(self):
+        with open(self.src, 'w') as f:
+            f.write('''
+        org     0
+count   macro   reg,n
+        movi    reg,n
+l??:    dec     reg
+        jnz     reg,l??
+        endm
+        count   bc,10h
+        count   ix,20h
+        hlt
+''')
+        cachefile = self.hex + '.cache'
+        self.assertEqual(self.assemble(cachefile).reused_count, 0)
+        self.assertEqual(self.assemble(cachefile).reused_count, 7)
+
+    def test_other_version_discarded(self):
+        cachefile = self.hex + '.cache'
+        self.assemble(cachefile)
+        with open(cachefile, 'rb') as f:
+            version = pickle.load(f)
+            entries = pickle.load(f)
+        self.assertEqual(version, self.asi89.ASI89.cache_version())
+        with open(cachefile, 'wb') as f:
+            pickle.dump('other', f)
+            pickle.dump(entries, f)
+        self.assertEqual(self.assemble(cachefile).reused_count, 0)
+
+    def test_corrupt_cache_discarded(self):
+        cachefile = self.hex + '.cache'
+        with open(cachefile, 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertEqual(self.assemble(cachefile).reused_count, 0)
+
+
+class OptionTest(unittest.TestCase):
+
+    def test_fill_range(self):
+        asi89 = load_tool('asi89')
+        err = io.StringIO()
+        with self.assertRaises(SystemExit) as cm, contextlib.redirect_stderr(err):
+            asi89.main(['--fill', '300', 'prog.asm'])
+        self.assertEqual(cm.exception.code, 2)
+        self.assertIn('not a byte value', err.getvalue())
+
+
+class InstanceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.asi89 = load_tool('asi89')
+
+    def test_defaults_not_shared(self):
+        a = self.asi89.ASI89(io.StringIO(''), None, None)
+        b = self.asi89.ASI89(io.StringIO(''), None, None)
+        a.include_dirs.append('x')
+        a.split_files.append(io.StringIO())
+        self.assertEqual(b.include_dirs, [ ])
+        self.assertEqual(b.split_files, [ ])
+
+    def test_include_cache_bounded(self):
+        ASI89 = self.asi89.ASI89
+        with tempfile.TemporaryDirectory() as d:
+            lines = ['\torg\t0\n']
+            for i in range(6):
+                with open(os.path.join(d, 'inc%d.asm' % i), 'w') as f:
+                    f.write('\tdb\t%d\n' % i)
+                lines.append('\tinclude\tinc%d.asm\n' % i)
+            src = os.path.join(d, 'prog.asm')
+            with open(src, 'w') as f:
+                f.writelines(lines)
+            save_cache, save_max = ASI89.include_cache, ASI89.max_include_cache
+            ASI89.include_cache, ASI89.max_include_cache = { }, 4
+            try:
+                with open(src) as f, contextlib.redirect_stdout(io.StringIO()):
+                    asm = ASI89(f, None, None)
+                    asm.assemble()
+                cached = sorted(os.path.basename(path) for path in ASI89.include_cache)
+            finally:
+                ASI89.include_cache, ASI89.max_include_cache = save_cache, save_max
+        self.assertEqual(bytes(asm.memory.data[:6]), bytes(range(6)))
+        self.assertEqual(cached, ['inc2.asm', 'inc3.asm', 'inc4.asm', 'inc5.asm'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+# Tests of the benchmark script
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from toolloader import load_tool
+
+
+class MeasureTest(unittest.TestCase):
+
+    # a fast benchmark is repeated until a run is long enough to time
+    def test_autorange(self):
+        benchi89 = load_tool('benchi89')
+        def fn():
+            return 3
+        ops, seconds = benchi89.measure(fn, 2, min_time = 0.01)
+        self.assertGreaterEqual(seconds, 0.01)
+        self.assertGreater(ops, 3)
+        self.assertEqual(ops % 3, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
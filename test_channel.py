@@ -0,0 +1,306 @@
+#!/usr/bin/python3
+# Tests of the channel simulator and translator
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import unittest
+
+from channel import Channel
+from i89 import I89
+from memory import Memory
+from toolloader import load_tool
+from translate import TranslatingChannel
+
+
+i89 = I89()
+asi89 = load_tool('asi89')
+
+channel_classes = (Channel, TranslatingChannel)
+
+
+# Returns the assembler after assembling source at address zero.
+def assemble(source):
+    asm = asi89.ASI89(io.StringIO('\torg\t0\n' + source), None, None, i89 = i89)
+    with contextlib.redirect_stdout(io.StringIO()):
+        asm.assemble()
+    return asm
+
+# Returns a system space Memory holding the assembled program; the
+# other locations are zero, or uninitialized if fill is False.
+def system_memory(asm, fill = True):
+    if fill:
+        system = Memory(data = bytes(0x100000), write_once = False)
+    else:
+        system = Memory(size = 0x100000, write_once = False)
+    for sl in asm.memory.valid_ranges():
+        system[sl] = asm.memory.data[sl]
+    return system
+
+def start_channel(channel_class, asm, fill = True):
+    channel = channel_class(system_memory(asm, fill), i89 = i89)
+    channel.start(0)
+    return channel
+
+
+programs = [
+    ('register loop', '''
+        movi    bc,20
+loop:   addi    gc,3
+        inc     ix
+        addbi   mc,-1
+        dec     bc
+        jnz     bc,loop
+        hlt
+'''),
+    ('memory copy', '''
+        lpdi    ga,1000h
+        lpdi    gb,2000h
+        movi    ix,0
+        movi    bc,10h
+copy:   movb    [gb+ix],[ga+ix]
+        inc     ix
+        dec     bc
+        jnz     bc,copy
+        hlt
+        org     1000h
+        db      1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16
+'''),
+    ('subroutine', '''
+        lpdi    gc,800h
+        movi    bc,5
+again:  call    [gc],sub
+        dec     bc
+        jnz     bc,again
+        hlt
+sub:    addi    ix,7
+        setb    [gc].2,1
+        jbt     [gc].2,1,done
+        movi    ix,0
+done:   movp    tp,[gc]
+'''),
+    ('bit test', '''
+        lpdi    ga,1000h
+        movi    bc,0
+test:   inc     bc
+        incb    [ga]
+        jnbt    [ga],3,test
+        clr     [ga],3
+        jmce    [ga],ok
+        hlt
+ok:     movi    ix,1
+        hlt
+        org     1000h
+        db      0
+'''),
+    ('self-modifying', '''
+        lpdi    ga,0
+        movi    cc,3
+loop:
+imm:    movbi   bc,1
+        incb    [ga].imm+2
+        dec     cc
+        jnz     cc,loop
+        hlt
+'''),
+    ('dma', '''
+        lpdi    ga,1000h
+        lpdi    gb,3000h
+        movi    bc,10
+        movi    cc,0c010h
+        wid     8,16
+        xfer
+        nop
+        hlt
+        nop
+        lpdi    ga,1000h
+        lpdi    gb,4000h
+        movi    mc,0ff05h
+        movi    bc,100
+        movi    cc,0c00ah
+        wid     8,8
+        xfer
+        nop
+        movi    ix,1
+        hlt
+        org     1000h
+        db      1,2,3,4,5,6,7,8,9,10
+'''),
+]
+
+
+class TranslationTest(unittest.TestCase):
+
+    # Returns (instructions, registers, system memory) after running
+    # the program with the given step budgets in turn.
+    def run_program(self, channel_class, asm, budgets):
+        channel = start_channel(channel_class, asm)
+        count = 0
+        for budget in budgets:
+            count += channel.run(budget)
+        return count, channel.register_dump(), bytes(channel.space[Channel.SYSTEM].data)
+
+    def test_same_results(self):
+        for name, source in programs:
+            asm = assemble(source)
+            results = [self.run_program(channel_class, asm, [None])
+                       for channel_class in channel_classes]
+            self.assertEqual(results[0], results[1], name)
+
+    # every step budget stops both at the same instruction
+    def test_step_budgets(self):
+        for name, source in programs:
+            asm = assemble(source)
+            for budget in range(1, 40):
+                results = [self.run_program(channel_class, asm, [budget])
+                           for channel_class in channel_classes]
+                self.assertEqual(results[0], results[1], '%s, %d steps' % (name, budget))
+                self.assertLessEqual(results[1][0], budget)
+
+    def test_split_runs(self):
+        for name, source in programs:
+            asm = assemble(source)
+            whole = self.run_program(TranslatingChannel, asm, [None])
+            for budget in (1, 3, 7):
+                split = self.run_program(TranslatingChannel, asm, [budget] * 200)
+                self.assertEqual(split, whole, '%s, runs of %d steps' % (name, budget))
+
+
+class DMATest(unittest.TestCase):
+
+    template = '''
+        lpdi    ga,1000h
+        lpdi    gb,2000h
+        movi    bc,%d
+        movi    mc,%d
+        movi    cc,%d
+        wid     8,8
+        xfer
+        nop
+after:  hlt
+        org     1000h
+        db      1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16
+'''
+    through_xfer = 8  # instructions up to and including the transfer
+
+    # Runs the transfer, and returns the channel and the TP offset at
+    # which the channel program resumed.
+    def transfer(self, channel_class, bc, mc, cc, external = None):
+        asm = assemble(self.template % (bc, mc, cc))
+        channel = start_channel(channel_class, asm)
+        channel.external_termination = external
+        self.assertEqual(channel.run(self.through_xfer), self.through_xfer)
+        return channel, channel.regs[Channel.TP] - asm.symtab['after']
+
+    def check(self, cc, bc, expected_count, expected_offset, mc = 0, external = None):
+        for channel_class in channel_classes:
+            channel, offset = self.transfer(channel_class, bc, mc, cc, external)
+            self.assertEqual(offset, expected_offset)
+            self.assertEqual(channel.bytes_transferred, expected_count)
+            self.assertEqual(channel.regs[Channel.BC], (bc - expected_count) & 0xffff)
+            self.assertEqual(channel.regs[Channel.GB], 0x2000 + expected_count)
+            system = channel.space[Channel.SYSTEM]
+            self.assertEqual(bytes(system.data[0x2000:0x2000+expected_count+1]),
+                             bytes(range(1, expected_count + 1)) + b'\0')
+
+    def test_byte_count(self):
+        for code, offset in ((1, 0), (2, 4), (3, 8)):
+            self.check(0xc000 | code << 3, 10, 10, offset)
+
+    def test_masked_compare_match(self):
+        self.check(0xc002, 100, 5, 4, mc = 0xff05)
+
+    def test_masked_compare_mismatch(self):
+        self.check(0xc007, 100, 2, 8, mc = 0xff01)
+
+    def test_masked_compare_mask(self):
+        # only bit 3 is compared, so 8 is the first match
+        self.check(0xc001, 100, 8, 0, mc = 0x0808)
+
+    def test_byte_count_before_match(self):
+        self.check(0xc00a, 3, 3, 0, mc = 0xff05)
+
+    def test_match_before_byte_count(self):
+        self.check(0xc00b, 10, 5, 8, mc = 0xff05)
+
+    def test_single(self):
+        self.check(0xc080, 10, 1, 0)
+
+    def test_external(self):
+        self.check(0xc040, 100, 6, 4, external = lambda channel: channel.bytes_transferred >= 6)
+
+    def test_no_termination(self):
+        for channel_class in channel_classes:
+            with self.assertRaises(Channel.DMAError):
+                self.transfer(channel_class, 10, 0, 0xc000)
+
+    def test_external_not_connected(self):
+        for channel_class in channel_classes:
+            with self.assertRaises(Channel.DMAError):
+                self.transfer(channel_class, 10, 0, 0xc040)
+
+
+class FaultTest(unittest.TestCase):
+
+    # Runs the program with each channel class, and checks that it
+    # raises exception after the same instructions in both.
+    def check_fault(self, source, exception, fill = True):
+        asm = assemble(source)
+        states = [ ]
+        for channel_class in channel_classes:
+            channel = start_channel(channel_class, asm, fill)
+            with self.assertRaises(exception) as cm:
+                channel.run()
+            states.append((str(cm.exception), channel.instruction_count))
+        self.assertEqual(states[0], states[1])
+        return asm, states[0]
+
+    def test_bad_instruction(self):
+        asm, (message, count) = self.check_fault('''
+        movi    bc,3
+loop:   dec     bc
+        jnz     bc,loop
+bad:    db      0,1
+''', Channel.BadInstruction)
+        self.assertEqual(count, 7)
+        self.assertIn('%05x' % asm.symtab['bad'], message)
+
+    def test_uninitialized_operand(self):
+        asm, (message, count) = self.check_fault('''
+        lpdi    ga,8000h
+        movi    bc,2
+fault:  movb    ix,[ga]
+        hlt
+''', Channel.MemoryFault, fill = False)
+        self.assertEqual(count, 2)
+        self.assertIn('%05x' % asm.symtab['fault'], message)
+
+    def test_run_off_end(self):
+        asm, (message, count) = self.check_fault('''
+        movi    bc,1
+        inc     bc
+''', Channel.MemoryFault, fill = False)
+        self.assertEqual(count, 2)
+
+    def test_halted(self):
+        for channel_class in channel_classes:
+            channel = start_channel(channel_class, assemble('\thlt\n'))
+            self.assertEqual(channel.run(), 1)
+            with self.assertRaises(Channel.Halted):
+                channel.step()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+# Tests of code coverage
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from channel import Channel
+from covmap import CoverageMap, CoveringChannel
+from intelhex import IntelHex
+from test_channel import assemble, channel_classes, i89, system_memory
+from toolloader import load_tool
+
+
+straight = '''
+        movi    bc,1
+        movi    ix,2
+        movi    cc,3
+        movi    mc,4
+        movi    gc,5
+        hlt
+'''
+
+loop = '''
+        movi    bc,3
+loop:   inc     ix
+        dec     bc
+        jnz     bc,loop
+        jmp     done
+skip:   movi    ix,0
+done:   hlt
+'''
+
+
+class CoverageTest(unittest.TestCase):
+
+    def covering(self, channel_class, asm, fill = True):
+        cls = type('C', (CoveringChannel, channel_class), { })
+        channel = cls(system_memory(asm, fill), i89 = i89)
+        channel.start(0)
+        return channel
+
+    def test_budget(self):
+        asm = assemble(straight)
+        for channel_class in channel_classes:
+            channel = self.covering(channel_class, asm)
+            self.assertEqual(channel.run(3), 3)
+            self.assertEqual(channel.coverage.addresses(Channel.SYSTEM), { 0, 4, 8 })
+            channel.run()
+            self.assertEqual(channel.coverage.count(Channel.SYSTEM), 6)
+
+    def test_fault(self):
+        asm = assemble('''
+        movi    bc,1
+        lpdi    ga,8000h
+        movb    ix,[ga]
+        hlt
+''')
+        for channel_class in channel_classes:
+            channel = self.covering(channel_class, asm, fill = False)
+            with self.assertRaises(Channel.MemoryFault):
+                channel.run()
+            self.assertEqual(channel.coverage.addresses(Channel.SYSTEM), { 0, 4 })
+
+    def test_loop(self):
+        asm = assemble(loop)
+        results = [ ]
+        for channel_class in channel_classes:
+            channel = self.covering(channel_class, asm)
+            channel.run()
+            results.append(channel.coverage.addresses(Channel.SYSTEM))
+        self.assertEqual(results[0], results[1])
+        self.assertNotIn(asm.symtab['skip'], results[0])
+        self.assertEqual(len(results[0]), 6)
+
+    # the listing includes the last instruction of each range, here a
+    # two byte hlt
+    def test_listing(self):
+        asm = assemble(loop)
+        channel = self.covering(Channel, asm)
+        channel.run()
+        with tempfile.TemporaryDirectory() as d:
+            cov = os.path.join(d, 'loop.cov')
+            hexfile = os.path.join(d, 'loop.hex')
+            with open(cov, 'wb') as f:
+                channel.coverage.write(f)
+            with open(hexfile, 'w') as f:
+                IntelHex().write(f, asm.memory)
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                load_tool('covi89').main([cov, '-i', hexfile, '-l'], i89 = i89)
+        listing = out.getvalue().splitlines()
+        self.assertTrue(listing[-1].startswith('+ '))
+        self.assertIn('hlt', listing[-1])
+        self.assertTrue(listing[-2].startswith('- '))
+        self.assertIn('movi    ix,0', listing[-2])
+
+
+if __name__ == '__main__':
+    unittest.main()
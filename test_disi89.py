@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+# Tests of the disi89 disassembler
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import struct
+import tempfile
+import unittest
+
+from omf86 import OMF86
+from test_channel import assemble, i89
+from toolloader import load_tool
+
+
+# Returns an OMF-86 record, with a checksum byte of zero.
+def record(rec_type, body):
+    return struct.pack('<BH', rec_type, len(body) + 1) + body + b'\0'
+
+# Returns an absolute data record loading data at addr.
+def pedata(addr, data):
+    return record(OMF86.PEDATA, struct.pack('<HB', addr >> 4, addr & 0xf) + data)
+
+# Returns a public symbol record for name at an absolute addr.
+def pubdef(name, addr):
+    return record(OMF86.PUBDEF, struct.pack('<BBH', 0, 0, addr >> 4) +
+                  bytes([len(name)]) + name.encode('ascii') + struct.pack('<HB', addr & 0xf, 0))
+
+
+class OMFTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def disassemble(self, records, argv = [ ]):
+        path = os.path.join(self.dir.name, 'prog.obj')
+        with open(path, 'wb') as f:
+            f.write(record(OMF86.THEADR, b'\x04PROG') + b''.join(records) +
+                    record(OMF86.MODEND, b'\0'))
+        out = os.path.join(self.dir.name, 'prog.lst')
+        load_tool('disi89').main(['--omf', path, '-o', out] + argv, i89 = i89)
+        with open(out) as f:
+            return f.read()
+
+    # data records with a gap between them are both disassembled, and
+    # the later one with its public symbols
+    def test_gap(self):
+        code = assemble('\tmovi\tbc,1234h\n\thlt\n').memory
+        code = bytes(code.data[code.valid_bounds()])
+        records = [pedata(0x100, code), pedata(0x200, code), pubdef('second', 0x200)]
+        text = self.disassemble(records)
+        self.assertEqual(text.count('hlt'), 2)
+        self.assertIn('org     00200h', text)
+        self.assertIn('second:', text)
+        self.assertEqual(self.disassemble(records, ['-l', '-c']).count('hlt'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+# Tests of the host processor model
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from host import Command, Host
+from iop import IOP
+from test_channel import assemble, i89, system_memory
+
+
+# counts each command at 1000h; the idle version raises SINTR and
+# then waits for the next command rather than halting
+programs = { 'halt': '''
+        org     100h
+        lpdi    ga,1000h
+        incb    [ga]
+        sintr
+        hlt
+''',
+             'idle': '''
+        org     100h
+        lpdi    ga,1000h
+        incb    [ga]
+        sintr
+idle:   jmp     idle
+''' }
+
+
+class HostTest(unittest.TestCase):
+
+    def start(self, name, interrupt):
+        system = system_memory(assemble(programs[name]))
+        host = Host(IOP(system, i89 = i89), interrupt = interrupt)
+        host.initialize()
+        return host, system
+
+    def check_batch(self, name, interrupt):
+        host, system = self.start(name, interrupt)
+        results = host.run_batch([Command(0x100)] * 3, max_steps = 100000)
+        self.assertEqual(system[0x1000], 3)
+        for result in results:
+            self.assertIsNotNone(result.completed)
+
+    def test_polled(self):
+        self.check_batch('halt', False)
+
+    def test_interrupt(self):
+        self.check_batch('halt', True)
+
+    # the channel stays busy, so only the interrupt completes a command,
+    # and the next command restarts the channel
+    def test_interrupt_idle(self):
+        self.check_batch('idle', True)
+
+    def test_interrupt_idle_wait(self):
+        host, system = self.start('idle', True)
+        host.submit(Command(0x100))
+        host.wait(max_steps = 100000)
+        self.assertTrue(host.busy(0))
+        host.submit(Command(0x100))
+        host.wait(max_steps = 100000)
+        self.assertEqual(system[0x1000], 2)
+
+    def test_polled_busy(self):
+        host, system = self.start('idle', False)
+        host.submit(Command(0x100))
+        with self.assertRaises(Host.Timeout):
+            host.wait(max_steps = 1000)
+        with self.assertRaises(Host.Busy):
+            host.submit(Command(0x100))
+
+
+if __name__ == '__main__':
+    unittest.main()
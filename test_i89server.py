@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+# Tests of the assembler/disassembler server and client
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from i89server import I89Server, forward
+from toolloader import tool_path
+
+
+class ServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'i89.sock')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    # The server runs in its own process, as i89d does, since it
+    # redirects sys.stdout and sys.stderr while it runs a tool.
+    def start_server(self):
+        server = subprocess.Popen([sys.executable, tool_path('i89d'), '-s', self.path])
+        def stop():
+            server.terminate()
+            server.wait()
+        self.addCleanup(stop)
+        deadline = time.monotonic() + 60
+        while not I89Server.listening(self.path):
+            if server.poll() is not None or time.monotonic() > deadline:
+                self.fail('i89d did not start')
+            time.sleep(0.05)
+        return server
+
+    # a server that reads the request, sends some output, and closes
+    # the connection without an exit status
+    def start_failing_server(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        sock.listen(1)
+        def serve():
+            conn, addr = sock.accept()
+            with conn, conn.makefile('rwb') as f:
+                f.readline()
+                f.write((json.dumps({ 'stdout': 'partial\n' }) + '\n').encode())
+        thread = threading.Thread(target = serve)
+        thread.start()
+        def stop():
+            thread.join()
+            sock.close()
+        self.addCleanup(stop)
+
+    def test_forward(self):
+        self.start_server()
+        src = os.path.join(self.dir.name, 'prog.asm')
+        with open(src, 'w') as f:
+            f.write('\torg\t0\n\thlt\n')
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = forward('asi89', [src, '-o', os.path.join(self.dir.name, 'prog.hex')], self.path)
+        self.assertEqual(status, 0)
+        self.assertIn('pass 2', out.getvalue())
+
+    # binary output to stdout is passed through unchanged
+    def test_binary_stdout(self):
+        self.start_server()
+        src = os.path.join(self.dir.name, 'prog.asm')
+        with open(src, 'w') as f:
+            f.write('\torg\t0\n\tdb\t0,80h,0ffh,0ah,0dh\n')
+        result = subprocess.run([sys.executable, tool_path('i89c'), '-s', self.path,
+                                 'asi89', src, '-f', 'binary', '-o', '-'],
+                                stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertTrue(result.stdout.endswith(b'\x00\x80\xff\x0a\x0d'))
+
+    def test_no_server(self):
+        with self.assertRaises(I89Server.NoServer):
+            forward('asi89', [ ], self.path)
+
+    def test_second_server_refused(self):
+        self.start_server()
+        with self.assertRaises(I89Server.AlreadyRunning):
+            I89Server(self.path)
+        self.assertTrue(I89Server.listening(self.path))
+
+    def test_stale_socket_replaced(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        sock.close()
+        self.start_server()
+        self.assertTrue(I89Server.listening(self.path))
+
+    def test_disconnect_not_retried(self):
+        self.start_failing_server()
+        with self.assertRaises(I89Server.Disconnected):
+            with contextlib.redirect_stdout(io.StringIO()):
+                forward('asi89', [ ], self.path)
+
+    # i89c must not run the tool again once the server has started it
+    def test_client_disconnect(self):
+        self.start_failing_server()
+        result = subprocess.run([sys.executable, tool_path('i89c'), '-s', self.path, 'asi89', 'missing.asm'],
+                                stdout = subprocess.PIPE, stderr = subprocess.PIPE,
+                                universal_newlines = True)
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.stdout, 'partial\n')
+        self.assertIn('server closed connection', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
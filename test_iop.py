@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+# Tests of the two-channel IOP
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from channel import Channel
+from covmap import CoverageMap, CoveringChannel
+from execprofile import ExecutionProfile, ProfilingChannel
+from host import Host
+from iop import IOP
+from test_channel import assemble, i89, system_memory
+from tracebuf import TraceBuffer, TracingChannel
+
+
+class ChannelArgsTest(unittest.TestCase):
+
+    # the channels share the objects passed in, rather than allocating
+    # their own
+    def test_shared(self):
+        class SimChannel(TracingChannel, ProfilingChannel, CoveringChannel, Channel):
+            pass
+        trace_buffer = TraceBuffer(16)
+        profile = ExecutionProfile()
+        coverage = CoverageMap()
+        system = system_memory(assemble('\tmovi\tbc,1\n\thlt\n'))
+        iop = IOP(system, i89 = i89, channel_class = SimChannel,
+                  channel_args = { 'trace_buffer': trace_buffer,
+                                   'profile': profile,
+                                   'coverage': coverage })
+        for channel in iop.channels:
+            self.assertIs(channel.trace_buffer, trace_buffer)
+            self.assertIs(channel.profile, profile)
+            self.assertIs(channel.coverage, coverage)
+        iop.start(0, 0)
+        iop.start(1, 0)
+        iop.run()
+        self.assertEqual(profile.counts[Channel.SYSTEM][0], 2)
+        self.assertEqual(len(trace_buffer), 4)
+
+
+class StateTest(unittest.TestCase):
+
+    # the SYSBUS and SOC bytes read by initialization are saved and
+    # restored, and cleared by reset
+    def test_sysbus_soc(self):
+        iop = IOP(system_memory(assemble('\thlt\n')), i89 = i89)
+        self.assertIsNone(iop.sysbus)
+        self.assertIsNone(iop.soc)
+        Host(iop, sysbus = 1, soc = 2).initialize()
+        state = iop.get_state()
+        iop.reset()
+        self.assertIsNone(iop.sysbus)
+        self.assertIsNone(iop.soc)
+        iop.set_state(state)
+        self.assertEqual((iop.sysbus, iop.soc), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
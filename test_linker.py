@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+# Tests of the linker and locator
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from linker import Linker
+from memory import Memory
+from objectmodule import ObjectModule
+
+
+def module(name, data):
+    m = ObjectModule(name)
+    m.memory[0:len(data)] = data
+    return m
+
+
+class LocateTest(unittest.TestCase):
+
+    def test_same_name(self):
+        linker = Linker()
+        linker.add_module(module('m', b'\x11\x22'))
+        linker.add_module(module('m', b'\x33\x44'))
+        linker.locate()
+        memory = linker.link()
+        self.assertEqual(bytes(memory.data[0:4]), b'\x11\x22\x33\x44')
+
+    # modules located automatically go around the fixed ones
+    def test_fixed_region_skipped(self):
+        linker = Linker()
+        linker.add_module(module('a', b'\x01' * 4))
+        linker.add_module(module('b', b'\x02' * 4))
+        linker.add_module(module('fixed', b'\x03' * 4))
+        linker.locate(addresses = { 'fixed': 4 })
+        self.assertEqual(linker.base, { 0: 0, 1: 8, 2: 4 })
+        memory = linker.link()
+        self.assertEqual(bytes(memory.data[0:12]), b'\x01' * 4 + b'\x03' * 4 + b'\x02' * 4)
+
+    def test_fixed_overlap(self):
+        linker = Linker()
+        linker.add_module(module('a', b'\x01' * 4))
+        linker.add_module(module('b', b'\x02' * 4))
+        linker.locate(addresses = { 'a': 0, 'b': 2 })
+        with self.assertRaises(Linker.Overlap):
+            linker.link()
+
+
+if __name__ == '__main__':
+    unittest.main()
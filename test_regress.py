@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+# Tests of the regression test runner
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import tempfile
+import unittest
+
+from intelhex import IntelHex
+import regress
+from regress import Simulation, Suite, run_suite
+from test_channel import assemble
+from test_snapshot import write_sector
+
+
+class DiskTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        with open(self.path('fw.hex'), 'w') as f:
+            IntelHex().write(f, assemble(write_sector).memory)
+        for name, fill in (('blank.img', 0), ('full.img', 0xe5)):
+            with open(self.path(name), 'wb') as f:
+                f.write(bytes([fill]) * (2 * 4 * 512))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def write_image(self, suite):
+        with open(self.path('image'), 'wb') as f:
+            regress.write_image(suite, f)
+
+    def suite(self, cases, **kwargs):
+        obj = { 'image': [ 'fw.hex' ],
+                'isbc215': '0x80',
+                'disks': [ { 'file': 'blank.img', 'geometry': [ 2, 1, 4 ] } ],
+                'cases': cases }
+        obj.update(kwargs)
+        obj = { key: value for key, value in obj.items() if value is not None }
+        with open(self.path('suite.json'), 'w') as f:
+            json.dump(obj, f)
+        return Suite.read(self.path('suite.json'))
+
+    def test_disks(self):
+        suite = self.suite([
+            { 'name': 'write', 'tp': 0, 'memory': { '0x1000': '55 aa' },
+              'expect': { 'disks': { '0': { '0': '55 aa 00' } } } },
+            # the suite's disk is restored after each case
+            { 'name': 'restored', 'tp': 0,
+              'expect': { 'disks': { '0': { '0': '00 00' } } } },
+            { 'name': 'own disk', 'tp': 0,
+              'disks': [ { 'file': 'full.img', 'geometry': [ 2, 1, 4 ] } ],
+              'expect': { 'disks': { '0': { '0': '00 00', '0x200': 'e5 e5' } } } },
+            { 'name': 'differs', 'tp': 0, 'memory': { '0x1001': '01' },
+              'expect': { 'disks': { '0': { '0': '00 00' } } } },
+            { 'name': 'no disk', 'tp': 0,
+              'expect': { 'disks': { '1': { '0': '00' } } } } ])
+        results, coverage = run_suite(suite, jobs = 1)
+        self.assertEqual([result.failures for result in results],
+                         [[ ], [ ], [ ], ['disk 0 at offset 1 differs'], ['no disk in unit 1']])
+        for name, fill in (('blank.img', 0), ('full.img', 0xe5)):
+            with open(self.path(name), 'rb') as f:
+                self.assertEqual(f.read(), bytes([fill]) * (2 * 4 * 512))
+
+    def test_disks_need_controller(self):
+        with self.assertRaises(Suite.BadFormat):
+            self.suite([ ], isbc215 = None)
+
+    # a failed initialization doesn't affect a later one in the same
+    # worker process
+    def test_worker_init(self):
+        bad = self.suite([ ], init = { 'tp': 0, 'max_steps': 1 })
+        good = self.suite([ { 'tp': 0 } ])
+        self.write_image(bad)
+        regress.worker_init(self.path('image'), bad, True)
+        self.assertIsNotNone(regress._init_error)
+        with self.assertRaises(Simulation.InitFailed):
+            regress._run_chunk((0, 0))
+        self.write_image(good)
+        regress.worker_init(self.path('image'), good, True)
+        self.assertIsNone(regress._init_error)
+        first, results, coverage = regress._run_chunk((0, 1))
+        self.assertTrue(results[0].passed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+# Tests of the simi89 command line
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import os
+import unittest
+
+from toolloader import load_tool
+
+
+class OptionTest(unittest.TestCase):
+
+    def usage_error(self, argv):
+        err = io.StringIO()
+        with self.assertRaises(SystemExit) as cm, contextlib.redirect_stderr(err):
+            load_tool('simi89').main([os.devnull] + argv)
+        self.assertEqual(cm.exception.code, 2)
+        return err.getvalue()
+
+    def test_disk_without_controller(self):
+        self.assertIn('--isbc215', self.usage_error(['-d', 'disk.img,200,2,8']))
+        self.assertIn('--isbc215', self.usage_error(['--write-disks']))
+
+    def test_too_many_disks(self):
+        self.assertIn('four units', self.usage_error(['--isbc215', '0x80'] + ['-d', 'disk.img,200,2,8'] * 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+# Tests of simulator snapshots
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import unittest
+
+from channel import Channel
+from devices import DeviceMemory
+from isbc215 import DiskImage, ISBC215
+from snapshot import Snapshot
+from test_channel import assemble, i89, system_memory
+
+
+# writes sector 0 from the buffer at 1000h
+write_sector = '''
+        movi    ga,80h
+        movbi   [ga].5,0
+        movbi   [ga].6,1
+        movbi   [ga].0,3
+        movi    ga,88h
+        lpdi    gb,1000h
+        movi    bc,512
+        movi    cc,4408h
+        wid     8,8
+        xfer
+        nop
+        hlt
+'''
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        fn = os.path.join(self.dir.name, 'disk.img')
+        with open(fn, 'wb') as f:
+            f.write(bytes(2 * 4 * 512))
+        self.disk = DiskImage(fn, 2, 1, 4)
+        self.controller = ISBC215([self.disk])
+        io = DeviceMemory(data = bytes(0x10000))
+        io.attach(self.controller, 0x80)
+        system = system_memory(assemble(write_sector))
+        system[0x1000:0x1200] = bytes(range(256)) * 2
+        self.channel = Channel(system, io, i89 = i89)
+        self.channel.start(0)
+
+    def tearDown(self):
+        self.disk.close()
+        self.dir.cleanup()
+
+    def test_memory_and_registers(self):
+        snapshot = Snapshot(self.channel)
+        system = self.channel.space[Channel.SYSTEM]
+        system[0x1000] = 0x55
+        self.channel.run()
+        self.assertTrue(self.channel.halted)
+        snapshot.restore()
+        self.assertEqual(system[0x1000], 0)
+        self.assertFalse(self.channel.halted)
+        self.assertEqual(self.channel.instruction_count, 0)
+
+    def test_device_state(self):
+        snapshot = Snapshot(self.channel)
+        before = self.controller.get_state()
+        self.channel.run()
+        self.assertEqual(bytes(self.disk.map[0:512]), bytes(range(256)) * 2)
+        self.assertEqual(self.controller.commands, 1)
+        for i in range(2):
+            snapshot.restore()
+            self.assertEqual(bytes(self.disk.map[0:512]), bytes(512))
+            self.assertEqual(self.controller.get_state(), before)
+            self.assertIsNone(self.controller.window)
+            self.assertEqual(self.controller.regs[ISBC215.SECTOR + 1], 0)
+            self.channel.run()
+        self.assertEqual(self.controller.bytes_written, 512)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+# Tests of the execution trace buffer
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import os
+import unittest
+
+from channel import Channel
+from test_channel import assemble, i89, start_channel
+from toolloader import load_tool
+from tracebuf import TraceBuffer, TracingChannel
+
+
+class TraceTest(unittest.TestCase):
+
+    def trace(self, source, fill = True):
+        channel = start_channel(TracingChannel, assemble(source), fill)
+        with self.assertRaises(Channel.SimulatorError):
+            channel.run()
+        f = io.BytesIO()
+        channel.trace_buffer.write(f)
+        f.seek(0)
+        return list(TraceBuffer.read(f).disassemble(i89))
+
+    def test_bad_instruction_recorded(self):
+        lines = self.trace('\tmovi\tbc,1\n\tdb\t0,1\n')
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('0 00004s: db'))
+
+    def test_uninitialized_fetch_recorded(self):
+        lines = self.trace('\tmovi\tbc,1\n', fill = False)
+        self.assertEqual(lines[1], '0 00004s: (uninitialized or nonexistent memory)')
+
+    def test_ring(self):
+        tb = TraceBuffer(3)
+        for addr in range(5):
+            tb.add(addr, 0, b'\0')
+        self.assertEqual([r[0] for r in tb.records()], [2, 3, 4])
+
+    def test_record_size_checked(self):
+        simi89 = load_tool('simi89')
+        err = io.StringIO()
+        with self.assertRaises(SystemExit) as cm, contextlib.redirect_stderr(err):
+            simi89.main([os.devnull, '--record-size', '0'])
+        self.assertEqual(cm.exception.code, 2)
+        self.assertIn('not a positive count', err.getvalue())
+
+    # the README gives "tracebuf.py file" to disassemble a trace
+    def test_executable(self):
+        self.assertTrue(os.access(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tracebuf.py'), os.X_OK))
+
+
+if __name__ == '__main__':
+    unittest.main()
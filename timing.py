@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+# Instruction timing model for the Intel 8089
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The time taken by an instruction, in clocks, is the sum of:
+#   the execution time of its form, from the I89 instruction table
+#   a penalty for each memory operand using offset, indexed, or
+#     auto-increment addressing
+#   four clocks for each bus cycle to fetch the instruction and to read
+#     and write its memory operands
+#   a penalty if a branch is taken, to refill the instruction queue
+# A bus cycle transfers a byte, or an even-addressed word on a 16-bit
+# bus; other word transfers take two bus cycles.  The system and I/O
+# buses may each be 8 or 16 bits wide.
+#
+# A DMA transfer takes the bus cycles of its source and destination
+# accesses, and of a table lookup for each byte translated.
+#
+# Timing.instruction_cycles() gives a static estimate, assuming even
+# operand addresses and branches not taken.  A TimedChannel counts the
+# clocks actually used as it executes, for which only the interpreter
+# is used, not block translation.
+
+from channel import Channel
+from i89 import OT
+
+
+class Timing:
+
+    clocks_per_bus_cycle = 4
+
+    # clocks by addressing mode (the 'a' field) of a memory operand
+    mode_clocks = (0, 1, 2, 3)
+
+    branch_taken_clocks = 2
+
+    memory_operands = (OT.mem, OT.memo, OT.mem2, OT.memo2)
+
+    # bus_width gives the system and I/O bus widths in bits; clock is in
+    # Hz
+    def __init__(self, bus_width = (16, 16), clock = 5000000):
+        self.bus_width = bus_width
+        self.clock = clock
+
+    # bus cycles to transfer count bytes starting at addr, in accesses
+    # of size bytes
+    def bus_cycles(self, space, addr, count, size = 1):
+        if size == 1 or self.bus_width[space] == 8:
+            return count
+        if addr & 1:
+            # every word is odd addressed, so takes two bus cycles
+            return count
+        return (count + 1) // 2
+
+    # bus cycles to fetch an instruction, which on a 16-bit bus is
+    # fetched in words
+    def fetch_cycles(self, space, addr, length):
+        if self.bus_width[space] == 8:
+            return length
+        return (length + (addr & 1) + 1) // 2
+
+    # Returns a list of the sizes, in bytes, of the reads and writes of
+    # memory operands by an instruction.
+    @staticmethod
+    def operand_accesses(mnem, form):
+        count = len([ot for ot in form.operands if ot in Timing.memory_operands])
+        if count == 0:
+            return [ ]
+        if mnem in ('movp', 'call', 'lcall'):
+            return [2, 1]       # a pointer is a word and a byte
+        if mnem == 'lpd':
+            return [2, 2]
+        size = 1 if mnem in Channel.byte_mnemonics else 2
+        if (form.operands[0] in Timing.memory_operands and
+            'j' not in form.fields and
+            mnem not in ('mov', 'movb', 'movi', 'movbi')):
+            return [size, size] # read, modify, and write
+        return [size] * count
+
+    # execution and addressing mode clocks
+    def execution_clocks(self, form, fields):
+        clocks = form.cycles
+        for suffix in ('', '2'):
+            if 'm' + suffix in fields:
+                clocks += Timing.mode_clocks[fields.get('a' + suffix, 1)]
+        return clocks
+
+    # Static estimate of the clocks taken by an instruction at addr in
+    # space, with memory operands in operand_space.
+    def instruction_cycles(self, mnem, form, fields, space, addr, length,
+                           operand_space = Channel.SYSTEM):
+        bus = self.fetch_cycles(space, addr, length)
+        for size in Timing.operand_accesses(mnem, form):
+            bus += self.bus_cycles(operand_space, 0, size, size)
+        return self.execution_clocks(form, fields) + bus * Timing.clocks_per_bus_cycle
+
+    def seconds(self, cycles):
+        return cycles / self.clock
+
+
+# A Channel that counts the clocks used by the instructions and DMA
+# transfers it executes.
+class TimedChannel(Channel):
+
+    state_attributes = Channel.state_attributes + ('cycles',)
+
+    def __init__(self, system, io = None, i89 = None, number = 0, timing = None):
+        if timing is None:
+            timing = Timing()
+        self.timing = timing
+        super().__init__(system, io, i89 = i89, number = number)
+
+    def reset(self):
+        super().reset()
+        self.cycles = 0
+
+    # elapsed time in seconds
+    @property
+    def elapsed(self):
+        return self.timing.seconds(self.cycles)
+
+    # Wraps the handler of each decoded instruction to add its execution
+    # and fetch clocks.  The memory operand clocks are added by load()
+    # and store().
+    def predecode(self, space, tp):
+        d = super().predecode(space, tp)
+        timing = self.timing
+        clocks = (timing.execution_clocks(d.form, d.fields) +
+                  timing.fetch_cycles(space, tp, d.length) * Timing.clocks_per_bus_cycle)
+        handler = d.handler
+        if 'j' in d.fields:
+            fall_through = (tp + d.length) & Channel.address_mask[space]
+            def timed(d):
+                handler(d)
+                self.cycles += clocks
+                if self.regs[Channel.TP] != fall_through:
+                    self.cycles += Timing.branch_taken_clocks
+        else:
+            def timed(d):
+                handler(d)
+                self.cycles += clocks
+        d.handler = timed
+        return d
+
+    def load(self, space, addr, width):
+        self.cycles += self.timing.bus_cycles(space, addr, width // 8, width // 8) * Timing.clocks_per_bus_cycle
+        return super().load(space, addr, width)
+
+    def store(self, space, addr, width, value):
+        self.cycles += self.timing.bus_cycles(space, addr, width // 8, width // 8) * Timing.clocks_per_bus_cycle
+        super().store(space, addr, width, value)
+
+    # the byte holding the upper bits and tag of a pointer
+    def load_pointer(self, space, addr):
+        self.cycles += Timing.clocks_per_bus_cycle
+        return super().load_pointer(space, addr)
+
+    def store_pointer(self, space, addr, value, tag):
+        self.cycles += Timing.clocks_per_bus_cycle
+        super().store_pointer(space, addr, value, tag)
+
+    def transfer(self):
+        transferred = self.bytes_transferred
+        super().transfer()
+        if self.regs[Channel.CC] & Channel.CC_TRANSLATE:
+            self.cycles += (self.bytes_transferred - transferred) * Timing.clocks_per_bus_cycle
+
+    # A bulk transfer doesn't use load() and store(), so its bus cycles
+    # are computed from its extent.
+    def bulk_transfer(self, cc, table):
+        src, dst, src_memory, dst_memory = Channel.transfer_pointers(cc)
+        sa = self.regs[src]
+        da = self.regs[dst]
+        transferred = self.bytes_transferred
+        offset = super().bulk_transfer(cc, table)
+        if offset is not None:
+            count = self.bytes_transferred - transferred
+            timing = self.timing
+            bus = (timing.bus_cycles(self.tags[src], sa, count, self.source_width // 8) +
+                   timing.bus_cycles(self.tags[dst], da, count, self.dest_width // 8))
+            self.cycles += bus * Timing.clocks_per_bus_cycle
+        return offset
@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+# Loader for the i89 command line tools as modules
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The command line tools (asi89, disi89) are scripts without a .py
+# suffix, so they can't be imported with an import statement.
+
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+
+tool_dir = os.path.dirname(os.path.abspath(__file__))
+
+_tools = { }
+
+def tool_path(name):
+    return os.path.join(tool_dir, name)
+
+# Returns the named tool as a module, loading it on first use.  The
+# tool's "if __name__ == '__main__'" code is not run.
+def load_tool(name):
+    if name not in _tools:
+        loader = importlib.machinery.SourceFileLoader(name, tool_path(name))
+        spec = importlib.util.spec_from_loader(name, loader)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module  # so that pickle can find its classes
+        loader.exec_module(module)
+        _tools[name] = module
+    return _tools[name]
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:]:
+        print(name, load_tool(name))
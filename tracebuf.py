@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+# Execution trace ring buffer for the Intel 8089 channel simulator
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# A TraceBuffer keeps the most recent records of executed instructions
+# in a fixed size bytearray, so that tracing can be left on for long
+# runs.  Each record is packed as:
+#   uint32   address of the instruction, with the TP tag in bit 20
+#   uint8    channel number
+#   uint8    instruction length
+#   6 bytes  instruction bytes
+#   uint8    number of the register changed by the instruction, other
+#            than TP, or 0xff if none
+#   uint32   new value of that register, with the tag in bit 20 for a
+#            pointer register
+#
+# An instruction that can't be fetched, because it is invalid or in
+# uninitialized memory, is recorded with the bytes that can be read at
+# its address, if any, and no register change.
+#
+# A trace file is a header, giving the record format and count, followed
+# by the records, oldest first.  The records can be disassembled with
+# I89.disassemble_inst without the memory image.
+
+import struct
+
+from channel import Channel
+from i89 import I89
+from memory import Memory
+
+
+class TraceBuffer:
+
+    class BadFormat(Exception):
+        pass
+
+    record = struct.Struct('<IBB6sBI')
+    header = struct.Struct('<4sHHI')
+    magic = b'I89T'
+    version = 1
+
+    NO_REG = 0xff
+
+    def __init__(self, capacity = 65536):
+        self.capacity = capacity
+        self.data = bytearray(capacity * TraceBuffer.record.size)
+        self.count = 0    # records added, including those overwritten
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def add(self, addr, channel, code, reg = NO_REG, value = 0):
+        TraceBuffer.record.pack_into(self.data,
+                                     (self.count % self.capacity) * TraceBuffer.record.size,
+                                     addr, channel, len(code), code, reg, value)
+        self.count += 1
+
+    # generates (address, tag, channel, code, reg, value) tuples, oldest
+    # first; reg is None if no register changed
+    def records(self):
+        size = TraceBuffer.record.size
+        first = self.count - len(self)
+        for i in range(first, self.count):
+            addr, channel, length, code, reg, value = TraceBuffer.record.unpack_from(self.data, (i % self.capacity) * size)
+            if reg == TraceBuffer.NO_REG:
+                reg = None
+            yield addr & 0xfffff, addr >> 20, channel, code[:length], reg, value
+
+    def write(self, f):
+        f.write(TraceBuffer.header.pack(TraceBuffer.magic, TraceBuffer.version,
+                                        TraceBuffer.record.size, len(self)))
+        size = TraceBuffer.record.size
+        start = (self.count % self.capacity) * size
+        if self.count > self.capacity:
+            f.write(self.data[start:])
+        f.write(self.data[:start])
+
+    @staticmethod
+    def read(f):
+        header = f.read(TraceBuffer.header.size)
+        if len(header) != TraceBuffer.header.size:
+            raise TraceBuffer.BadFormat('truncated header')
+        magic, version, size, count = TraceBuffer.header.unpack(header)
+        if magic != TraceBuffer.magic or version != TraceBuffer.version or size != TraceBuffer.record.size:
+            raise TraceBuffer.BadFormat('not a trace file, or unsupported version')
+        tb = TraceBuffer(max(count, 1))
+        data = f.read(count * size)
+        if len(data) != count * size:
+            raise TraceBuffer.BadFormat('truncated trace')
+        tb.data[:len(data)] = data
+        tb.count = count
+        return tb
+
+    # Generates a line of disassembly for each record.
+    def disassemble(self, i89):
+        for addr, tag, channel, code, reg, value in self.records():
+            if not code:
+                yield '%d %05x%s: (uninitialized or nonexistent memory)' % (channel, addr, 'si'[tag])
+                continue
+            length, dis, operands, fields = i89.disassemble_inst(_CodeWindow(addr, code), addr)
+            s = '%d %05x%s: %-8s%s' % (channel, addr, 'si'[tag], dis, operands)
+            if reg is not None:
+                s = '%-44s %s=' % (s, I89.Reg(reg).name)
+                if reg in Channel.pointer_regs:
+                    s += '%05x%s' % (value & 0xfffff, 'si'[value >> 20])
+                else:
+                    s += '%04x' % value
+            yield s
+
+
+# Presents the bytes of an instruction at their address, for
+# I89.disassemble_inst.
+class _CodeWindow:
+    def __init__(self, addr, code):
+        self.addr = addr
+        self.code = code
+
+    def __len__(self):
+        return self.addr + len(self.code)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.code[i.start-self.addr:i.stop-self.addr]
+        return self.code[i - self.addr]
+
+
+# A Channel that records each instruction it executes in a TraceBuffer,
+# which may be shared by several channels.  It can be combined with
+# other Channel subclasses, e.g. class C(TracingChannel, TimedChannel).
+class TracingChannel(Channel):
+
+    def __init__(self, system, io = None, i89 = None, number = 0, trace_buffer = None, **kwargs):
+        if trace_buffer is None:
+            trace_buffer = TraceBuffer()
+        self.trace_buffer = trace_buffer
+        super().__init__(system, io, i89 = i89, number = number, **kwargs)
+
+    # Returns the bytes, up to the length of the longest instruction,
+    # that can be read starting at tp.
+    def readable(self, space, tp):
+        mem = self.space[space]
+        code = bytearray()
+        try:
+            while len(code) < Channel.max_inst_length:
+                code.append(mem[tp + len(code)])
+        except (Memory.Uninitialized, IndexError):
+            pass
+        return bytes(code)
+
+    def step(self):
+        if self.halted:
+            return super().step()
+        regs = self.regs
+        tags = self.tags
+        tp = regs[Channel.TP]
+        space = tags[Channel.TP]
+        d = self.decode_cache[space].get(tp)
+        if d is None:
+            try:
+                d = self.predecode(space, tp)
+            except (Channel.BadInstruction, Memory.Uninitialized, IndexError):
+                # recorded, then step() raises the appropriate exception
+                self.trace_buffer.add(tp | (space << 20), self.number, self.readable(space, tp))
+                return super().step()
+        code = bytes(self.space[space].data[tp:tp+d.length])
+        before = regs[:]
+        before_tags = tags[:]
+        try:
+            super().step()
+        finally:
+            reg = TraceBuffer.NO_REG
+            value = 0
+            if regs != before or tags != before_tags:
+                for r in (Channel.GA, Channel.GB, Channel.GC, Channel.BC,
+                          Channel.IX, Channel.CC, Channel.MC):
+                    if regs[r] != before[r] or tags[r] != before_tags[r]:
+                        reg = r
+                        value = regs[r] | (tags[r] << 20)
+                        break
+            self.trace_buffer.add(tp | (space << 20), self.number, code, reg, value)
+
+
+if __name__ == '__main__':
+    import sys
+    i89 = I89()
+    for fn in sys.argv[1:]:
+        with open(fn, 'rb') as f:
+            tb = TraceBuffer.read(f)
+        for line in tb.disassemble(i89):
+            print(line)
@@ -0,0 +1,377 @@
+#!/usr/bin/python3
+# Basic block translation for the Intel 8089 channel simulator
+# Copyright 2016 Eric Smith <spacewar@gmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License
+# as published by the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# A TranslatingChannel executes channel programs by translating each
+# basic block, a run of instructions ending with a branch, into a
+# generated Python function.  Register arithmetic, MOV and MOVB, and
+# branches are translated into inline code; the other instructions call
+# the Channel instruction handlers with their predecoded operands.  A
+# block that branches back to its own start loops within the generated
+# function.
+#
+# Blocks are kept in a cache indexed by start address, and each block
+# remembers the blocks at its direct branch targets, so that the
+# dispatcher usually doesn't need to look them up.  A map of the bytes
+# covered by translated blocks lets the write hook discard the blocks
+# overlapping a write; if that happens during execution of a block,
+# the block returns to the dispatcher after the writing instruction.
+
+from channel import Channel
+from i89 import OT
+from memory import Memory
+
+
+class TranslatingChannel(Channel):
+
+    # longest block, in instructions
+    max_block_length = 32
+
+    # instructions ending a block, in addition to branches and
+    # instructions writing TP
+    block_enders = { 'hlt', 'xfer', 'sintr' }
+
+    class Block:
+        def __init__(self, space, start, end, count, targets, fn, source):
+            self.space = space
+            self.start = start
+            self.end = end          # address following the last instruction
+            self.count = count      # instructions per pass through the block
+            self.targets = targets  # addresses to which the block can exit
+            self.fn = fn
+            self.source = source    # generated Python code
+            self.links = { }        # target address -> Block
+            self.valid = True
+
+    def __init__(self, system, io = None, i89 = None, number = 0):
+        super().__init__(system, io, i89 = i89, number = number)
+        self.block_cache = ({ }, { })  # by tag: address -> Block
+        self.code_map = tuple(bytearray(len(self.space[space]))
+                              for space in (Channel.SYSTEM, Channel.IO))
+        self.code_modified = False
+
+    # write hook: also discards translated blocks overlapping the write
+    def invalidate(self, space, start, stop):
+        super().invalidate(space, start, stop)
+        code_map = self.code_map[space]
+        if code_map.find(1, start, stop) < 0:
+            return
+        blocks = self.block_cache[space]
+        removed = [blk for blk in blocks.values() if blk.start < stop and blk.end > start]
+        for blk in removed:
+            del blocks[blk.start]
+            blk.valid = False
+            code_map[blk.start:blk.end] = bytes(blk.end - blk.start)
+        # blocks may overlap, so restore the map for any that remain
+        for blk in blocks.values():
+            if any(blk.start < r.end and blk.end > r.start for r in removed):
+                code_map[blk.start:blk.end] = b'\x01' * (blk.end - blk.start)
+        self.code_modified = True
+
+    def ends_block(self, d):
+        if 'j' in d.fields or d.op.mnem in TranslatingChannel.block_enders:
+            return True
+        # an instruction with TP as its destination register is a jump
+        operands = d.form.operands
+        return (len(operands) > 0 and operands[0] in (OT.reg, OT.preg) and
+                d.fields.get('r', d.fields.get('p')) == Channel.TP)
+
+
+    # code generation
+
+    @staticmethod
+    def reg_mask(r):
+        if r in Channel.pointer_regs:
+            return '(0xffff if tags[%d] else 0xfffff)' % r
+        return '0xffff'
+
+    # Returns lines of code setting s and a (or s2 and a2, for suffix
+    # '2') to the space and address of a memory operand, as computed by
+    # Channel.effective_address.
+    @staticmethod
+    def address_code(fields, suffix, size):
+        s = 's' + suffix
+        a = 'a' + suffix
+        m = fields['m' + suffix]
+        mode = fields.get('a' + suffix, 1)
+        if m == 3:
+            lines = [ '%s = 0' % s ]
+            base = 'ch.pp'
+            mask = '0xfffff'
+        else:
+            lines = [ '%s = tags[%d]' % (s, m) ]
+            base = 'regs[%d]' % m
+            mask = '(0xffff if %s else 0xfffff)' % s
+        if mode == 0:
+            lines.append('%s = %s' % (a, base))
+        elif mode == 1:
+            lines.append('%s = (%s + %d) & %s' % (a, base, fields['o' + suffix], mask))
+        else:
+            lines.append('%s = (%s + regs[5]) & %s' % (a, base, mask))
+            if mode == 3:
+                lines.append('regs[5] = (regs[5] + %d) & 0xffff' % size)
+        return lines
+
+    @staticmethod
+    def load_code(width, suffix = ''):
+        if width == 8:
+            return 'space[s%s][a%s]' % (suffix, suffix)
+        return 'ch.load(s%s, a%s, 16)' % (suffix, suffix)
+
+    @staticmethod
+    def store_code(width, value, suffix = ''):
+        if width == 8:
+            return 'space[s%s][a%s] = (%s) & 0xff' % (suffix, suffix, value)
+        return 'ch.store(s%s, a%s, 16, %s)' % (suffix, suffix, value)
+
+    # Returns (lines, expression) for the value tested by a conditional
+    # branch.
+    def tested_code(self, d):
+        if d.form.operands[0] == OT.reg:
+            return [ ], 'regs[%d] & 0xffff' % d.fields['r']
+        return (self.address_code(d.fields, '', d.width // 8),
+                self.load_code(d.width))
+
+    # conditions of conditional branches, given the tested value v and
+    # the bit number b
+    branch_conditions = { 'jz':     '%(v)s == 0',
+                          'jzb':    '%(v)s == 0',
+                          'jnz':    '%(v)s != 0',
+                          'jnzb':   '%(v)s != 0',
+                          'jbt':    '(%(v)s) & %(b)d',
+                          'jnbt':   'not (%(v)s) & %(b)d',
+                          'jmce':   '((%(v)s) ^ regs[7]) & (regs[7] >> 8) == 0',
+                          'jmcne':  '((%(v)s) ^ regs[7]) & (regs[7] >> 8) != 0' }
+
+    # Returns (lines, memory) for inline code for d, where memory is
+    # None, 'r', or 'w' as the code doesn't access memory, reads it, or
+    # writes it.  Returns (None, None) if the instruction must be
+    # executed by its handler.
+    def inline(self, d):
+        mnem = d.op.mnem
+        fields = d.fields
+        operands = d.form.operands
+        width = d.width
+        if mnem == 'nop':
+            return [ ], None
+        if mnem in ('mov', 'movb'):
+            if operands[0] == OT.reg and fields['r'] != Channel.TP:
+                r = fields['r']
+                lines = self.address_code(fields, '', width // 8)
+                value = self.load_code(width)
+                if r in Channel.pointer_regs:
+                    lines.append('ch.set_reg(%d, %s, %d)' % (r, value, width))
+                elif width == 8:
+                    lines.append('regs[%d] = ((%s ^ 0x80) - 0x80) & 0xffff' % (r, value))
+                else:
+                    lines.append('regs[%d] = %s' % (r, value))
+                return lines, 'r'
+            if operands[1] == OT.reg:
+                lines = self.address_code(fields, '', width // 8)
+                lines.append(self.store_code(width, 'regs[%d]' % fields['r']))
+                return lines, 'w'
+            # memory to memory; the source address is computed first
+            lines = self.address_code(fields, '', width // 8)
+            lines.append('v = ' + self.load_code(width))
+            lines += self.address_code(fields, '2', width // 8)
+            lines.append(self.store_code(width, 'v', '2'))
+            return lines, 'w'
+        if len(operands) == 0 or operands[0] != OT.reg:
+            return None, None
+        r = fields['r']
+        if r == Channel.TP:
+            return None, None
+        if mnem in ('movi', 'movbi'):
+            value = fields['i']
+            if width == 8:
+                value = Channel.sign_extend_8(value) & 0xffff
+            if r in Channel.pointer_regs:
+                return [ 'regs[%d] = 0x%x' % (r, Channel.sign_extend_16(value) & 0xfffff),
+                         'tags[%d] = 1' % r ], None
+            return [ 'regs[%d] = 0x%x' % (r, value) ], None
+        if mnem in ('addi', 'addbi', 'inc', 'dec'):
+            if mnem == 'inc':
+                k = 1
+            elif mnem == 'dec':
+                k = -1
+            elif width == 8:
+                k = Channel.sign_extend_8(fields['i'])
+            else:
+                k = Channel.sign_extend_16(fields['i'])
+            return [ 'regs[%d] = (regs[%d] + %d) & %s' % (r, r, k, self.reg_mask(r)) ], None
+        if mnem in ('andi', 'andbi', 'ori', 'orbi'):
+            k = fields['i']
+            if width == 8:
+                k = Channel.sign_extend_8(k) & 0xffff
+            op = '&' if mnem.startswith('and') else '|'
+            return [ 'regs[%d] = (regs[%d] %s 0x%x) & 0xffff' % (r, r, op, k) ], None
+        return None, None
+
+    # target address of a branch instruction at addr
+    def branch_target(self, space, d, addr):
+        nxt = addr + d.length
+        disp = Channel.sign_extend_16((d.fields['j'] - nxt) & 0xffff)
+        return (nxt + disp) & Channel.address_mask[space]
+
+    # Translates the block starting at start in space, and adds it to
+    # the block cache.
+    def translate(self, space, start):
+        mask = Channel.address_mask[space]
+        decoded = [ ]
+        addr = start
+        while len(decoded) < TranslatingChannel.max_block_length:
+            d = self.decode_cache[space].get(addr)
+            if d is None:
+                try:
+                    d = self.predecode(space, addr)
+                except (Channel.BadInstruction, Memory.Uninitialized, IndexError):
+                    if not decoded:
+                        raise
+                    break  # the interpreter will report it, if it's reached
+            if addr + d.length > len(self.code_map[space]):
+                break
+            decoded.append((addr, d))
+            addr += d.length
+            if self.ends_block(d):
+                break
+        end = addr
+        count = len(decoded)
+
+        namespace = { 'Channel': Channel, 'Memory': Memory }
+        targets = { end & mask }
+        body = [ ]
+
+        # code to leave the block after i + 1 instructions, or to loop if
+        # TP is the start of the block
+        def exit(i, loop):
+            if not loop:
+                return [ 'return n + %d' % (i + 1) ]
+            return [ 'if regs[4] == 0x%x and not ch.halted:' % start,
+                     '    n += %d' % count,
+                     '    if n + %d <= budget:' % count,
+                     '        continue',
+                     '    return n',
+                     'return n + %d' % (i + 1) ]
+
+        for i, (addr, d) in enumerate(decoded):
+            nxt = (addr + d.length) & mask
+            last = i == count - 1
+            mnem = d.op.mnem
+            body.append('# %05x: %s' % (addr, mnem))
+            fault_info = 'pc = 0x%x; k = %d' % (addr, i)
+            if mnem in ('jmp', 'ljmp'):
+                target = self.branch_target(space, d, addr)
+                targets.add(target)
+                body.append('regs[4] = 0x%x' % target)
+                body += exit(i, target == start)
+                continue
+            cond = TranslatingChannel.branch_conditions.get(mnem.lstrip('l'))
+            if cond is not None:
+                target = self.branch_target(space, d, addr)
+                targets.add(target)
+                lines, value = self.tested_code(d)
+                if lines:
+                    body.append(fault_info)
+                body += lines
+                body.append('if %s:' % (cond % { 'v': value, 'b': 1 << d.fields.get('b', 0) }))
+                body += ['    ' + line for line in
+                         ['regs[4] = 0x%x' % target] + exit(i, target == start)]
+                body.append('regs[4] = 0x%x' % nxt)
+                body.append('return n + %d' % (i + 1))
+                continue
+            lines, memory = self.inline(d)
+            if lines is not None:
+                if memory is not None:
+                    body.append(fault_info)
+                body += lines
+                if memory == 'w':
+                    body.append('if ch.code_modified:')
+                    body.append('    regs[4] = 0x%x' % nxt)
+                    body.append('    return n + %d' % (i + 1))
+            else:
+                namespace['d%d' % i] = d
+                namespace['h%d' % i] = d.handler
+                body.append(fault_info)
+                body.append('regs[4] = 0x%x' % nxt)
+                body.append('h%d(d%d)' % (i, i))
+                if 'j' in d.fields:
+                    targets.add(self.branch_target(space, d, addr))
+                body.append('if ch.code_modified:')
+                body.append('    return n + %d' % (i + 1))
+            if last:
+                if lines is not None:
+                    body.append('regs[4] = 0x%x' % nxt)
+                body += exit(i, self.ends_block(d))
+
+        source = [ 'def block(ch, budget):',
+                   '    regs = ch.regs',
+                   '    tags = ch.tags',
+                   '    space = ch.space',
+                   '    n = 0',
+                   '    pc = 0x%x; k = 0' % start,
+                   '    try:',
+                   '        while True:' ]
+        source += ['            ' + line for line in body]
+        source += [ '    except (Memory.Uninitialized, IndexError):',
+                    '        ch.instruction_count += n + k',
+                    '        raise Channel.MemoryFault(ch, pc)' ]
+        source = '\n'.join(source) + '\n'
+        exec(compile(source, '<block %05x>' % start, 'exec'), namespace)
+
+        blk = TranslatingChannel.Block(space, start, end, count, targets,
+                                       namespace['block'], source)
+        self.block_cache[space][start] = blk
+        self.code_map[space][start:end] = b'\x01' * (end - start)
+        return blk
+
+    # Runs until the channel halts, or max_steps instructions have been
+    # executed.  Returns the number of instructions executed.
+    def run(self, max_steps = None):
+        count = 0
+        blk = None
+        while not self.halted and (max_steps is None or count < max_steps):
+            if self.xfer_pending:
+                # the instruction following XFER is executed by step(),
+                # which then does the DMA transfer
+                self.step()
+                count += 1
+                blk = None
+                continue
+            tp = self.regs[Channel.TP]
+            space = self.tags[Channel.TP]
+            next_blk = None
+            if blk is not None:
+                next_blk = blk.links.get(tp)
+            if next_blk is None or not next_blk.valid or next_blk.space != space:
+                next_blk = self.block_cache[space].get(tp)
+                if next_blk is None:
+                    try:
+                        next_blk = self.translate(space, tp)
+                    except (Memory.Uninitialized, IndexError):
+                        raise Channel.MemoryFault(self, tp)
+                if blk is not None and blk.valid and tp in blk.targets:
+                    blk.links[tp] = next_blk
+            blk = next_blk
+            if max_steps is not None and max_steps - count < blk.count:
+                # not enough left for a whole pass through the block
+                self.step()
+                count += 1
+                blk = None
+                continue
+            self.code_modified = False
+            n = blk.fn(self, (max_steps - count) if max_steps is not None else 1 << 62)
+            self.instruction_count += n
+            count += n
+        return count